@@ -0,0 +1,125 @@
+"""
+課程 archive 效能基準測試。
+
+以「各學期的總修課人數 / 總人限（只計有人限的課程）」為例，比較：
+
+- JSON：讀取並解析 data/courses/semesters 的所有學期檔案後逐筆累加
+- archive：以 memory map 開啟欄式 archive，用 numpy 向量運算
+
+archive 由學期檔案建立在暫存資料夾，兩種方式的結果必須相同。
+
+用法：
+    python benchmarks/bench_course_archive.py --data_folder data --repeat 5
+"""
+
+import argparse
+import json
+import math
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nthu_scraper.utils.course_archive import (  # noqa: E402
+    CourseArchive,
+    build_archive,
+)
+
+
+def fill_ratio_json(semester_files: List[Path]) -> Dict[str, float]:
+    ratios = {}
+    for path in semester_files:
+        enrolled = limit = 0.0
+        for course in json.loads(path.read_bytes()):
+            try:
+                size_limit = float(course["size_limit"])
+                student_count = float(course["student_count"])
+            except ValueError:
+                continue
+            if size_limit > 0:
+                enrolled += student_count
+                limit += size_limit
+        ratios[path.stem] = enrolled / limit if limit else math.nan
+    return ratios
+
+
+def fill_ratio_archive(folder: Path) -> Dict[str, float]:
+    archive = CourseArchive(folder)
+    size_limit = archive.numbers("size_limit")
+    student_count = archive.numbers("student_count")
+    semester = archive.semester_index()
+    valid = (size_limit > 0) & ~np.isnan(student_count)
+    count = len(archive.semesters)
+    enrolled = np.bincount(
+        semester[valid], weights=student_count[valid], minlength=count
+    )
+    limit = np.bincount(semester[valid], weights=size_limit[valid], minlength=count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ratios = enrolled / limit
+    return dict(zip(archive.semesters, ratios.tolist()))
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> Tuple[object, float]:
+    """重複執行 func，回傳 (結果, 最短的執行時間 ms)。"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, min(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="課程 archive 效能基準測試")
+    parser.add_argument("--data_folder", type=str, default="data")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    semester_files = sorted(
+        (Path(args.data_folder) / "courses" / "semesters").glob("*.json")
+    )
+    if not semester_files:
+        print(f"錯誤：{args.data_folder}/courses/semesters 中沒有課程資料")
+        sys.exit(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        start = time.perf_counter()
+        build_archive(semester_files, folder)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        json_ratios, json_ms = best_of(
+            args.repeat, lambda: fill_ratio_json(semester_files)
+        )
+        archive_ratios, archive_ms = best_of(
+            args.repeat, lambda: fill_ratio_archive(folder)
+        )
+        json_bytes = sum(path.stat().st_size for path in semester_files)
+        archive_bytes = sum(path.stat().st_size for path in folder.iterdir())
+
+    print(f"{'semester':<10}{'fill ratio':>12}")
+    for semester, ratio in json_ratios.items():
+        print(f"{semester:<10}{ratio:>12.3f}")
+    identical = json_ratios.keys() == archive_ratios.keys() and all(
+        math.isclose(json_ratios[key], archive_ratios[key])
+        or (math.isnan(json_ratios[key]) and math.isnan(archive_ratios[key]))
+        for key in json_ratios
+    )
+    print(
+        f"\nJSON:    {json_bytes / 1024 / 1024:6.1f} MB  {json_ms:8.1f} ms\n"
+        f"archive: {archive_bytes / 1024 / 1024:6.1f} MB  {archive_ms:8.1f} ms"
+        f"  (建立 {build_ms:.0f} ms)\n"
+        f"加速 {json_ms / archive_ms:.0f}x，結果相同: {identical}"
+    )
+    if not identical:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
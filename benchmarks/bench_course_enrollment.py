@@ -0,0 +1,163 @@
+"""
+課程修課人數紀錄效能基準測試。
+
+以 data/courses/semesters 中最新學期的課程為基礎，模擬加退選期間每兩小時
+一次的爬取（每次隨機一部分課程的修課人數變動），寫入 EnrollmentStore
+（暫存資料夾），量測：
+
+- 每次爬取的儲存空間成長
+- 查詢單一課程的人數曲線、最近 24 小時增加最多的課程所需時間
+- 與「每次爬取保存一份 JSON 快照、查詢時逐一讀取」的做法比較
+
+同時檢查兩種做法查到的曲線相同。
+
+目前的開課資料沒有總人數欄位（student_count 皆為空字串，爬蟲不會寫入
+紀錄），因此這裡的修課人數是隨機產生的，只用來量測儲存格式本身。
+
+用法：
+    python benchmarks/bench_course_enrollment.py --data_folder data --runs 84
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nthu_scraper.utils.course_enrollment import (  # noqa: E402
+    EnrollmentBatch,
+    EnrollmentStore,
+)
+
+
+def simulate(
+    courses: List[Dict[str, str]], runs: int, churn: float, rng: random.Random
+) -> List[Tuple[int, Dict[str, int]]]:
+    """產生 runs 次爬取的 (時間, {科號: 修課人數})。"""
+    counts = {course["id"]: rng.randint(0, 30) for course in courses}
+    timestamp = 1_700_000_000
+    snapshots = []
+    for _ in range(runs):
+        timestamp += 2 * 3600
+        for course_id in counts:
+            if rng.random() < churn:
+                counts[course_id] = max(0, counts[course_id] + rng.randint(-2, 6))
+        snapshots.append((timestamp, dict(counts)))
+    return snapshots
+
+
+def snapshot_curve(folder: Path, course_id: str) -> List[Tuple[int, int]]:
+    """讀取所有 JSON 快照，取出一門課人數變動的時間點。"""
+    curve: List[Tuple[int, int]] = []
+    for path in sorted(folder.glob("*.json")):
+        count = int(json.loads(path.read_bytes())[course_id])
+        if not curve or curve[-1][1] != count:
+            curve.append((int(path.stem), count))
+    return curve
+
+
+def median_ms(repeat: int, func) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="課程修課人數紀錄效能基準測試")
+    parser.add_argument("--data_folder", type=str, default="data")
+    parser.add_argument("--runs", type=int, default=84, help="模擬的爬取次數")
+    parser.add_argument("--churn", type=float, default=0.05, help="每次人數變動的比例")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    semester_files = sorted(
+        (Path(args.data_folder) / "courses" / "semesters").glob("*.json")
+    )
+    if not semester_files:
+        print(f"錯誤：{args.data_folder}/courses/semesters 中沒有課程資料")
+        sys.exit(1)
+
+    path = semester_files[-1]
+    semester = path.stem
+    courses = json.loads(path.read_bytes())
+    rng = random.Random(args.seed)
+    snapshots = simulate(courses, args.runs, args.churn, rng)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_folder = Path(tmp) / "store"
+        snapshot_folder = Path(tmp) / "snapshots"
+        snapshot_folder.mkdir()
+
+        itemsize = EnrollmentStore(store_folder).dtype.itemsize
+        growth = []
+        append_ms = []
+        for timestamp, counts in snapshots:
+            batch = EnrollmentBatch(semester, timestamp)
+            for course in courses:
+                batch.add(
+                    {
+                        "id": course["id"],
+                        "student_count": str(counts[course["id"]]),
+                        "size_limit": course["size_limit"],
+                    }
+                )
+            start = time.perf_counter()
+            records = EnrollmentStore(store_folder).append(batch)
+            append_ms.append((time.perf_counter() - start) * 1000)
+            growth.append(records * itemsize)
+            (snapshot_folder / f"{timestamp}.json").write_text(
+                json.dumps(counts), encoding="utf-8"
+            )
+
+        store_bytes = sum(p.stat().st_size for p in store_folder.iterdir())
+        snapshot_bytes = sum(p.stat().st_size for p in snapshot_folder.iterdir())
+        print(f"學期 {semester}：{len(courses)} 門課，模擬 {args.runs} 次爬取")
+        print(
+            f"  每次成長（中位數）: {statistics.median(growth[1:]) / 1024:.1f} KB"
+            f"（第一次 {growth[0] / 1024:.1f} KB）"
+        )
+        print(f"  每次附加（中位數）: {statistics.median(append_ms):.1f} ms")
+        print(
+            f"  總大小: store {store_bytes / 1024:.0f} KB"
+            f" / JSON 快照 {snapshot_bytes / 1024:.0f} KB"
+        )
+
+        store = EnrollmentStore(store_folder)
+        sample = rng.sample([course["id"] for course in courses], 20)
+        identical = all(
+            [(p["time"], p["student_count"]) for p in store.curve(course_id)]
+            == snapshot_curve(snapshot_folder, course_id)
+            for course_id in sample
+        )
+        course_id = sample[0]
+        curve_ms = median_ms(
+            args.repeat, lambda: EnrollmentStore(store_folder).curve(course_id)
+        )
+        scan_ms = median_ms(
+            max(1, args.repeat // 10),
+            lambda: snapshot_curve(snapshot_folder, course_id),
+        )
+        since = snapshots[-1][0] - 24 * 3600
+        top_ms = median_ms(
+            args.repeat,
+            lambda: EnrollmentStore(store_folder).fastest_filling(semester, since),
+        )
+        print(f"  單一課程曲線: {curve_ms:.2f} ms（JSON 快照 {scan_ms:.1f} ms）")
+        print(f"  24 小時增加最多: {top_ms:.2f} ms")
+        print(f"  曲線相同: {identical}")
+        if not identical:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+課程資料轉換效能基準測試。
+
+比較舊版 CoursesData.from_dict（每筆課程逐欄搜尋同義字、建立 dataclass 後再
+asdict）與 CourseNormalizer（每種欄位組合只編譯一次轉換計畫）的每秒處理筆數，
+並檢查兩者的輸出是否完全相同。
+
+測試資料：
+- data/courses/*.json：課程資料原始檔（例如 10820、latest）
+- data/courses/semesters/*.json：10820–11410 各學期已轉換的資料，依 latest
+  的原始欄位格式還原（教室與時間合併回「教室與上課時間」）
+
+用法：
+    python benchmarks/bench_course_normalizer.py --data_folder data --repeat 5
+"""
+
+import argparse
+import json
+import sys
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nthu_scraper.spiders.nthu_courses import (  # noqa: E402
+    CourseNormalizer,
+    CoursesData,
+    _split_classroom_time,
+    _strip_data_str,
+)
+
+
+def legacy_from_dict(init_data: dict) -> Dict[str, str]:
+    """改寫前的 CoursesData.from_dict + asdict，作為比較基準。"""
+    data = {}
+    if init_data.get("教室與上課時間"):
+        classroom_time_data = _split_classroom_time(init_data["教室與上課時間"])
+        data["classroom"] = classroom_time_data.get("classroom", "")
+        data["time"] = classroom_time_data.get("time", "").replace("\n", "")
+
+    for canonical_field, keywords in CoursesData.FIELD_MAPPING.items():
+        found_key = None
+        for key in keywords:
+            if key in init_data:
+                found_key = key
+                break
+        if found_key:
+            data[canonical_field] = _strip_data_str(str(init_data[found_key]))
+        elif canonical_field not in data:
+            data[canonical_field] = ""
+
+    for key in [key for key in data if key not in CoursesData.__dataclass_fields__]:
+        del data[key]
+    return asdict(CoursesData(**data))
+
+
+def to_raw(course: Dict[str, str]) -> Dict[str, str]:
+    """將已轉換的課程還原為原始資料的欄位格式。"""
+    raw = {}
+    for canonical_field, keywords in CoursesData.FIELD_MAPPING.items():
+        if canonical_field in ("classroom", "time"):
+            continue
+        if canonical_field == "class_room_and_time":
+            raw[keywords[0]] = f"{course['classroom']}\t{course['time']}"
+        else:
+            raw[keywords[0]] = course[canonical_field]
+    return raw
+
+
+def load_datasets(data_folder: Path) -> Dict[str, List[Dict[str, Any]]]:
+    datasets = {}
+    for path in sorted((data_folder / "courses").glob("*.json")):
+        datasets[f"raw/{path.stem}"] = json.loads(path.read_bytes())
+    semester_files = sorted((data_folder / "courses" / "semesters").glob("*.json"))
+    if semester_files:
+        rows = []
+        for path in semester_files:
+            rows.extend(to_raw(course) for course in json.loads(path.read_bytes()))
+        name = f"semesters/{semester_files[0].stem}-{semester_files[-1].stem}"
+        datasets[name] = rows
+    return datasets
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    """重複執行 func，回傳最短的執行時間（秒）。"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="課程資料轉換效能基準測試")
+    parser.add_argument("--data_folder", type=str, default="data")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    datasets = load_datasets(Path(args.data_folder))
+    if not datasets:
+        print(f"錯誤：{args.data_folder}/courses 中沒有課程資料")
+        sys.exit(1)
+
+    header = (
+        f"{'dataset':<24}{'rows':>8}{'before rows/s':>15}{'after rows/s':>14}"
+        f"{'speedup':>9}  identical"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, rows in datasets.items():
+        normalizer = CourseNormalizer()
+        identical = [legacy_from_dict(row) for row in rows] == [
+            normalizer.normalize(row) for row in rows
+        ]
+
+        before = best_of(args.repeat, lambda: [legacy_from_dict(row) for row in rows])
+        # 每次都建立新的 CourseNormalizer，計入編譯轉換計畫的時間
+        after = best_of(
+            args.repeat, lambda: list(map(CourseNormalizer().normalize, rows))
+        )
+        print(
+            f"{name:<24}{len(rows):>8}{len(rows) / before:>15,.0f}"
+            f"{len(rows) / after:>14,.0f}{before / after:>8.1f}x  {identical}"
+        )
+        if not identical:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
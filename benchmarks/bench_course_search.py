@@ -0,0 +1,149 @@
+"""
+課程搜尋索引效能基準測試。
+
+為 data/courses/semesters 的每個學期建立分片搜尋索引（寫到暫存資料夾），
+再以從課程資料中抽出的中文課名片段與單字、英文單字與授課教師姓名查詢，
+比較：
+
+- 索引查詢：每次查詢都重新開啟索引，只讀取 manifest 與需要的分片
+- 線性掃描：讀取整個學期檔案並逐筆比對
+
+同時檢查線性掃描找到的課程都在索引查詢的結果中。
+
+用法：
+    python benchmarks/bench_course_search.py --data_folder data --queries 30
+"""
+
+import argparse
+import json
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nthu_scraper.utils.course_search import (  # noqa: E402
+    MANIFEST_NAME,
+    SEARCH_FIELDS,
+    CourseSearchIndex,
+    build_search_index,
+    shard_key,
+    tokenize,
+)
+
+
+def sample_queries(
+    courses: List[Dict[str, str]], rng: random.Random, count: int
+) -> List[str]:
+    """抽出中文課名片段與單字、英文課名單字與授課教師姓名作為查詢。"""
+    queries = []
+    for _ in range(count):
+        course = rng.choice(courses)
+        title = re.sub(r"[^一-鿿]", "", course["chinese_title"])
+        if len(title) >= 2:
+            start = rng.randrange(len(title) - 1)
+            queries.append(title[start : start + rng.randint(2, 4)])
+            # 單字查詢，包含只出現在 bigram 第二個字的字元
+            queries.append(title[rng.randrange(1, len(title))])
+        words = re.findall(r"[a-z]{4,}", course["english_title"].lower())
+        if words:
+            queries.append(rng.choice(words))
+        lecturer = course["lecturer"].split(",")[0].strip()
+        if lecturer:
+            queries.append(lecturer)
+    return queries
+
+
+def linear_search(path: Path, query: str) -> List[str]:
+    """讀取整個學期檔案並逐筆比對：中文為子字串，英文為單字前綴。"""
+    courses = json.loads(path.read_bytes())
+    query = query.lower()
+    if query.isascii():
+        pattern = re.compile(r"\b" + r"\b.*\b".join(map(re.escape, query.split())))
+        match = pattern.search
+    else:
+        match = lambda text: query in text  # noqa: E731
+    return [
+        course["id"]
+        for course in courses
+        if any(match(course[name].lower()) for name in SEARCH_FIELDS)
+    ]
+
+
+def index_search(folder: Path, query: str) -> Tuple[List[str], int]:
+    """開啟索引查詢，回傳 (結果, 讀取的位元組數)。"""
+    index = CourseSearchIndex(folder)
+    result = index.search(query)
+    keys = {shard_key(token) for token in tokenize(query)}
+    read = (folder / MANIFEST_NAME).stat().st_size + sum(
+        (folder / f"{key}.json").stat().st_size
+        for key in keys
+        if key in index.manifest["shards"]
+    )
+    return result, read
+
+
+def timed(func, *args) -> Tuple[object, float]:
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="課程搜尋索引效能基準測試")
+    parser.add_argument("--data_folder", type=str, default="data")
+    parser.add_argument("--queries", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    semester_files = sorted(
+        (Path(args.data_folder) / "courses" / "semesters").glob("*.json")
+    )
+    if not semester_files:
+        print(f"錯誤：{args.data_folder}/courses/semesters 中沒有課程資料")
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    header = (
+        f"{'semester':<10}{'build ms':>10}{'shards':>8}{'index KB':>10}"
+        f"{'lookup ms':>11}{'read KB':>9}{'scan ms':>9}{'scan KB':>9}  recall"
+    )
+    print(header)
+    print("-" * len(header))
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in semester_files:
+            courses = json.loads(path.read_bytes())
+            folder = Path(tmp) / path.stem
+            _, build_ms = timed(build_search_index, courses, folder)
+            index_bytes = sum(p.stat().st_size for p in folder.iterdir())
+
+            lookups, reads, scans = [], [], []
+            recall = True
+            for query in sample_queries(courses, rng, args.queries):
+                (result, read), lookup_ms = timed(index_search, folder, query)
+                expected, scan_ms = timed(linear_search, path, query)
+                lookups.append(lookup_ms)
+                reads.append(read)
+                scans.append(scan_ms)
+                if not set(expected) <= set(result):
+                    recall = False
+                    print(f"    遺漏: {query!r}")
+
+            print(
+                f"{path.stem:<10}{build_ms:>10.1f}{len(list(folder.iterdir())) - 1:>8}"
+                f"{index_bytes / 1024:>10.0f}{statistics.median(lookups):>11.2f}"
+                f"{statistics.median(reads) / 1024:>9.0f}"
+                f"{statistics.median(scans):>9.2f}{path.stat().st_size / 1024:>9.0f}"
+                f"  {recall}"
+            )
+            if not recall:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+課程時段查詢效能基準測試。
+
+對每個學期的課程資料建立 CourseSlotIndex，量測「空堂內可修的課程」與
+「與指定課程衝堂的課程」兩種查詢的時間，並與每次查詢都重新解析 time 字串
+的純 Python 寫法比較、檢查結果是否相同。
+
+用法：
+    python benchmarks/bench_course_slots.py --data_folder data --repeat 200
+"""
+
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Set
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nthu_scraper.utils.course_slots import (  # noqa: E402
+    DAYS,
+    PERIODS,
+    CourseSlotIndex,
+)
+
+
+def parse_slots(time_str: str) -> Set[str]:
+    """用戶端常見的寫法：每次查詢都把 time 字串切成兩個字元一組的節次。"""
+    return {
+        time_str[i : i + 2]
+        for i in range(0, len(time_str) - 1)
+        if time_str[i] in DAYS and time_str[i + 1] in PERIODS
+    }
+
+
+def naive_fits(courses: List[Dict[str, str]], free: Set[str]) -> List[str]:
+    result = []
+    for course in courses:
+        slots = parse_slots(course["time"])
+        if slots and slots <= free:
+            result.append(course["id"])
+    return result
+
+
+def naive_conflicts(courses: List[Dict[str, str]], taken: Set[str]) -> List[str]:
+    return [course["id"] for course in courses if parse_slots(course["time"]) & taken]
+
+
+def median_us(repeat: int, func: Callable[[], object]) -> float:
+    """重複執行 func，回傳中位數時間（微秒）。"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="課程時段查詢效能基準測試")
+    parser.add_argument("--data_folder", type=str, default="data")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    semester_files = sorted(
+        (Path(args.data_folder) / "courses" / "semesters").glob("*.json")
+    )
+    if not semester_files:
+        print(f"錯誤：{args.data_folder}/courses/semesters 中沒有課程資料")
+        sys.exit(1)
+
+    rng = random.Random(args.seed)
+    all_slots = [day + period for day in DAYS[:5] for period in PERIODS]
+    header = (
+        f"{'semester':<10}{'courses':>9}{'build ms':>10}"
+        f"{'fits us':>10}{'naive us':>10}{'conflicts us':>14}{'naive us':>10}"
+        f"  identical"
+    )
+    print(header)
+    print("-" * len(header))
+    slowest = 0.0
+    for path in semester_files:
+        courses = json.loads(path.read_bytes())
+        start = time.perf_counter()
+        index = CourseSlotIndex.from_courses(courses)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        # 隨機一半節次為空堂；隨機選 6 門課作為已選課程
+        free = set(rng.sample(all_slots, len(all_slots) // 2))
+        free_str = "".join(sorted(free))
+        chosen = rng.sample([c for c in courses if c["time"]], 6)
+        taken_ids = [c["id"] for c in chosen]
+        taken = set().union(*(parse_slots(c["time"]) for c in chosen))
+
+        identical = index.fits(free_str) == naive_fits(
+            courses, free
+        ) and index.conflicts(taken_ids) == naive_conflicts(courses, taken)
+
+        fits_us = median_us(args.repeat, lambda: index.fits(free_str))
+        naive_fits_us = median_us(
+            max(1, args.repeat // 20), lambda: naive_fits(courses, free)
+        )
+        conflicts_us = median_us(args.repeat, lambda: index.conflicts(taken_ids))
+        naive_conflicts_us = median_us(
+            max(1, args.repeat // 20), lambda: naive_conflicts(courses, taken)
+        )
+        slowest = max(slowest, fits_us, conflicts_us)
+        print(
+            f"{path.stem:<10}{len(index):>9}{build_ms:>10.1f}"
+            f"{fits_us:>10.0f}{naive_fits_us:>10.0f}"
+            f"{conflicts_us:>14.0f}{naive_conflicts_us:>10.0f}  {identical}"
+        )
+        if not identical:
+            sys.exit(1)
+
+    print(f"\n最慢的查詢: {slowest:.0f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+JSON codec 效能基準測試。
+
+對 courses.json、announcements.json、directory.json 分別以每個可用的 codec
+量測解碼（bytes -> 物件）與編碼（物件 -> indent=4 的 bytes）時間，並檢查
+所有 codec 的輸出是否逐位元組相同。
+
+用法：
+    python benchmarks/bench_json_codec.py --data_folder data --repeat 5
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nthu_scraper.utils.json_codec import CODECS, JsonCodec  # noqa: E402
+
+DATASETS = ["courses.json", "announcements.json", "directory.json"]
+
+
+def best_of(repeat: int, func: Callable[[], object]) -> float:
+    """重複執行 func，回傳最短的執行時間（秒）。"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def load_codecs() -> Dict[str, JsonCodec]:
+    """建立所有可載入的 codec。"""
+    codecs = {}
+    for name, codec_cls in CODECS.items():
+        try:
+            codecs[name] = codec_cls()
+        except ImportError as e:
+            print(f"略過 codec '{name}'：{e}")
+    return codecs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="JSON codec 編解碼效能基準測試")
+    parser.add_argument("--data_folder", type=str, default="data")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--indent", type=int, default=4)
+    args = parser.parse_args()
+
+    codecs = load_codecs()
+    baseline_name = "stdlib"
+
+    header = (
+        f"{'dataset':<22}{'codec':<10}{'decode ms':>11}{'encode ms':>11}"
+        f"{'decode x':>10}{'encode x':>10}  identical"
+    )
+    print(header)
+    print("-" * len(header))
+    for dataset in DATASETS:
+        path = Path(args.data_folder) / dataset
+        if not path.is_file():
+            print(f"{dataset:<22}（找不到檔案，略過）")
+            continue
+        raw = path.read_bytes()
+        data = codecs[baseline_name].loads(raw)
+        reference = codecs[baseline_name].dumps(data, args.indent)
+
+        results: List[tuple] = []
+        for name, codec in codecs.items():
+            decode = best_of(args.repeat, lambda: codec.loads(raw))
+            encode = best_of(args.repeat, lambda: codec.dumps(data, args.indent))
+            identical = codec.dumps(data, args.indent) == reference
+            results.append((name, decode, encode, identical))
+
+        base_decode, base_encode = results[0][1], results[0][2]
+        for name, decode, encode, identical in results:
+            print(
+                f"{dataset:<22}{name:<10}{decode * 1000:>11.1f}{encode * 1000:>11.1f}"
+                f"{base_decode / decode:>10.1f}{base_encode / encode:>10.1f}"
+                f"  {'yes' if identical else 'NO'}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Item 紀錄型別記憶體與效能基準測試。
+
+以 data/directory.json 與 data/courses/semesters 中最新學期的資料重建
+pipeline 收到的 Item，比較兩種做法：
+
+- item：scrapy.Item（課程為 dict），pipeline 以 dict(item) 複製後保留
+- record：@dataclass(slots=True) 紀錄，pipeline 直接保留並交給 JSON codec
+
+量測每筆保留的位元組數（tracemalloc，只計算 Item 與容器本身，欄位字串
+兩種做法共用）、建立與收集 Item 的速度，以及連同 JSON 編碼的速度，並檢查
+兩種做法輸出的 JSON 相同。
+
+用法：
+    python benchmarks/bench_records.py --data_folder data --codec stdlib
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import scrapy
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nthu_scraper.spiders.nthu_courses import CoursesData  # noqa: E402
+from nthu_scraper.spiders.nthu_directory import (  # noqa: E402
+    DepartmentDetail,
+    DepartmentItem,
+)
+from nthu_scraper.utils.json_codec import get_codec  # noqa: E402
+
+
+class LegacyDepartmentItem(scrapy.Item):
+    """改用紀錄前的系所 Item。"""
+
+    index = scrapy.Field()
+    name = scrapy.Field()
+    parent_index = scrapy.Field()
+    parent_name = scrapy.Field()
+    url = scrapy.Field()
+    details = scrapy.Field()
+
+
+def directory_items(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """改用紀錄前的流程：逐欄設定 Item，pipeline 以 dict(item) 複製並展開 details。"""
+    collected = []
+    for row in rows:
+        item = LegacyDepartmentItem()
+        item["index"] = row["index"]
+        item["name"] = row["name"]
+        item["parent_name"] = row["parent_name"]
+        item["url"] = row["url"]
+        item["details"] = dict(row["details"])
+        collected.append(dict(item))
+    return collected
+
+
+def directory_records(rows: List[Dict[str, Any]]) -> List[DepartmentItem]:
+    return [
+        DepartmentItem(
+            index=row["index"],
+            name=row["name"],
+            parent_name=row["parent_name"],
+            url=row["url"],
+            details=DepartmentDetail(**row["details"]),
+        )
+        for row in rows
+    ]
+
+
+def course_items(rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    return [dict(row) for row in rows]
+
+
+def course_records(rows: List[Dict[str, str]]) -> List[CoursesData]:
+    return [CoursesData(**row) for row in rows]
+
+
+def retained_bytes(build: Callable[[], list]) -> Tuple[list, int]:
+    """建立並保留所有 Item，回傳 (結果, 新配置的位元組數)。"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def best_seconds(repeat: int, func: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Item 紀錄型別記憶體與效能基準測試")
+    parser.add_argument("--data_folder", type=str, default="data")
+    parser.add_argument("--codec", type=str, default="stdlib")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    data_folder = Path(args.data_folder)
+    semester_files = sorted((data_folder / "courses" / "semesters").glob("*.json"))
+    directory_path = data_folder / "directory.json"
+    if not directory_path.exists() or not semester_files:
+        print(f"錯誤：{args.data_folder} 中沒有 directory.json 或學期課程資料")
+        sys.exit(1)
+
+    codec = get_codec(args.codec)
+    datasets = [
+        (
+            "directory",
+            json.loads(directory_path.read_bytes()),
+            directory_items,
+            directory_records,
+        ),
+        (
+            f"courses {semester_files[-1].stem}",
+            json.loads(semester_files[-1].read_bytes()),
+            course_items,
+            course_records,
+        ),
+    ]
+
+    header = (
+        f"{'dataset':<16}{'kind':<8}{'items':>7}{'B/item':>9}"
+        f"{'build/s':>12}{'+encode/s':>12}  identical"
+    )
+    print(f"codec: {codec.name}")
+    print(header)
+    print("-" * len(header))
+    for name, rows, build_items, build_records in datasets:
+        outputs = []
+        for kind, build in (("item", build_items), ("record", build_records)):
+            collected, size = retained_bytes(lambda: build(rows))
+            outputs.append(codec.dumps(collected))
+            build_s = best_seconds(args.repeat, lambda: build(rows))
+            encode_s = best_seconds(args.repeat, lambda: codec.dumps(build(rows)))
+            print(
+                f"{name:<16}{kind:<8}{len(rows):>7}{size / len(rows):>9.0f}"
+                f"{len(rows) / build_s:>12,.0f}{len(rows) / encode_s:>12,.0f}"
+                + (f"  {outputs[0] == outputs[1]}" if kind == "record" else "")
+            )
+        if outputs[0] != outputs[1]:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
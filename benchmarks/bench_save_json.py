@@ -0,0 +1,127 @@
+"""
+save_json 效能基準測試。
+
+比較舊版寫法（直接以 "w" 模式開檔並 json.dump）與目前串流 + 原子寫入的
+save_json，在 courses.json 與各學期檔案上的執行時間與記憶體峰值。
+
+每個 (模式, 檔案) 組合都在獨立的子行程中執行，以取得互不干擾的 peak RSS。
+
+用法：
+    python benchmarks/bench_save_json.py --data_folder data --repeat 3
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nthu_scraper.utils.file_utils import save_json  # noqa: E402
+
+MODES = ("legacy", "streaming")
+
+
+def legacy_save_json(data: Any, file_path: Path) -> None:
+    """舊版 save_json：直接覆寫目標檔案。"""
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
+
+
+def run_child(mode: str, source: Path, repeat: int) -> Dict[str, float]:
+    """在子行程內載入資料並執行寫入，回傳量測結果。"""
+    with open(source, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    writer = legacy_save_json if mode == "legacy" else save_json
+    rss_after_load = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        target = Path(tmp_dir) / source.name
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            writer(data, target)
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        writer(data, target)
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "wall_s": min(timings),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "rss_after_load_kb": rss_after_load,
+        "write_alloc_peak_kb": traced_peak / 1024,
+    }
+
+
+def collect_sources(data_folder: Path) -> List[Path]:
+    """取得要測試的檔案：courses.json 與所有學期檔案。"""
+    sources = [data_folder / "courses.json"]
+    sources.extend(sorted((data_folder / "courses" / "semesters").glob("*.json")))
+    return [path for path in sources if path.is_file()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="save_json 寫入效能基準測試")
+    parser.add_argument("--data_folder", type=str, default="data")
+    parser.add_argument("--repeat", type=int, default=3, help="每個檔案重複寫入次數")
+    parser.add_argument(
+        "--child", nargs=2, metavar=("MODE", "FILE"), help=argparse.SUPPRESS
+    )
+    args = parser.parse_args()
+
+    if args.child:
+        mode, source = args.child
+        print(json.dumps(run_child(mode, Path(source), args.repeat)))
+        return
+
+    sources = collect_sources(Path(args.data_folder))
+    if not sources:
+        print(f"錯誤：在 '{args.data_folder}' 中找不到課程資料。")
+        sys.exit(1)
+
+    header = (
+        f"{'file':<22}{'size MB':>9}  {'mode':<10}{'wall ms':>9}"
+        f"{'peak RSS MB':>13}{'write alloc MB':>16}"
+    )
+    print(header)
+    print("-" * len(header))
+    totals = {mode: 0.0 for mode in MODES}
+    for source in sources:
+        size_mb = source.stat().st_size / 1024 / 1024
+        for mode in MODES:
+            output = subprocess.check_output(
+                [
+                    sys.executable,
+                    __file__,
+                    "--repeat",
+                    str(args.repeat),
+                    "--child",
+                    mode,
+                    str(source),
+                ]
+            )
+            result = json.loads(output)
+            totals[mode] += result["wall_s"]
+            print(
+                f"{source.name:<22}{size_mb:>9.2f}  {mode:<10}"
+                f"{result['wall_s'] * 1000:>9.1f}"
+                f"{result['peak_rss_kb'] / 1024:>13.1f}"
+                f"{result['write_alloc_peak_kb'] / 1024:>16.2f}"
+            )
+    print("-" * len(header))
+    for mode in MODES:
+        print(f"total {mode:<10}{totals[mode] * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
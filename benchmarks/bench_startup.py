@@ -0,0 +1,165 @@
+"""
+spider 冷啟動時間基準測試。
+
+每個 spider 在獨立的子行程中以 python -X importtime 啟動，量測從行程建立到
+第一個請求進入 scheduler 的時間，並統計各頂層套件的匯入時間。第一個請求
+排入後子行程立即結束，不會發出任何網路請求，也不會執行 pipeline 寫入資料。
+
+量測結果與 benchmarks/startup_budget.json 記錄的預算比較，超過預算時以
+非零狀態碼結束。
+
+用法：
+    python benchmarks/bench_startup.py                  # 量測全部 spider
+    python benchmarks/bench_startup.py nthu_dining      # 只量測指定 spider
+    python benchmarks/bench_startup.py --record         # 以本次結果更新預算
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+BUDGET_PATH = Path(__file__).resolve().parent / "startup_budget.json"
+MARKER = "FIRST_REQUEST"
+# 記錄預算時保留的餘裕，避免 CI 機器的波動造成誤判
+HEADROOM = 1.5
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_child(spider_name: str) -> None:
+    """在子行程內啟動 spider，第一個請求排入 scheduler 時回報並結束行程。"""
+    sys.path.insert(0, str(ROOT))
+    os.chdir(ROOT)
+
+    from scrapy import signals
+    from scrapy.crawler import AsyncCrawlerProcess
+    from scrapy.utils.project import get_project_settings
+
+    settings = get_project_settings()
+    settings.set("LOG_LEVEL", "ERROR")
+    process = AsyncCrawlerProcess(settings)
+    crawler = process.create_crawler(spider_name)
+
+    def request_scheduled(request, spider):
+        print(MARKER, flush=True)
+        sys.stderr.flush()
+        # 直接結束行程：不下載、不關閉 spider，也就不會觸發 pipeline 寫檔
+        os._exit(0)
+
+    crawler.signals.connect(request_scheduled, signal=signals.request_scheduled)
+    process.crawl(crawler)
+    process.start()
+    # spider 沒有產生任何請求
+    sys.exit(2)
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Dict[str, float]]:
+    """
+    解析 -X importtime 的輸出。
+
+    Returns:
+        (匯入總時間 ms, 以頂層套件為鍵的累計匯入時間 ms)
+    """
+    total = 0.0
+    by_package: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match or match.group(3) != " ":  # 只計算最外層的匯入
+            continue
+        cumulative = int(match.group(2)) / 1000
+        package = match.group(4).split(".")[0]
+        total += cumulative
+        by_package[package] = by_package.get(package, 0.0) + cumulative
+    return total, by_package
+
+
+def measure(spider_name: str) -> Tuple[float, float, Dict[str, float]]:
+    """執行一次冷啟動，回傳 (到第一個請求的 ms, 匯入總時間 ms, 各套件匯入 ms)。"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-X", "importtime", __file__, "--child", spider_name],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    elapsed = None
+    for line in proc.stdout:
+        if line.strip() == MARKER:
+            elapsed = (time.perf_counter() - start) * 1000
+    _, stderr = proc.communicate()
+    if elapsed is None:
+        raise RuntimeError(f"{spider_name} 沒有產生請求 (exit {proc.returncode})")
+    imports_ms, by_package = parse_importtime(stderr)
+    return elapsed, imports_ms, by_package
+
+
+def load_budget() -> Dict[str, float]:
+    if BUDGET_PATH.exists():
+        return json.loads(BUDGET_PATH.read_text(encoding="utf-8"))
+    return {}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="spider 冷啟動時間基準測試")
+    parser.add_argument("spiders", nargs="*", help="要量測的 spider (預設為全部)")
+    parser.add_argument("--repeat", type=int, default=3, help="每個 spider 執行次數")
+    parser.add_argument("--top", type=int, default=5, help="列出匯入最久的套件數")
+    parser.add_argument(
+        "--record", action="store_true", help="以本次結果 (含餘裕) 更新預算檔"
+    )
+    parser.add_argument("--child", metavar="SPIDER", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    spider_names: List[str] = args.spiders or sorted(
+        path.stem for path in (ROOT / "nthu_scraper" / "spiders").glob("nthu_*.py")
+    )
+    budget = load_budget()
+    results: Dict[str, float] = {}
+    over_budget = []
+
+    header = f"{'spider':<26}{'first req ms':>14}{'imports ms':>12}{'budget ms':>11}"
+    print(header)
+    print("-" * len(header))
+    for name in spider_names:
+        runs = [measure(name) for _ in range(args.repeat)]
+        elapsed = statistics.median(run[0] for run in runs)
+        imports_ms = statistics.median(run[1] for run in runs)
+        results[name] = elapsed
+
+        limit = budget.get(name)
+        flag = ""
+        if limit is not None and elapsed > limit:
+            over_budget.append(name)
+            flag = "  超過預算"
+        limit_text = f"{limit:>11.0f}" if limit is not None else f"{'-':>11}"
+        print(f"{name:<26}{elapsed:>14.0f}{imports_ms:>12.0f}{limit_text}{flag}")
+
+        top = sorted(runs[0][2].items(), key=lambda item: item[1], reverse=True)
+        print("    " + ", ".join(f"{pkg} {ms:.0f}" for pkg, ms in top[: args.top]))
+
+    if args.record:
+        budget.update(
+            {name: round(elapsed * HEADROOM) for name, elapsed in results.items()}
+        )
+        BUDGET_PATH.write_text(
+            json.dumps(budget, indent=2, sort_keys=True) + "\n", encoding="utf-8"
+        )
+        print(f"已更新預算: {BUDGET_PATH}")
+    elif over_budget:
+        print(f"錯誤：冷啟動超過預算: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
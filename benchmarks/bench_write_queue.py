@@ -0,0 +1,127 @@
+"""
+背景寫入佇列基準測試。
+
+以 data/announcements.json 中的每個公告模擬 AnnouncementItemPipeline 的逐筆
+寫入：在 asyncio 事件迴圈中每筆 item 之間讓出一次，同時以固定間隔的計時器
+量測事件迴圈被阻塞的時間（與 ReactorStallMonitor 相同的量法；lag ms 為所有
+延遲的總和，stalls 為延遲達 20 ms 的次數）。比較
+WRITE_QUEUE_WORKERS 為 0（在事件迴圈中直接寫入）與背景執行緒寫入，並檢查
+兩種做法寫出的檔案相同。
+
+--fsync_ms 可在每次 fsync 前額外等待，模擬忙碌的磁碟。
+
+用法：
+    python benchmarks/bench_write_queue.py --data_folder data --workers 0 2 4
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from nthu_scraper.utils.histogram import Log2Histogram  # noqa: E402
+from nthu_scraper.utils.write_queue import WriteQueue  # noqa: E402
+
+INTERVAL = 0.005
+THRESHOLD_MS = 20
+
+
+async def probe(lag: Log2Histogram, stalls: List[float], stop: asyncio.Event) -> None:
+    """每 INTERVAL 秒醒來一次，記錄比預期晚醒來的毫秒數。"""
+    while not stop.is_set():
+        expected = time.monotonic() + INTERVAL
+        await asyncio.sleep(INTERVAL)
+        lag_ms = max(0.0, (time.monotonic() - expected) * 1000)
+        lag.record(lag_ms)
+        if lag_ms >= THRESHOLD_MS:
+            stalls.append(lag_ms)
+
+
+async def run(items: List[Dict[str, Any]], workers: int, folder: Path) -> dict:
+    lag = Log2Histogram()
+    stalls: List[float] = []
+    stop = asyncio.Event()
+    monitor = asyncio.create_task(probe(lag, stalls, stop))
+    queue = WriteQueue(workers)
+    start = time.perf_counter()
+    for index, item in enumerate(items):
+        queue.submit_json(item, folder / str(index % 16) / f"{index}.json")
+        await asyncio.sleep(0)
+    submitted = time.perf_counter() - start
+    while queue.depth:
+        await asyncio.sleep(INTERVAL)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    queue.close()
+    return {
+        "submit_s": submitted,
+        "total_s": elapsed,
+        "stalls": len(stalls),
+        "lag_ms": lag.total,
+        "max_lag_ms": lag.maximum,
+    }
+
+
+def digest(folder: Path) -> str:
+    h = hashlib.sha256()
+    for path in sorted(folder.rglob("*.json")):
+        h.update(str(path.relative_to(folder)).encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="背景寫入佇列基準測試")
+    parser.add_argument("--data_folder", type=str, default="data")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--fsync_ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    source = Path(args.data_folder) / "announcements.json"
+    if not source.exists():
+        print(f"錯誤：找不到 {source}")
+        sys.exit(1)
+    items = json.loads(source.read_bytes())
+
+    if args.fsync_ms:
+        real_fsync = os.fsync
+
+        def slow_fsync(fd: int) -> None:
+            time.sleep(args.fsync_ms / 1000)
+            real_fsync(fd)
+
+        os.fsync = slow_fsync
+
+    header = (
+        f"{'workers':>8}{'submit s':>10}{'total s':>10}{'stalls':>8}"
+        f"{'lag ms':>10}{'max lag ms':>12}  identical"
+    )
+    print(f"{len(items)} items, fsync +{args.fsync_ms} ms")
+    print(header)
+    print("-" * len(header))
+    digests = []
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = asyncio.run(run(items, workers, Path(tmp)))
+            digests.append(digest(Path(tmp)))
+        print(
+            f"{workers:>8}{result['submit_s']:>10.2f}{result['total_s']:>10.2f}"
+            f"{result['stalls']:>8}{result['lag_ms']:>10.0f}"
+            f"{result['max_lag_ms']:>12.1f}"
+            f"  {digests[-1] == digests[0]}"
+        )
+    if len(set(digests)) > 1:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,391 @@
+# Define here the extensions for your project
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/extensions.html
+
+import asyncio
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from nthu_scraper.utils.file_utils import dataset_cache, save_json, write_stats_for
+from nthu_scraper.utils.histogram import Log2Histogram
+from nthu_scraper.utils.json_codec import set_default_codec
+from nthu_scraper.utils.write_queue import WriteQueue
+
+
+class JsonCodecSetting:
+    """
+    依 JSON_CODEC 設定切換 load_json / save_json 使用的 JSON codec。
+    """
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        codec = set_default_codec(crawler.settings.get("JSON_CODEC", "stdlib"))
+        crawler.stats.set_value("json_codec", codec.name)
+        return cls()
+
+
+class DataFileStats:
+    """
+    將 file_utils 的寫入統計（實際寫入 / 內容未變而略過）與資料集讀取快取的
+    命中統計記錄到 spider stats。
+
+    寫入統計取自 write_stats_for(crawler)，只計入此 crawler 的 pipeline 與
+    spider 寫入時傳入的統計，同一行程中同時執行的其他 spider 不會混入；
+    統計前先等待 WriteQueueService 的背景寫入完成（見 flush_writes）。
+    讀取快取由同一行程內的所有 spider 共用，記錄的是整個行程的累計值。
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.write_stats = write_stats_for(crawler)
+        self._baseline = self.write_stats.snapshot()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        ext = cls(crawler)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        self._baseline = self.write_stats.snapshot()
+
+    async def spider_closed(self, spider, reason):
+        await flush_writes(self.crawler)
+        current = self.write_stats.snapshot()
+        delta = {key: value - self._baseline[key] for key, value in current.items()}
+        for key, value in delta.items():
+            self.stats.set_value(f"data_files/{key}", value)
+        spider.logger.info(
+            f"檔案寫入統計: 寫入 {delta['files_written']} 個，"
+            f"內容未變略過 {delta['files_skipped']} 個"
+        )
+
+        for key, value in dataset_cache.stats().items():
+            self.stats.set_value(f"dataset_cache/{key}", value)
+
+
+class WriteQueueService:
+    """
+    讓 pipeline 與 spider 共用的背景檔案寫入服務（見 utils/write_queue）。
+
+    呼叫端在 reactor 中序列化資料後提交，開檔與寫入都在 WRITE_QUEUE_WORKERS
+    個執行緒中完成。排隊與寫入中的路徑數達 WRITE_QUEUE_HIGH_WATER 時暫停
+    engine（不再送出新的請求），降到 WRITE_QUEUE_LOW_WATER 以下再繼續。
+    pipeline 應在 close_spider 中 await flush()，確保 spider 結束前所有寫入
+    都已完成；WRITE_QUEUE_WORKERS 為 0 時在 reactor 中直接寫入。
+    """
+
+    def __init__(self, crawler, max_workers: int, high_water: int, low_water: int):
+        self.crawler = crawler
+        self.high_water = high_water
+        self.low_water = low_water
+        self.queue = WriteQueue(
+            max_workers, on_done=self._on_done, write_stats=write_stats_for(crawler)
+        )
+        self._drain_waiters: List[asyncio.Future] = []
+        self._paused_at: Optional[float] = None
+        self.backpressure_pauses = 0
+        self.backpressure_seconds = 0.0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        ext = cls(
+            crawler,
+            settings.getint("WRITE_QUEUE_WORKERS", 2),
+            settings.getint("WRITE_QUEUE_HIGH_WATER", 64),
+            settings.getint("WRITE_QUEUE_LOW_WATER", 16),
+        )
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    @classmethod
+    def of(cls, crawler) -> "WriteQueueService":
+        """取得 crawler 已啟用的 WriteQueueService。"""
+        for extension in crawler.extensions.middlewares:
+            if isinstance(extension, cls):
+                return extension
+        raise NotConfigured("WriteQueueService extension 未啟用")
+
+    def save_json(self, data: Any, file_path: Path, indent: Optional[int] = 4) -> None:
+        """序列化資料並提交寫入，輸出與 save_json 相同。"""
+        self.queue.submit_json(data, file_path, indent)
+        self._check_backpressure()
+
+    def write_bytes(self, body: bytes, file_path: Path) -> None:
+        """提交寫入原始位元組（例如下載的圖片）。"""
+        self.queue.submit(file_path, (body,))
+        self._check_backpressure()
+
+    async def flush(self) -> None:
+        """等待所有已提交的寫入完成，不阻塞 reactor。"""
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._drain_waiters.append(waiter)
+        self._wake()
+        await waiter
+        self.crawler.stats.max_value(
+            "write_queue/flush_ms", round((time.perf_counter() - started) * 1000, 3)
+        )
+
+    def _check_backpressure(self) -> None:
+        engine = self.crawler.engine
+        if (
+            self._paused_at is None
+            and engine is not None
+            and self.queue.depth >= self.high_water
+        ):
+            engine.pause()
+            self._paused_at = time.monotonic()
+            self.backpressure_pauses += 1
+            # 暫停前背景寫入可能已全部完成，立即再檢查一次
+            self._wake()
+
+    def _on_done(self) -> None:
+        """背景執行緒寫完一個路徑時呼叫；只有需要時才通知 reactor。"""
+        if self._paused_at is not None or self._drain_waiters:
+            from twisted.internet import reactor
+
+            reactor.callFromThread(self._wake)
+
+    def _wake(self) -> None:
+        depth = self.queue.depth
+        if self._paused_at is not None and depth <= self.low_water:
+            self.backpressure_seconds += time.monotonic() - self._paused_at
+            self._paused_at = None
+            engine = self.crawler.engine
+            engine.unpause()
+            # 立即排程下一個請求，不必等 engine 的 heartbeat（5 秒）
+            slot = getattr(engine, "_slot", None)
+            if slot is not None:
+                slot.nextcall.schedule()
+        if depth == 0 and self._drain_waiters:
+            waiters, self._drain_waiters = self._drain_waiters, []
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def settle(self) -> None:
+        """
+        讓出一次事件迴圈後等待所有已提交的寫入完成。
+
+        spider_closed 的所有接收者同時開始執行，與 EXTENSIONS 的順序無關；
+        先讓出一次，其他接收者（例如 Spider.closed）同步提交的寫入才會在
+        等待前排入佇列。
+        """
+        await asyncio.sleep(0)
+        await self.flush()
+
+    async def spider_closed(self, spider, reason):
+        # 不阻塞 reactor（同一個 process 中可能還有其他 spider 在執行）
+        await self.settle()
+        self.queue.close(wait=False)
+        stats = self.queue.stats
+        for key, value in (
+            ("workers", self.queue.max_workers),
+            ("submitted", stats.submitted),
+            ("coalesced", stats.coalesced),
+            ("written", stats.written),
+            ("skipped", stats.skipped),
+            ("failed", stats.failed),
+            ("bytes_submitted", stats.bytes_submitted),
+            ("max_depth", stats.max_depth),
+            ("backpressure_pauses", self.backpressure_pauses),
+            ("backpressure_ms", round(self.backpressure_seconds * 1000, 3)),
+        ):
+            self.crawler.stats.set_value(f"write_queue/{key}", value)
+        for file_path, error in stats.errors:
+            spider.logger.error(f"❌ 背景寫入失敗 '{file_path}': {error}")
+
+
+async def flush_writes(crawler) -> None:
+    """在讀取寫入統計前等待 WriteQueueService 的寫入完成，未啟用時直接返回。"""
+    for extension in crawler.extensions.middlewares:
+        if isinstance(extension, WriteQueueService):
+            await extension.settle()
+
+
+class ReactorStallMonitor:
+    """
+    量測 reactor 被阻塞的時間。
+
+    每 REACTOR_STALL_INTERVAL 秒排程一次計時器，觸發時間比預期晚的部分即為
+    reactor 無法處理事件（例如 callback 或 pipeline 中的同步磁碟 I/O）的時間。
+    延遲達 REACTOR_STALL_THRESHOLD_MS 毫秒視為一次阻塞，記錄次數與總時間；
+    所有延遲另以 log2 直方圖彙整百分位數。結果記錄於 reactor/* stats，可
+    比較 WRITE_QUEUE_WORKERS 為 0（在 reactor 中寫入）與背景寫入的差異。
+    """
+
+    def __init__(self, stats, interval: float, threshold_ms: float):
+        self.stats = stats
+        self.interval = interval
+        self.threshold_ms = threshold_ms
+        self.lag = Log2Histogram()
+        self.stalls = 0
+        self.stall_ms = 0.0
+        self._expected = 0.0
+        self._call = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("REACTOR_STALL_MONITOR_ENABLED"):
+            raise NotConfigured
+        ext = cls(
+            crawler.stats,
+            settings.getfloat("REACTOR_STALL_INTERVAL", 0.05),
+            settings.getfloat("REACTOR_STALL_THRESHOLD_MS", 20),
+        )
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def _schedule(self) -> None:
+        from twisted.internet import reactor
+
+        self._expected = time.monotonic() + self.interval
+        self._call = reactor.callLater(self.interval, self._tick)
+
+    def _tick(self) -> None:
+        lag_ms = max(0.0, (time.monotonic() - self._expected) * 1000)
+        self.lag.record(lag_ms)
+        if lag_ms >= self.threshold_ms:
+            self.stalls += 1
+            self.stall_ms += lag_ms
+        self._schedule()
+
+    def spider_opened(self, spider):
+        self._schedule()
+
+    def spider_closed(self, spider, reason):
+        if self._call is not None and self._call.active():
+            self._call.cancel()
+        self._call = None
+        for key, value in (
+            ("checks", self.lag.count),
+            ("stalls", self.stalls),
+            ("stall_ms", round(self.stall_ms, 3)),
+            ("max_lag_ms", round(self.lag.maximum, 3)),
+            ("lag_p99_ms", round(self.lag.percentile(0.99), 3)),
+        ):
+            self.stats.set_value(f"reactor/{key}", value)
+
+
+def callback_name(request) -> str:
+    """取得請求 callback 的名稱，未指定時為 parse。"""
+    callback = getattr(request, "callback", None)
+    return getattr(callback, "__name__", None) or "parse"
+
+
+class CrawlInstrumentation:
+    """
+    以 log2 直方圖記錄每個 spider、每個 callback 的熱路徑統計。
+
+    - download_latency_ms / playwright_latency_ms：下載（或 Playwright 渲染）延遲
+    - response_bytes：回應大小
+    - callback_cpu_ms、items_per_response：由 InstrumentationSpiderMiddleware 記錄
+    - pipeline_ms：item 從 callback 產出到通過所有 pipeline 的經過時間，依 item 類別
+    - bytes_written：每個 callback 透過 file_utils 寫入的位元組數；其餘寫入
+      （pipeline 的 process_item 與 close_spider）合計為 pipelines
+
+    結束時寫入 <INSTRUMENTATION_DIR>/<spider 名稱>.json，供 workflow 封存比較。
+    """
+
+    def __init__(self, crawler, output_dir: Path):
+        self.crawler = crawler
+        self.output_dir = output_dir
+        self.histograms: Dict[str, Dict[str, Log2Histogram]] = defaultdict(
+            lambda: defaultdict(Log2Histogram)
+        )
+        self._pending_items: Dict[int, Tuple[Any, float]] = {}
+        self.write_stats = write_stats_for(crawler)
+        self._write_baseline = self.write_stats.snapshot()
+        self._recorded_bytes = 0
+        self.started_at = datetime.now()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("INSTRUMENTATION_ENABLED"):
+            raise NotConfigured
+        ext = cls(crawler, Path(crawler.settings.get("INSTRUMENTATION_DIR")))
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        for signal in (signals.item_scraped, signals.item_dropped, signals.item_error):
+            crawler.signals.connect(ext.item_finished, signal=signal)
+        return ext
+
+    def record(self, metric: str, key: str, value: float) -> None:
+        self.histograms[metric][key].record(value)
+
+    def record_written(self, key: str, written: int) -> None:
+        """記錄一段期間內透過 file_utils 寫入的位元組數。"""
+        if written:
+            self.record("bytes_written", key, written)
+            self._recorded_bytes += written
+
+    def spider_opened(self, spider):
+        self.started_at = datetime.now()
+        self._write_baseline = self.write_stats.snapshot()
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get("download_latency")
+        if latency is None or "cached" in response.flags:
+            return
+        callback = callback_name(request)
+        metric = (
+            "playwright_latency_ms"
+            if request.meta.get("playwright")
+            else "download_latency_ms"
+        )
+        self.record(metric, callback, latency * 1000)
+        self.record("response_bytes", callback, len(response.body))
+
+    def item_started(self, item) -> None:
+        self._pending_items[id(item)] = (item, time.perf_counter())
+
+    def item_finished(self, item, **kwargs):
+        pending = self._pending_items.pop(id(item), None)
+        if pending is not None and pending[0] is item:
+            self.record(
+                "pipeline_ms",
+                type(item).__name__,
+                (time.perf_counter() - pending[1]) * 1000,
+            )
+
+    async def spider_closed(self, spider, reason):
+        await flush_writes(self.crawler)
+        self._pending_items.clear()
+        total_written = (
+            self.write_stats.snapshot()["bytes_written"]
+            - self._write_baseline["bytes_written"]
+        )
+        self.record_written("pipelines", total_written - self._recorded_bytes)
+
+        report = {
+            "spider": spider.name,
+            "reason": reason,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "histograms": {
+                metric: {key: hist.to_dict() for key, hist in sorted(by_key.items())}
+                for metric, by_key in sorted(self.histograms.items())
+            },
+            "stats": {
+                key: value
+                for key, value in sorted(self.crawler.stats.get_stats().items())
+                if isinstance(value, (int, float, str))
+            },
+        }
+        output_file = self.output_dir / f"{spider.name}.json"
+        if save_json(report, output_file, indent=2):
+            self.crawler.stats.set_value("instrumentation/report", str(output_file))
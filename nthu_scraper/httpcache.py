@@ -0,0 +1,120 @@
+# HTTP cache storage and policy for the nthu_scraper project
+#
+# See documentation in:
+# https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
+
+import gzip
+import sqlite3
+from pathlib import Path
+from time import time
+from typing import Optional
+
+from scrapy.extensions.httpcache import DummyPolicy
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+
+class SqliteCacheStorage:
+    """
+    以單一 SQLite 檔案保存 HTTP 快取的 storage。
+
+    每個 spider 一個檔案（<HTTPCACHE_DIR>/<spider 名稱>.sqlite），以請求指紋為
+    主鍵，取代 FilesystemCacheStorage 每個回應一個資料夾、多個小檔案的做法。
+    storage 本身不判斷是否過期，只在 request.meta["cache_timestamp"] 記錄
+    儲存時間，交由 FreshnessPolicy 決定。
+    """
+
+    def __init__(self, settings):
+        self.cachedir = Path(data_path(settings["HTTPCACHE_DIR"], createdir=True))
+        self.use_gzip = settings.getbool("HTTPCACHE_GZIP")
+        self.db: Optional[sqlite3.Connection] = None
+
+    def open_spider(self, spider):
+        dbpath = self.cachedir / f"{spider.name}.sqlite"
+        self.db = sqlite3.connect(str(dbpath))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " fingerprint TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " status INTEGER NOT NULL,"
+            " headers BLOB NOT NULL,"
+            " body BLOB NOT NULL,"
+            " gzipped INTEGER NOT NULL,"
+            " timestamp REAL NOT NULL)"
+        )
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        spider.logger.debug(f"使用 SQLite HTTP 快取: {dbpath}")
+
+    def close_spider(self, spider):
+        self.db.commit()
+        self.db.close()
+        self.db = None
+
+    def retrieve_response(self, spider, request):
+        key = self._fingerprinter.fingerprint(request).hex()
+        row = self.db.execute(
+            "SELECT url, status, headers, body, gzipped, timestamp"
+            " FROM responses WHERE fingerprint = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None  # not cached
+
+        url, status, raw_headers, body, gzipped, timestamp = row
+        if gzipped:
+            body = gzip.decompress(body)
+        headers = Headers(headers_raw_to_dict(raw_headers))
+        request.meta["cache_timestamp"] = timestamp
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        key = self._fingerprinter.fingerprint(request).hex()
+        body = gzip.compress(response.body, mtime=0) if self.use_gzip else response.body
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                response.url,
+                response.status,
+                headers_dict_to_raw(response.headers),
+                body,
+                int(self.use_gzip),
+                time(),
+            ),
+        )
+        self.db.commit()
+
+
+class FreshnessPolicy(DummyPolicy):
+    """
+    依 spider 自訂的新鮮度判斷快取是否可直接使用的 policy。
+
+    每個 spider 以 custom_settings 的 HTTPCACHE_EXPIRATION_SECS 宣告快取
+    有效秒數（0 表示永不過期），單一請求可用 meta["httpcache_expiration"]
+    覆寫。過期的快取會重新下載；304 回應一律不寫入快取，交由
+    ConditionalGetMiddleware 的「未變更」流程處理。
+    """
+
+    def __init__(self, settings):
+        super().__init__(settings)
+        self.expiration_secs = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+
+    def should_cache_response(self, response, request):
+        return response.status != 304 and super().should_cache_response(
+            response, request
+        )
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        max_age = request.meta.get("httpcache_expiration", self.expiration_secs)
+        if max_age <= 0:
+            return True
+        return time() - request.meta.get("cache_timestamp", 0) <= max_age
+
+    def is_cached_response_valid(self, cachedresponse, response, request):
+        # ConditionalGetMiddleware 發出的條件式請求由其自行處理 304
+        return response.status == 304 and not request.meta.get("conditional_get")
@@ -3,101 +3,745 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
-from scrapy import signals
+import time
+from collections.abc import AsyncIterable, Awaitable, Coroutine, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
 
-# useful for handling different item types with a single interface
-from itemadapter import is_item, ItemAdapter
+from scrapy import Request, signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.misc import arg_to_iter
+from scrapy.utils.project import data_path
 
+from nthu_scraper.extensions import CrawlInstrumentation, callback_name
+from nthu_scraper.utils.file_utils import (
+    WriteStats,
+    load_json,
+    save_json,
+    track_writes,
+    write_stats_for,
+)
 
-class NthuScraperSpiderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the spider middleware does not modify the
-    # passed objects.
+
+class _TimedCallback:
+    """
+    包裝 callback，量測其 CPU 時間、產生的 item 數與寫入的位元組數。
+
+    callback 為 generator 或 async generator 時逐步量測每次取得下一個輸出，
+    不包含 item 交給 pipeline 或其他 middleware 處理的時間；callback 為
+    async def 時只量測 coroutine 本身每一步執行的時間，不包含等待期間
+    事件迴圈執行其他工作的時間，並在 coroutine 完成後計算其回傳的輸出。
+
+    CPU 時間以 time.thread_time() 量測，寫入量以 track_writes 只計入
+    callback 在 reactor 執行緒中的寫入，因此 WriteQueue 的背景寫入、
+    process pool 與同時執行的其他 spider 都不會算進來。
+    """
+
+    def __init__(self, callback: Callable, name: str, instrumentation):
+        self.callback = callback
+        self.__name__ = name
+        self.instrumentation = instrumentation
+        self.cpu = 0.0
+        self.writes = WriteStats()
+        self.items = 0
+
+    def _step(self, func: Callable, *args, **kwargs):
+        cpu_start = time.thread_time()
+        try:
+            with track_writes(self.writes):
+                return func(*args, **kwargs)
+        finally:
+            self.cpu += time.thread_time() - cpu_start
+
+    def _count(self, output) -> None:
+        if not isinstance(output, Request):
+            self.items += 1
+            self.instrumentation.item_started(output)
+
+    def _finish(self) -> None:
+        self.instrumentation.record("callback_cpu_ms", self.__name__, self.cpu * 1000)
+        self.instrumentation.record("items_per_response", self.__name__, self.items)
+        self.instrumentation.record_written(self.__name__, self.writes.bytes_written)
+
+    def __call__(self, response, **kwargs):
+        result = self._step(self.callback, response, **kwargs)
+        if isinstance(result, Coroutine):
+            return self._await(result)
+        return self._wrap(result)
+
+    def _wrap(self, result):
+        """依 callback 回傳值的型別包裝或直接計算其輸出。"""
+        if isinstance(result, Iterator):
+            return self._iterate(result)
+        if isinstance(result, AsyncIterable):
+            return self._aiterate(result)
+        for output in arg_to_iter(result):
+            self._count(output)
+        self._finish()
+        return result
+
+    def _timed_await(self, awaitable: Awaitable):
+        """
+        await awaitable，只把它本身每一步的執行時間計入 callback。
+
+        在 awaitable 暫停（交出 future 給事件迴圈）與恢復之間經過的時間
+        不計入，因此不會把同時處理其他回應的時間算進來。
+        """
+        steps = awaitable.__await__()
+        value, error = None, None
+        while True:
+            try:
+                if error is None:
+                    yielded = self._step(steps.send, value)
+                else:
+                    yielded = self._step(steps.throw, error)
+            except StopIteration as stop:
+                return stop.value
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+    async def _await(self, coroutine: Coroutine):
+        try:
+            result = await _Timed(self._timed_await(coroutine))
+        except BaseException:
+            self._finish()
+            raise
+        return self._wrap(result)
+
+    def _iterate(self, iterator: Iterator):
+        try:
+            while True:
+                try:
+                    output = self._step(next, iterator)
+                except StopIteration:
+                    return
+                self._count(output)
+                yield output
+        finally:
+            self._finish()
+
+    async def _aiterate(self, iterable: AsyncIterable):
+        iterator = iterable.__aiter__()
+        try:
+            while True:
+                try:
+                    output = await _Timed(self._timed_await(iterator.__anext__()))
+                except StopAsyncIteration:
+                    return
+                self._count(output)
+                yield output
+        finally:
+            self._finish()
+
+
+class _Timed:
+    """將 _TimedCallback._timed_await 產生的 generator 包裝成 awaitable。"""
+
+    def __init__(self, steps):
+        self.steps = steps
+
+    def __await__(self):
+        return self.steps
+
+
+class InstrumentationSpiderMiddleware:
+    """
+    將每個回應的 callback 換成 _TimedCallback，量測 callback 本身的成本。
+
+    直接包裝 callback 而不是量測 process_spider_output，才不會把 Scrapy
+    在呼叫 callback 前後處理其他回應、item 的時間算進來；結果交給
+    CrawlInstrumentation extension 彙整。
+    """
+
+    def __init__(self, crawler, instrumentation: CrawlInstrumentation):
+        self.crawler = crawler
+        self.instrumentation = instrumentation
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        for extension in crawler.extensions.middlewares:
+            if isinstance(extension, CrawlInstrumentation):
+                return cls(crawler, extension)
+        raise NotConfigured("CrawlInstrumentation extension 未啟用")
+
+    def process_spider_input(self, response):
+        request = response.request
+        if request is not None and not isinstance(request.callback, _TimedCallback):
+            callback = request.callback or self.crawler.spider.parse
+            request.callback = _TimedCallback(
+                callback, callback_name(request), self.instrumentation
+            )
+        return None
+
+
+class ConditionalGetMiddleware:
+    """
+    以 ETag / Last-Modified 發送條件式請求的 downloader middleware。
+
+    每個 spider 的驗證資訊存放在 <專案資料夾>/.scrapy/<CONDITIONAL_GET_DIR>/
+    <spider 名稱>.json，以 URL 為鍵。下次請求同一 URL 時附上
+    If-None-Match / If-Modified-Since；伺服器回傳 304 時，改由「未變更」
+    callback 處理回應，並在 response.flags 加上 "not_modified"。
+
+    未變更 callback 依序取自 request.meta["not_modified_callback"]
+    （callable 或 spider 方法名稱）與 spider.parse_not_modified；兩者皆無、
+    Playwright 請求，或 meta 含 dont_conditional_get 時不發送條件式請求。
+
+    收到 200 回應時先移除該 URL 舊的驗證資訊，新的驗證資訊暫存在
+    request.meta["conditional_get_pending"]，由 ConditionalGetCommitMiddleware
+    在 callback 成功完成後才記錄；callback 拋出例外，或自行處理錯誤後設定
+    response.meta["conditional_get_failed"] 時不記錄，下次執行會重新下載，
+    而不是以 304 沿用失敗時留下的輸出。
+    """
+
+    def __init__(self, crawler, store_dir: Path):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.store_dir = store_dir
+        self.store_path: Optional[Path] = None
+        self.validators: Dict[str, Dict[str, Any]] = {}
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
+        if not crawler.settings.getbool("CONDITIONAL_GET_ENABLED"):
+            raise NotConfigured
+        store_dir = Path(
+            data_path(crawler.settings.get("CONDITIONAL_GET_DIR"), createdir=True)
+        )
+        s = cls(crawler, store_dir)
         crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
         return s
 
-    def process_spider_input(self, response, spider):
-        # Called for each response that goes through the spider
-        # middleware and into the spider.
+    def spider_opened(self, spider):
+        self.store_path = self.store_dir / f"{spider.name}.json"
+        if self.store_path.exists():
+            self.validators = load_json(self.store_path) or {}
+        spider.logger.info(
+            f"條件式請求: 載入 {len(self.validators)} 筆驗證資訊 ({self.store_path})"
+        )
+
+    def spider_closed(self, spider, reason):
+        requests = self.stats.get_value("conditional_get/requests", 0)
+        not_modified = self.stats.get_value("conditional_get/not_modified", 0)
+        if requests:
+            self.stats.set_value(
+                "conditional_get/not_modified_ratio", round(not_modified / requests, 4)
+            )
+        if self.store_path is not None and (
+            self.validators or self.store_path.exists()
+        ):
+            save_json(
+                self.validators,
+                self.store_path,
+                indent=2,
+                stats=write_stats_for(self.crawler),
+            )
+
+    def _not_modified_callback(self, request, spider) -> Optional[Callable]:
+        callback = request.meta.get("not_modified_callback")
+        if isinstance(callback, str):
+            return getattr(spider, callback)
+        return callback or getattr(spider, "parse_not_modified", None)
 
-        # Should return None or raise an exception.
+    def _is_eligible(self, request, spider) -> bool:
+        return (
+            request.method == "GET"
+            and not request.meta.get("playwright")
+            and not request.meta.get("dont_conditional_get")
+            and self._not_modified_callback(request, spider) is not None
+        )
+
+    def process_request(self, request):
+        if not self._is_eligible(request, self.crawler.spider):
+            if request.meta.pop("conditional_get", False):
+                # 由條件式請求複製而來的重試請求，移除先前附上的驗證標頭
+                request.headers.pop("If-None-Match", None)
+                request.headers.pop("If-Modified-Since", None)
+            return None
+        entry = self.validators.get(request.url)
+        if not entry:
+            return None
+
+        if entry.get("etag"):
+            request.headers.setdefault("If-None-Match", entry["etag"])
+        if entry.get("last_modified"):
+            request.headers.setdefault("If-Modified-Since", entry["last_modified"])
+        request.meta["handle_httpstatus_list"] = [
+            *request.meta.get("handle_httpstatus_list", []),
+            304,
+        ]
+        request.meta["conditional_get"] = True
+        self.stats.inc_value("conditional_get/requests")
         return None
 
-    def process_spider_output(self, response, result, spider):
-        # Called with the results returned from the Spider, after
-        # it has processed the response.
+    def process_response(self, request, response):
+        spider = self.crawler.spider
+        if not self._is_eligible(request, spider):
+            return response
+
+        if response.status == 304 and (
+            b"If-None-Match" in request.headers
+            or b"If-Modified-Since" in request.headers
+        ):
+            entry = self.validators.get(request.url, {})
+            self.stats.inc_value("conditional_get/not_modified")
+            self.stats.inc_value("conditional_get/bytes_avoided", entry.get("size", 0))
+            callback = self._not_modified_callback(request, spider)
+            return response.replace(
+                flags=[*response.flags, "not_modified"],
+                request=request.replace(callback=callback),
+            )
 
-        # Must return an iterable of Request, or item objects.
-        for i in result:
-            yield i
+        if response.status == 200:
+            self.validators.pop(request.url, None)
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                request.meta["conditional_get_pending"] = {
+                    "etag": etag.decode("latin-1") if etag else None,
+                    "last_modified": (
+                        last_modified.decode("latin-1") if last_modified else None
+                    ),
+                    "size": len(response.body),
+                }
+        return response
 
-    def process_spider_exception(self, response, exception, spider):
-        # Called when a spider or process_spider_input() method
-        # (from other spider middleware) raises an exception.
+    def commit(self, response) -> None:
+        """callback 處理完回應後，記錄或捨棄暫存的驗證資訊。"""
+        entry = response.meta.pop("conditional_get_pending", None)
+        if entry is None:
+            return
+        if response.meta.get("conditional_get_failed"):
+            self.stats.inc_value("conditional_get/validators_discarded")
+            return
+        self.validators[response.url] = entry
+        self.stats.inc_value("conditional_get/validators_stored")
 
-        # Should return either None or an iterable of Request or item objects.
-        pass
 
-    def process_start_requests(self, start_requests, spider):
-        # Called with the start requests of the spider, and works
-        # similarly to the process_spider_output() method, except
-        # that it doesn’t have a response associated.
+class ConditionalGetCommitMiddleware:
+    """
+    在 callback 成功完成後，記錄 ConditionalGetMiddleware 暫存的驗證資訊。
 
-        # Must return only requests (not items).
-        for r in start_requests:
-            yield r
+    callback 的輸出全部產生完才記錄；callback 拋出例外時不會走到這裡，
+    驗證資訊因此不會被記錄。
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self._conditional_get: Optional[ConditionalGetMiddleware] = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CONDITIONAL_GET_ENABLED"):
+            raise NotConfigured
+        return cls(crawler)
+
+    def _commit(self, response) -> None:
+        if "conditional_get_pending" not in response.meta:
+            return
+        if self._conditional_get is None:
+            # downloader middleware 在 engine 建立後才能取得
+            for mw in self.crawler.engine.downloader.middleware.middlewares:
+                if isinstance(mw, ConditionalGetMiddleware):
+                    self._conditional_get = mw
+                    break
+            else:
+                return
+        self._conditional_get.commit(response)
+
+    def process_spider_output(self, response, result):
+        yield from result
+        self._commit(response)
+
+    async def process_spider_output_async(self, response, result):
+        async for output in result:
+            yield output
+        self._commit(response)
 
-    def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
 
+@dataclass
+class _ConcurrencyWindow:
+    """單一下載 slot 的 AIMD 併發視窗"""
 
-class NthuScraperDownloaderMiddleware:
-    # Not all methods need to be defined. If a method is not defined,
-    # scrapy acts as if the downloader middleware does not modify the
-    # passed objects.
+    value: float
+    limit: int
+    peak: int = 0
+    decreases: int = 0
+    since_decrease: int = 0
+
+
+@dataclass
+class _EndpointStats:
+    """單一主機或 IP 的回應統計"""
+
+    responses: int = 0
+    errors: int = 0
+    bytes: int = 0
+    latency: float = 0.0
+    first_seen: float = 0.0
+    last_seen: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed = self.last_seen - self.first_seen
+        return {
+            "responses": self.responses,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "avg_latency": (
+                round(self.latency / self.responses, 3) if self.responses else None
+            ),
+            "responses_per_sec": (
+                round(self.responses / elapsed, 2) if elapsed > 0 else None
+            ),
+        }
+
+
+class AdaptiveConcurrencyMiddleware:
+    """
+    依回應延遲與錯誤率，以 AIMD 方式調整每個下載 slot 併發數的 middleware。
+
+    每個 slot 維護一個併發視窗：回應延遲不超過
+    ADAPTIVE_CONCURRENCY_TARGET_LATENCY 時，每收到一輪（視窗大小個）回應
+    視窗加一；延遲超過目標兩倍、收到 429 / 5xx 或下載失敗時，視窗乘上
+    ADAPTIVE_CONCURRENCY_BACKOFF，且每輪至多減少一次。
+
+    ADAPTIVE_CONCURRENCY_GROUPS 中的網域（例如 site.nthu.edu.tw 底下共用
+    同一個 rpage 後端的各單位網站）會合併為同一個 slot，群組設定值即為
+    整個後端的併發上限。結束時將每個 slot、主機與 IP 的統計寫入 stats。
+    IP 統計只用於觀察：下載 slot 以主機（或群組）為單位，併發數不依 IP
+    調整。
+    """
+
+    ERROR_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.start = settings.getint("ADAPTIVE_CONCURRENCY_START")
+        self.minimum = settings.getint("ADAPTIVE_CONCURRENCY_MIN")
+        self.maximum = settings.getint("ADAPTIVE_CONCURRENCY_MAX")
+        self.target_latency = settings.getfloat("ADAPTIVE_CONCURRENCY_TARGET_LATENCY")
+        self.backoff = settings.getfloat("ADAPTIVE_CONCURRENCY_BACKOFF")
+        self.groups: Dict[str, int] = settings.getdict("ADAPTIVE_CONCURRENCY_GROUPS")
+        self.windows: Dict[str, _ConcurrencyWindow] = {}
+        self.hosts: Dict[str, _EndpointStats] = {}
+        self.ips: Dict[str, _EndpointStats] = {}
 
     @classmethod
     def from_crawler(cls, crawler):
-        # This method is used by Scrapy to create your spiders.
-        s = cls()
-        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        if not crawler.settings.getbool("ADAPTIVE_CONCURRENCY_ENABLED"):
+            raise NotConfigured
+        s = cls(crawler)
+        crawler.signals.connect(
+            s.request_reached_downloader, signal=signals.request_reached_downloader
+        )
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
         return s
 
-    def process_request(self, request, spider):
-        # Called for each request that goes through the downloader
-        # middleware.
+    def _group_of(self, host: str) -> Optional[str]:
+        for domain in self.groups:
+            if host == domain or host.endswith("." + domain):
+                return domain
+        return None
+
+    def _window(self, key: str) -> _ConcurrencyWindow:
+        window = self.windows.get(key)
+        if window is None:
+            limit = self.groups.get(key, self.maximum)
+            value = max(self.minimum, min(self.start, limit))
+            # since_decrease 從一輪開始，新 slot 第一輪就失敗時也能立即減少
+            window = _ConcurrencyWindow(
+                value=value, limit=limit, peak=int(value), since_decrease=int(value)
+            )
+            self.windows[key] = window
+        return window
+
+    def _apply(self, key: str) -> None:
+        """將視窗大小套用到 Scrapy 的下載 slot"""
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot is not None:
+            slot.concurrency = int(self.windows[key].value)
+
+    def _record(self, request, response=None) -> None:
+        now = time.monotonic()
+        host = urlparse_cached(request).hostname or ""
+        endpoints = [self.hosts.setdefault(host, _EndpointStats(first_seen=now))]
+        ip_address = getattr(response, "ip_address", None)
+        if ip_address is not None:
+            endpoints.append(
+                self.ips.setdefault(str(ip_address), _EndpointStats(first_seen=now))
+            )
+        for endpoint in endpoints:
+            endpoint.last_seen = now
+            if response is None or response.status in self.ERROR_STATUSES:
+                endpoint.errors += 1
+            else:
+                endpoint.responses += 1
+                endpoint.bytes += len(response.body)
+                endpoint.latency += request.meta.get("download_latency", 0.0)
 
-        # Must either:
-        # - return None: continue processing this request
-        # - or return a Response object
-        # - or return a Request object
-        # - or raise IgnoreRequest: process_exception() methods of
-        #   installed downloader middleware will be called
+    def _increase(self, key: str) -> None:
+        window = self.windows[key]
+        window.since_decrease += 1
+        if window.value < window.limit:
+            window.value = min(window.limit, window.value + 1 / window.value)
+            window.peak = max(window.peak, int(window.value))
+            self._apply(key)
+
+    def _decrease(self, key: str) -> None:
+        window = self.windows[key]
+        window.since_decrease += 1
+        if window.value <= self.minimum or window.since_decrease < int(window.value):
+            return  # 已達下限，或同一輪已減少過
+        window.value = max(self.minimum, window.value * self.backoff)
+        window.decreases += 1
+        window.since_decrease = 0
+        self._apply(key)
+
+    def process_request(self, request):
+        host = urlparse_cached(request).hostname or ""
+        self.hosts.setdefault(host, _EndpointStats(first_seen=time.monotonic()))
+        group = self._group_of(host)
+        if group is not None:
+            request.meta.setdefault("download_slot", group)
         return None
 
-    def process_response(self, request, response, spider):
-        # Called with the response returned from the downloader.
+    def request_reached_downloader(self, request, spider):
+        key = request.meta.get("download_slot")
+        if key is not None:
+            self._window(key)
+            self._apply(key)
+
+    def process_response(self, request, response):
+        key = request.meta.get("download_slot")
+        if key not in self.windows or "cached" in response.flags:
+            return response
 
-        # Must either;
-        # - return a Response object
-        # - return a Request object
-        # - or raise IgnoreRequest
+        self._record(request, response)
+        latency = request.meta.get("download_latency", 0.0)
+        if response.status in self.ERROR_STATUSES or latency > 2 * self.target_latency:
+            self._decrease(key)
+        elif latency <= self.target_latency:
+            self._increase(key)
         return response
 
-    def process_exception(self, request, exception, spider):
-        # Called when a download handler or a process_request()
-        # (from other downloader middleware) raises an exception.
+    def process_exception(self, request, exception):
+        key = request.meta.get("download_slot")
+        if key not in self.windows or isinstance(exception, IgnoreRequest):
+            return None
+        self._record(request)
+        self._decrease(key)
+        return None
+
+    def spider_closed(self, spider, reason):
+        for key, window in self.windows.items():
+            self.stats.set_value(
+                f"adaptive_concurrency/slots/{key}",
+                {
+                    "concurrency": int(window.value),
+                    "peak": window.peak,
+                    "decreases": window.decreases,
+                },
+            )
+        for host, endpoint in self.hosts.items():
+            if endpoint.responses or endpoint.errors:
+                self.stats.set_value(
+                    f"adaptive_concurrency/hosts/{host}", endpoint.to_dict()
+                )
+        for ip, endpoint in self.ips.items():
+            self.stats.set_value(f"adaptive_concurrency/ips/{ip}", endpoint.to_dict())
+
+
+@dataclass
+class _Circuit:
+    """單一主機的斷路器狀態"""
+
+    failures: int = 0  # 連續失敗次數
+    open: bool = False
+    opened_at: float = float("-inf")  # time.monotonic()，-inf 表示可立即探測
+    probing: bool = False
+    requests: int = 0
+    retries: int = 0
+    skipped: int = 0
+    failed_secs: float = 0.0
+    failed_count: int = 0
+
+    @property
+    def avg_failure_secs(self) -> float:
+        return self.failed_secs / self.failed_count if self.failed_count else 0.0
 
-        # Must either:
-        # - return None: continue processing this exception
-        # - return a Response object: stops process_exception() chain
-        # - return a Request object: stops process_exception() chain
-        pass
+
+class CircuitBreakerMiddleware:
+    """
+    以主機為單位的斷路器與重試預算 downloader middleware。
+
+    同一主機連續 CIRCUIT_BREAKER_THRESHOLD 次逾時、連線失敗或 5xx 後斷路，
+    之後該主機的請求（包含 RetryMiddleware 的重試）直接以 IgnoreRequest
+    略過，不再佔用下載 slot。經過 CIRCUIT_BREAKER_COOLDOWN 秒後放行一個探測
+    請求：成功則恢復，失敗則重新計時。
+
+    重試另有預算：每個主機的重試次數不超過首次請求數的
+    CIRCUIT_BREAKER_RETRY_BUDGET 倍（至少 CIRCUIT_BREAKER_MIN_RETRIES 次），
+    避免少數不穩定的主機以重試佔滿佇列。
+
+    結束時仍斷路的主機記錄在 .scrapy/<CIRCUIT_BREAKER_DIR>/<spider 名稱>.json；
+    下次執行時這些主機一開始即為斷路狀態，只放行一個探測請求。
+    排在 HttpCacheMiddleware (900) 之後，已快取的回應不受影響。
+    """
+
+    def __init__(self, crawler, store_dir: Path):
+        settings = crawler.settings
+        self.stats = crawler.stats
+        self.threshold = settings.getint("CIRCUIT_BREAKER_THRESHOLD")
+        self.cooldown = settings.getfloat("CIRCUIT_BREAKER_COOLDOWN")
+        self.retry_budget = settings.getfloat("CIRCUIT_BREAKER_RETRY_BUDGET")
+        self.min_retries = settings.getint("CIRCUIT_BREAKER_MIN_RETRIES")
+        self.store_dir = store_dir
+        self.store_path: Optional[Path] = None
+        self.circuits: Dict[str, _Circuit] = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CIRCUIT_BREAKER_ENABLED"):
+            raise NotConfigured
+        store_dir = Path(
+            data_path(crawler.settings.get("CIRCUIT_BREAKER_DIR"), createdir=True)
+        )
+        s = cls(crawler, store_dir)
+        crawler.signals.connect(s.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(s.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(
+            s.request_reached_downloader, signal=signals.request_reached_downloader
+        )
+        return s
 
     def spider_opened(self, spider):
-        spider.logger.info("Spider opened: %s" % spider.name)
+        self.store_path = self.store_dir / f"{spider.name}.json"
+        if not self.store_path.exists():
+            return
+        for host, entry in (load_json(self.store_path) or {}).items():
+            self.circuits[host] = _Circuit(failures=entry.get("failures", 0), open=True)
+        if self.circuits:
+            spider.logger.info(
+                f"斷路器: 上次執行斷路的主機 {len(self.circuits)} 個，"
+                f"各只放行一個探測請求"
+            )
+
+    def spider_closed(self, spider, reason):
+        saved_secs = 0.0
+        broken = []
+        for host, circuit in sorted(self.circuits.items()):
+            if not (circuit.open or circuit.skipped or circuit.failed_count):
+                continue
+            secs = circuit.skipped * circuit.avg_failure_secs
+            saved_secs += secs
+            if circuit.open:
+                broken.append(host)
+            self.stats.set_value(
+                f"circuit_breaker/hosts/{host}",
+                {
+                    "open": circuit.open,
+                    "failures": circuit.failures,
+                    "skipped": circuit.skipped,
+                    "retries": circuit.retries,
+                    "estimated_secs_saved": round(secs, 1),
+                },
+            )
+        self.stats.set_value("circuit_breaker/broken_hosts", broken)
+        self.stats.set_value(
+            "circuit_breaker/estimated_secs_saved", round(saved_secs, 1)
+        )
+
+        if self.store_path is not None and (broken or self.store_path.exists()):
+            save_json(
+                {host: {"failures": self.circuits[host].failures} for host in broken},
+                self.store_path,
+                indent=2,
+                stats=write_stats_for(spider.crawler),
+            )
+
+    def _circuit(self, request) -> _Circuit:
+        host = urlparse_cached(request).hostname or ""
+        circuit = self.circuits.get(host)
+        if circuit is None:
+            circuit = self.circuits[host] = _Circuit()
+        return circuit
+
+    def _skip(self, circuit: _Circuit, reason: str, request) -> None:
+        circuit.skipped += 1
+        self.stats.inc_value(f"circuit_breaker/{reason}")
+        raise IgnoreRequest(f"circuit_breaker: {reason} ({request.url})")
+
+    def process_request(self, request):
+        circuit = self._circuit(request)
+        if circuit.open:
+            ready = time.monotonic() - circuit.opened_at >= self.cooldown
+            if circuit.probing or not ready:
+                self._skip(circuit, "skipped", request)
+            circuit.probing = True
+            request.meta["circuit_probe"] = True
+            self.stats.inc_value("circuit_breaker/probes")
+
+        if request.meta.get("retry_times"):
+            budget = max(self.min_retries, self.retry_budget * circuit.requests)
+            if circuit.retries >= budget:
+                self._skip(circuit, "retry_budget_exhausted", request)
+            circuit.retries += 1
+        else:
+            circuit.requests += 1
+        return None
+
+    def request_reached_downloader(self, request, spider):
+        request.meta["circuit_started"] = time.monotonic()
+
+    def _failure(self, request, latency: Optional[float] = None) -> None:
+        circuit = self._circuit(request)
+        started = request.meta.pop("circuit_started", None)
+        if latency is None and started is not None:
+            # 逾時、連線失敗沒有 download_latency，以進入下載器後的經過時間
+            # （含在 slot 佇列等待的時間）估算
+            latency = time.monotonic() - started
+        if latency is not None:
+            circuit.failed_secs += latency
+            circuit.failed_count += 1
+        circuit.failures += 1
+        if request.meta.pop("circuit_probe", False):
+            circuit.probing = False
+            circuit.opened_at = time.monotonic()
+        elif not circuit.open and circuit.failures >= self.threshold:
+            circuit.open = True
+            circuit.opened_at = time.monotonic()
+            self.stats.inc_value("circuit_breaker/opened")
+
+    def _success(self, request) -> None:
+        circuit = self._circuit(request)
+        request.meta.pop("circuit_started", None)
+        request.meta.pop("circuit_probe", None)
+        if circuit.open:
+            self.stats.inc_value("circuit_breaker/closed")
+        circuit.failures = 0
+        circuit.open = False
+        circuit.probing = False
+
+    def process_response(self, request, response):
+        if "cached" in response.flags:
+            return response
+        if response.status >= 500:
+            self._failure(request, request.meta.get("download_latency"))
+        else:
+            self._success(request)
+        return response
+
+    def process_exception(self, request, exception):
+        if not isinstance(exception, IgnoreRequest):
+            self._failure(request)
+        elif request.meta.pop("circuit_probe", False):
+            # 探測請求被其他 middleware 略過，讓下一個請求重新探測
+            self._circuit(request).probing = False
+        return None
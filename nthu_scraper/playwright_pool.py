@@ -0,0 +1,182 @@
+# Playwright integration for the nthu_scraper project
+#
+# See documentation in:
+# https://github.com/scrapy-plugins/scrapy-playwright
+
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from nthu_scraper.utils.constants import NTHU_DOMAIN_SUFFIX
+
+# 渲染時一律不下載的資源類型
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+# 第三方網域中仍需載入的資源類型（例如由 CDN 提供的 jQuery）
+THIRD_PARTY_ALLOWED_TYPES = frozenset({"document", "script", "xhr", "fetch"})
+# 即使是腳本也不載入的追蹤 / 分析服務
+TRACKER_DOMAINS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "facebook.com",
+    "addthis.com",
+)
+
+
+def _matches_domain(host: str, domain: str) -> bool:
+    return host == domain or host.endswith("." + domain)
+
+
+def should_abort_request(request) -> bool:
+    """
+    PLAYWRIGHT_ABORT_REQUEST 使用的判斷函式，回傳 True 表示中止該資源請求。
+
+    - 圖片、影音、字型一律中止
+    - 追蹤 / 分析服務一律中止
+    - 其他第三方網域（非 nthu.edu.tw 且非目前頁面的主機）只保留頁面渲染
+      可能需要的腳本與 XHR
+    頁面本身的導覽請求永遠不會中止。
+    """
+    if request.is_navigation_request():
+        return False
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+
+    host = urlparse(request.url).hostname or ""
+    if any(_matches_domain(host, domain) for domain in TRACKER_DOMAINS):
+        return True
+    try:
+        page_host = urlparse(request.frame.url).hostname or ""
+    except Exception:  # service worker 等請求沒有 frame
+        page_host = ""
+    first_party = _matches_domain(host, NTHU_DOMAIN_SUFFIX) or host == page_host
+    return not first_party and request.resource_type not in THIRD_PARTY_ALLOWED_TYPES
+
+
+class PlaywrightPagePoolMiddleware:
+    """
+    重複使用 Playwright 頁面的 downloader middleware。
+
+    渲染請求（meta["playwright"] 為 True）會分配到 PLAYWRIGHT_MAX_CONTEXTS 個
+    具名 context 之一，並優先取用閒置的頁面；回應後頁面放回池中，而不是每個
+    請求都開新頁面再關閉。同時開啟的頁面數上限為
+    PLAYWRIGHT_MAX_CONTEXTS × PLAYWRIGHT_MAX_PAGES_PER_CONTEXT，由
+    scrapy-playwright 的 semaphore 控制，與 Scrapy 的 CONCURRENT_REQUESTS 無關。
+
+    頁面使用 PLAYWRIGHT_PAGE_POOL_MAX_USES 次後會關閉重開，避免長時間執行
+    累積記憶體。需排在所有會設定 meta["playwright"] 的 middleware 之後。
+    """
+
+    CONTEXT_PREFIX = "pool"
+
+    def __init__(self, crawler, contexts: int, max_uses: int):
+        self.stats = crawler.stats
+        self.context_names = [f"{self.CONTEXT_PREFIX}-{i}" for i in range(contexts)]
+        self.max_uses = max_uses
+        self.idle: Dict[str, List] = defaultdict(list)
+        self.in_use: Dict[str, int] = defaultdict(int)
+        self.uses: Dict[int, int] = {}
+        self.render_count = 0
+        self.render_secs = 0.0
+        self.peak_in_use = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        contexts = settings.getint("PLAYWRIGHT_MAX_CONTEXTS")
+        if contexts <= 0:
+            raise NotConfigured("PLAYWRIGHT_MAX_CONTEXTS 未設定")
+        mw = cls(
+            crawler, contexts, settings.getint("PLAYWRIGHT_PAGE_POOL_MAX_USES", 50)
+        )
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def _acquire(self) -> Tuple[Optional[Any], str]:
+        """取得閒置頁面（可能為 None）與其所屬的 context 名稱。"""
+        for name in self.context_names:
+            while self.idle[name]:
+                page = self.idle[name].pop()
+                if not page.is_closed():
+                    return page, name
+                self.uses.pop(id(page), None)
+        # 沒有閒置頁面時，分配到目前使用中頁面最少的 context
+        return None, min(self.context_names, key=lambda name: self.in_use[name])
+
+    async def _release(self, page, context_name: str, reusable: bool) -> None:
+        uses = self.uses.get(id(page), 0) + 1
+        if reusable and uses < self.max_uses and not page.is_closed():
+            self.uses[id(page)] = uses
+            self.idle[context_name].append(page)
+            return
+        self.uses.pop(id(page), None)
+        self.stats.inc_value("page_pool/pages_retired")
+        if not page.is_closed():
+            await page.close()
+
+    def process_request(self, request):
+        if not request.meta.get("playwright") or "playwright_page" in request.meta:
+            return None
+
+        page, context_name = self._acquire()
+        request.meta["playwright_context"] = context_name
+        request.meta["playwright_include_page"] = True
+        request.meta["page_pool"] = True
+        if page is not None:
+            request.meta["playwright_page"] = page
+            self.stats.inc_value("page_pool/pages_reused")
+
+        self.in_use[context_name] += 1
+        total = sum(self.in_use.values())
+        if total > self.peak_in_use:
+            self.peak_in_use = total
+        return None
+
+    async def _finish(self, request, reusable: bool) -> None:
+        if not request.meta.pop("page_pool", False):
+            return
+        context_name = request.meta["playwright_context"]
+        self.in_use[context_name] -= 1
+        # 頁面不能隨 response.meta 傳給下一個請求
+        page = request.meta.pop("playwright_page", None)
+        request.meta.pop("playwright_include_page", None)
+        if page is None:
+            return
+        if id(page) not in self.uses:
+            self.stats.inc_value("page_pool/pages_created")
+        await self._release(page, context_name, reusable)
+
+    async def process_response(self, request, response):
+        if request.meta.get("page_pool") and "cached" not in response.flags:
+            latency = request.meta.get("download_latency")
+            if latency is not None:
+                self.render_count += 1
+                self.render_secs += latency
+        await self._finish(request, reusable=True)
+        return response
+
+    async def process_exception(self, request, exception):
+        # 失敗的頁面可能停在導覽中途，直接關閉不放回池中
+        await self._finish(request, reusable=False)
+        return None
+
+    def spider_closed(self, spider, reason):
+        created = self.stats.get_value("page_pool/pages_created", 0)
+        reused = self.stats.get_value("page_pool/pages_reused", 0)
+        if created + reused:
+            self.stats.set_value(
+                "page_pool/reuse_ratio", round(reused / (created + reused), 4)
+            )
+        if self.render_count:
+            self.stats.set_value(
+                "page_pool/avg_render_ms",
+                round(self.render_secs / self.render_count * 1000, 1),
+            )
+        self.stats.set_value("page_pool/peak_in_use", self.peak_in_use)
+        # 頁面與 context 由 scrapy-playwright 在關閉時一併釋放
+        self.idle.clear()
+        self.uses.clear()
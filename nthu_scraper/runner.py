@@ -0,0 +1,198 @@
+"""在同一個行程中依相依關係執行多個 spider。"""
+
+import argparse
+import asyncio
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+from scrapy.crawler import AsyncCrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+from nthu_scraper.utils.constants import (
+    ANNOUNCEMENTS_JSON_PATH,
+    ANNOUNCEMENTS_LIST_PATH,
+    DIRECTORY_PATH,
+)
+from nthu_scraper.utils.file_utils import dataset_cache
+
+# spider -> 必須先完成的 spider
+SPIDER_DEPENDENCIES: Dict[str, List[str]] = {
+    "nthu_announcements_list": ["nthu_directory"],
+    "nthu_announcements_item": ["nthu_announcements_list"],
+    "nthu_buses": ["nthu_announcements_item"],
+}
+
+# 上游 spider 的輸出檔案，寫入時直接放入 dataset_cache 交給下游讀取
+SPIDER_OUTPUTS = {
+    "nthu_directory": DIRECTORY_PATH,
+    "nthu_announcements_list": ANNOUNCEMENTS_LIST_PATH,
+    "nthu_announcements_item": ANNOUNCEMENTS_JSON_PATH,
+}
+
+
+@dataclass
+class SpiderRun:
+    """單一 spider 的執行紀錄（秒數皆相對於 runner 啟動時間）。"""
+
+    name: str
+    dependencies: List[str] = field(default_factory=list)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    finish_reason: str = ""
+    error: Optional[BaseException] = None
+
+    @property
+    def duration(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+def build_graph(spider_names: Iterable[str]) -> Dict[str, SpiderRun]:
+    """
+    建立要執行的 spider 相依圖。
+
+    只保留選定 spider 之間的相依關係；未選定的上游視為已完成，下游直接讀取
+    磁碟上既有的資料。
+
+    Raises:
+        ValueError: 相依關係有循環。
+    """
+    names = list(dict.fromkeys(spider_names))
+    runs = {
+        name: SpiderRun(
+            name, [dep for dep in SPIDER_DEPENDENCIES.get(name, []) if dep in names]
+        )
+        for name in names
+    }
+
+    visiting, done = set(), set()
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"spider 相依關係有循環: {name}")
+        visiting.add(name)
+        for dep in runs[name].dependencies:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in names:
+        visit(name)
+    return runs
+
+
+async def run_graph(process: AsyncCrawlerProcess, runs: Dict[str, SpiderRun]) -> None:
+    """每個 spider 在其上游全部結束後立即開始，彼此無相依的 spider 同時執行。"""
+    origin = time.monotonic()
+    tasks: Dict[str, asyncio.Task] = {}
+
+    async def run(spider: SpiderRun) -> None:
+        # 上游失敗時仍執行下游，改讀磁碟上的舊資料
+        await asyncio.gather(
+            *(tasks[dep] for dep in spider.dependencies), return_exceptions=True
+        )
+        crawler = process.create_crawler(spider.name)
+        spider.started = time.monotonic() - origin
+        try:
+            await process.crawl(crawler)
+        except Exception as e:
+            spider.error = e
+            raise
+        finally:
+            spider.finished = time.monotonic() - origin
+            spider.finish_reason = str(
+                crawler.stats.get_value("finish_reason", "") if crawler.stats else ""
+            )
+
+    for spider in runs.values():
+        tasks[spider.name] = asyncio.ensure_future(run(spider))
+    await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+
+def critical_path(runs: Dict[str, SpiderRun]) -> List[SpiderRun]:
+    """從最晚結束的 spider 往回追蹤最晚結束的上游，得到決定總時間的路徑。"""
+    finished = [run for run in runs.values() if run.finished is not None]
+    if not finished:
+        return []
+    path = [max(finished, key=lambda run: run.finished)]
+    while path[-1].dependencies:
+        path.append(
+            max(
+                (runs[dep] for dep in path[-1].dependencies),
+                key=lambda run: run.finished or 0.0,
+            )
+        )
+    return path[::-1]
+
+
+def print_report(runs: Dict[str, SpiderRun], width: int = 40) -> None:
+    """輸出每個 spider 的時間軸與關鍵路徑。"""
+    total = max((run.finished or 0.0 for run in runs.values()), default=0.0)
+    scale = width / total if total else 0.0
+    name_width = max(len(name) for name in runs)
+
+    print("\n時間軸:")
+    for run in sorted(runs.values(), key=lambda run: run.started or 0.0):
+        if run.started is None:
+            print(f"  {run.name:<{name_width}}  未執行")
+            continue
+        offset = int(run.started * scale)
+        length = max(1, int(run.duration * scale))
+        bar = " " * offset + "█" * length
+        status = f"錯誤: {run.error!r}" if run.error else run.finish_reason
+        print(
+            f"  {run.name:<{name_width}}  {run.started:7.1f}s → {run.finished:7.1f}s"
+            f"  |{bar:<{width}}|  {status}"
+        )
+
+    path = critical_path(runs)
+    print(
+        f"\n關鍵路徑 ({total:.1f}s): "
+        + " → ".join(f"{run.name} ({run.duration:.1f}s)" for run in path)
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="在同一個行程中依相依關係執行多個 spider。"
+    )
+    parser.add_argument(
+        "spiders", nargs="*", help="要執行的 spider 名稱 (預設為全部 spider)"
+    )
+    args = parser.parse_args(argv)
+
+    process = AsyncCrawlerProcess(get_project_settings())
+    spider_names = args.spiders or process.spider_loader.list()
+    unknown = set(spider_names) - set(process.spider_loader.list())
+    if unknown:
+        parser.error(f"未知的 spider: {', '.join(sorted(unknown))}")
+
+    runs = build_graph(spider_names)
+    dataset_cache.retain_writes(
+        SPIDER_OUTPUTS[name]
+        for name in runs
+        if name in SPIDER_OUTPUTS
+        and any(name in run.dependencies for run in runs.values())
+    )
+
+    def stop(task: asyncio.Task) -> None:
+        from twisted.internet import reactor
+
+        if reactor.running:
+            reactor.stop()
+
+    loop = asyncio.get_event_loop()
+    loop.create_task(run_graph(process, runs)).add_done_callback(stop)
+    process.start(stop_after_crawl=False)
+
+    print_report(runs)
+    return 1 if any(run.error or run.started is None for run in runs.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,6 +7,10 @@
 #     https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
 #     https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
+import os
+
+from scrapy.settings import default_settings
+
 from nthu_scraper.utils.request_utils import get_default_headers
 
 BOT_NAME = "nthu_scraper"
@@ -23,7 +27,8 @@ LOG_LEVEL = "INFO"
 ROBOTSTXT_OBEY = True
 
 # Configure maximum concurrent requests performed by Scrapy (default: 16)
-# CONCURRENT_REQUESTS = 32
+# 各主機的實際併發數由 AdaptiveConcurrencyMiddleware 動態調整
+CONCURRENT_REQUESTS = 32
 
 # Configure a delay for requests for the same website (default: 0)
 # See https://docs.scrapy.org/en/latest/topics/settings.html#download-delay
@@ -45,21 +50,105 @@ DEFAULT_REQUEST_HEADERS = get_default_headers()
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-# SPIDER_MIDDLEWARES = {
-#    "nthu_scraper.middlewares.NthuScraperSpiderMiddleware": 543,
-# }
+SPIDER_MIDDLEWARES = {
+    # callback 成功完成後才記錄條件式請求的驗證資訊
+    "nthu_scraper.middlewares.ConditionalGetCommitMiddleware": 900,
+    # 最靠近 spider，只量測 callback 本身
+    "nthu_scraper.middlewares.InstrumentationSpiderMiddleware": 950,
+}
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-# DOWNLOADER_MIDDLEWARES = {
-#    "nthu_scraper.middlewares.NthuScraperDownloaderMiddleware": 543,
-# }
+DOWNLOADER_MIDDLEWARES = {
+    # 排在 HttpCacheMiddleware (900) 之後，已快取的回應不受斷路影響
+    "nthu_scraper.middlewares.CircuitBreakerMiddleware": 940,
+    # 排在 HttpCacheMiddleware (900) 之後，只對真正送出的請求附上驗證標頭
+    "nthu_scraper.middlewares.ConditionalGetMiddleware": 950,
+    # 最先看到原始回應，依延遲與錯誤調整併發數
+    "nthu_scraper.middlewares.AdaptiveConcurrencyMiddleware": 960,
+}
+
+# 以 ETag / Last-Modified 發送條件式請求，驗證資訊存放於 .scrapy/conditional_get/
+CONDITIONAL_GET_ENABLED = True
+CONDITIONAL_GET_DIR = "conditional_get"
+
+# 同一主機連續失敗 3 次即斷路，2 分鐘後再探測；斷路的主機記錄於
+# .scrapy/circuit_breaker/，下次執行只探測一次。每個主機的重試次數不超過
+# 首次請求數的 CIRCUIT_BREAKER_RETRY_BUDGET 倍（至少 CIRCUIT_BREAKER_MIN_RETRIES 次）
+CIRCUIT_BREAKER_ENABLED = True
+CIRCUIT_BREAKER_DIR = "circuit_breaker"
+CIRCUIT_BREAKER_THRESHOLD = 3
+CIRCUIT_BREAKER_COOLDOWN = 120
+CIRCUIT_BREAKER_RETRY_BUDGET = 0.2
+CIRCUIT_BREAKER_MIN_RETRIES = 3
+
+# 以 AIMD 方式依延遲與錯誤率調整每個主機的併發數
+ADAPTIVE_CONCURRENCY_ENABLED = True
+ADAPTIVE_CONCURRENCY_START = 2
+ADAPTIVE_CONCURRENCY_MIN = 1
+ADAPTIVE_CONCURRENCY_MAX = 8
+ADAPTIVE_CONCURRENCY_TARGET_LATENCY = 1.0
+ADAPTIVE_CONCURRENCY_BACKOFF = 0.5
+# 共用同一後端的網域合併為一個 slot，值為整個群組的併發上限
+ADAPTIVE_CONCURRENCY_GROUPS = {"site.nthu.edu.tw": 12}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-# EXTENSIONS = {
-#    "scrapy.extensions.telnet.TelnetConsole": None,
-# }
+# 排程執行時用不到 telnet console 與 remote control。設為 None 仍會在啟動時
+# 匯入模組（remote control 會匯入 aiohttp.web，約 100 ms），因此直接從
+# EXTENSIONS_BASE 移除
+EXTENSIONS_BASE = {
+    path: order
+    for path, order in default_settings.EXTENSIONS_BASE.items()
+    if path
+    not in (
+        "scrapy.extensions.telnet.TelnetConsole",
+        "scrapy.extensions.remote_control.RemoteControl",
+    )
+}
+EXTENSIONS = {
+    # "scrapy.extensions.telnet.TelnetConsole": None,
+    "nthu_scraper.extensions.JsonCodecSetting": 0,
+    "nthu_scraper.extensions.WriteQueueService": 490,
+    "nthu_scraper.extensions.DataFileStats": 500,
+    "nthu_scraper.extensions.ReactorStallMonitor": 505,
+    "nthu_scraper.extensions.CrawlInstrumentation": 510,
+}
+
+# 每次爬取結束時將延遲、CPU 時間與寫入量的直方圖寫入 stats/<spider 名稱>.json
+INSTRUMENTATION_ENABLED = True
+INSTRUMENTATION_DIR = "stats"
+
+# pipeline 與 spider 透過 WriteQueueService 將序列化後的內容交給背景執行緒
+# 寫入，不在 reactor 中做磁碟 I/O；同一路徑尚未寫入時以最新內容為準。
+# 排隊的路徑數達 HIGH_WATER 時暫停 engine，降到 LOW_WATER 以下再繼續。
+# WRITE_QUEUE_WORKERS 設為 0 則在 reactor 中直接寫入
+WRITE_QUEUE_WORKERS = 2
+WRITE_QUEUE_HIGH_WATER = 64
+WRITE_QUEUE_LOW_WATER = 16
+
+# 以固定間隔的計時器量測 reactor 被阻塞的時間，結果記錄於 reactor/* stats
+REACTOR_STALL_MONITOR_ENABLED = True
+REACTOR_STALL_INTERVAL = 0.05
+REACTOR_STALL_THRESHOLD_MS = 20
+
+# load_json / save_json 使用的 JSON codec："stdlib" 或 "orjson"。兩者寫出的
+# 位元組相同：orjson 格式不同的值（指數形式或 NaN / Infinity 的浮點數、超過
+# 64 位元的整數）改由標準函式庫編碼。未安裝 orjson 時使用 "stdlib"
+JSON_CODEC = "orjson"
+
+# 以 utils/base_pipelines 為基礎的 pipeline 如何收集資料，spider 可在
+# custom_settings 中各自切換：
+# "memory" 在記憶體中收集，結束時一次寫入；"jsonl" 每筆資料到達時附加到
+# .scrapy/<JSON_PIPELINE_SPOOL_DIR>/ 下的 JSONL 檔案，結束時再組成 JSON
+# （需要排序時以外部合併排序，每個 run 最多 JSON_PIPELINE_SORT_BUFFER 筆）
+JSON_PIPELINE_MODE = "memory"
+JSON_PIPELINE_SPOOL_DIR = "json_spool"
+JSON_PIPELINE_SORT_BUFFER = 10000
+
+# 課程爬蟲是否記錄各課程的修課人數時間序列（data/courses/enrollment）。目前的
+# 課程資料沒有總人數欄位，等資料來源提供人數後再開啟
+COURSE_ENROLLMENT_ENABLED = False
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
@@ -82,11 +171,16 @@ DEFAULT_REQUEST_HEADERS = get_default_headers()
 
 # Enable and configure HTTP caching (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html#httpcache-middleware-settings
-# HTTPCACHE_ENABLED = True
-# HTTPCACHE_EXPIRATION_SECS = 0
-# HTTPCACHE_DIR = "httpcache"
-# HTTPCACHE_IGNORE_HTTP_CODES = []
-# HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+# 各 spider 以 custom_settings 的 HTTPCACHE_EXPIRATION_SECS 宣告自己的快取有效時間。
+# 快取只供本機開發使用（設定環境變數 HTTPCACHE_ENABLED=1 或以
+# -s HTTPCACHE_ENABLED=True 開啟）；排程更新必須抓取最新資料，不可發布快取中的回應
+HTTPCACHE_ENABLED = os.getenv("HTTPCACHE_ENABLED", "0") == "1"
+HTTPCACHE_EXPIRATION_SECS = 30 * 60
+HTTPCACHE_DIR = "httpcache"
+HTTPCACHE_IGNORE_HTTP_CODES = [500, 502, 503, 504]
+HTTPCACHE_STORAGE = "nthu_scraper.httpcache.SqliteCacheStorage"
+HTTPCACHE_POLICY = "nthu_scraper.httpcache.FreshnessPolicy"
+HTTPCACHE_GZIP = True
 
 # Set settings whose default value is deprecated to a future-proof value
 TWISTED_REACTOR = "twisted.internet.asyncioreactor.AsyncioSelectorReactor"
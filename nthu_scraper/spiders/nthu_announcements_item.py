@@ -1,34 +1,38 @@
 """清華大學公告爬蟲 - 公告內容爬蟲"""
 
+from dataclasses import dataclass
 from typing import List, Optional
 from pathlib import Path
 import re
 import scrapy
 
+from nthu_scraper.extensions import WriteQueueService
 from nthu_scraper.utils.constants import (
     ANNOUNCEMENTS_FOLDER,
     ANNOUNCEMENTS_JSON_PATH,
     ANNOUNCEMENTS_LIST_PATH,
 )
-from nthu_scraper.utils.file_utils import load_json, save_json
+from nthu_scraper.utils.file_utils import load_json_cached
 
 
-class AnnouncementItem(scrapy.Item):
-    """公告 Item"""
+@dataclass(slots=True)
+class AnnouncementArticle:
+    """公告文章"""
 
-    title = scrapy.Field()
-    link = scrapy.Field()
-    language = scrapy.Field()
-    department = scrapy.Field()
-    articles = scrapy.Field()
+    title: Optional[str]
+    link: Optional[str]
+    date: Optional[str]
 
 
-class AnnouncementArticle(scrapy.Item):
-    """公告文章 Item"""
+@dataclass(slots=True)
+class AnnouncementItem:
+    """公告 Item（以 __slots__ 儲存，由 JSON codec 直接編碼）"""
 
-    title = scrapy.Field()
-    link = scrapy.Field()
-    date = scrapy.Field()
+    title: str
+    link: str
+    language: str
+    department: str
+    articles: List[AnnouncementArticle]
 
 
 class AnnouncementsItemSpider(scrapy.Spider):
@@ -51,7 +55,7 @@ class AnnouncementsItemSpider(scrapy.Spider):
 
     def _load_announcement_list(self) -> List[dict]:
         """載入公告列表"""
-        data = load_json(ANNOUNCEMENTS_LIST_PATH)
+        data = load_json_cached(ANNOUNCEMENTS_LIST_PATH)
         if not data:
             self.logger.warning("無法載入公告列表，請先執行 nthu_announcements_list")
             return []
@@ -90,7 +94,39 @@ class AnnouncementsItemSpider(scrapy.Spider):
             articles=articles,
         )
 
-    def _extract_articles(self, response) -> List[dict]:
+    def parse_not_modified(self, response):
+        """
+        公告頁面未變更 (304)：沿用 announcements.json 中上次的資料。
+
+        找不到上次的資料時，改以一般請求重新取得頁面。
+        """
+        previous = self._previous_announcements().get(response.url)
+        if previous is None:
+            yield response.request.replace(
+                callback=self.parse,
+                dont_filter=True,
+                meta={**response.meta, "dont_conditional_get": True},
+            )
+            return
+
+        yield AnnouncementItem(
+            title=response.meta["title"],
+            link=response.url,
+            language=response.meta["language"],
+            department=response.meta["department"],
+            articles=[
+                AnnouncementArticle(**article) for article in previous["articles"]
+            ],
+        )
+
+    def _previous_announcements(self) -> dict:
+        """以連結為鍵，取得上次儲存的公告資料"""
+        if not hasattr(self, "_previous_by_link"):
+            previous = load_json_cached(ANNOUNCEMENTS_JSON_PATH) or ()
+            self._previous_by_link = {item["link"]: item for item in previous}
+        return self._previous_by_link
+
+    def _extract_articles(self, response) -> List[AnnouncementArticle]:
         """提取公告文章列表"""
         articles = []
         container = response.css("#pageptlist")
@@ -102,12 +138,12 @@ class AnnouncementsItemSpider(scrapy.Spider):
 
         for item in announcement_items:
             article = self._parse_article_item(item, response)
-            if article and article.get("title"):
+            if article and article.title:
                 articles.append(article)
 
         return articles
 
-    def _parse_article_item(self, item, response) -> Optional[dict]:
+    def _parse_article_item(self, item, response) -> Optional[AnnouncementArticle]:
         """解析單個公告項目"""
         # 提取標題和連結
         link_elem = item.css(".mtitle a")
@@ -128,58 +164,57 @@ class AnnouncementsItemSpider(scrapy.Spider):
         if date:
             date = date.strip()
 
-        return {
-            "title": title,
-            "link": link,
-            "date": date,
-        }
+        return AnnouncementArticle(title=title, link=link, date=date)
 
 
 class AnnouncementItemPipeline:
-    """公告內容 Pipeline"""
+    """公告內容 Pipeline，檔案交給 WriteQueueService 在背景寫入"""
+
+    def __init__(self, writes: WriteQueueService):
+        self.writes = writes
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(WriteQueueService.of(crawler))
 
     def open_spider(self, spider):
         """初始化"""
         self.collected_data = []
-        ANNOUNCEMENTS_FOLDER.mkdir(parents=True, exist_ok=True)
 
     def process_item(self, item, spider):
         """處理 Item"""
         if not isinstance(item, AnnouncementItem):
             return item
 
-        self.collected_data.append(dict(item))
+        self.collected_data.append(item)
         self._save_individual_item(item)
         spider.logger.info(
-            f'儲存公告: {item["department"]}/{item["title"]} '
-            f'({len(item["articles"])} 篇文章)'
+            f"儲存公告: {item.department}/{item.title} "
+            f"({len(item.articles)} 篇文章)"
         )
 
         return item
 
     def _save_individual_item(self, item: AnnouncementItem) -> None:
-        department = self._sanitize_path_component(
-            item.get("department") or "未命名單位"
-        )
-        title = self._sanitize_path_component(item.get("title") or "未命名公告")
-        language = self._sanitize_path_component(item.get("language") or "未知語言")
-
-        dept_dir = ANNOUNCEMENTS_FOLDER / department
-        dept_dir.mkdir(parents=True, exist_ok=True)
+        department = self._sanitize_path_component(item.department or "未命名單位")
+        title = self._sanitize_path_component(item.title or "未命名公告")
+        language = self._sanitize_path_component(item.language or "未知語言")
 
-        file_path = dept_dir / f"{title}_{language}.json"
-        save_json(dict(item), file_path)
+        # 單位資料夾在背景寫入時建立
+        file_path = ANNOUNCEMENTS_FOLDER / department / f"{title}_{language}.json"
+        self.writes.save_json(item, file_path)
 
     def _sanitize_path_component(self, value: str) -> str:
         sanitized = re.sub(r'[\\/:*?"<>|]', "_", value.strip())
         return sanitized or "unnnamed"
 
-    def close_spider(self, spider):
+    async def close_spider(self, spider):
         """儲存資料"""
         # 按連結排序
-        self.collected_data.sort(key=lambda x: x["link"])
+        self.collected_data.sort(key=lambda x: x.link)
 
-        save_json(self.collected_data, ANNOUNCEMENTS_JSON_PATH)
+        self.writes.save_json(self.collected_data, ANNOUNCEMENTS_JSON_PATH)
         spider.logger.info(
             f"成功儲存 {len(self.collected_data)} 個公告到 announcements.json"
         )
+        await self.writes.flush()
@@ -1,18 +1,30 @@
 """清華大學公告爬蟲 - 公告列表爬蟲"""
 
 import re
-from typing import Dict
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Optional
 
 import scrapy
-from scrapy_playwright.page import PageMethod
+from scrapy import signals
+from scrapy.http import TextResponse
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.project import data_path
 
+from nthu_scraper.extensions import callback_name
 from nthu_scraper.utils.constants import (
     ANNOUNCEMENTS_LIST_PATH,
     DIRECTORY_PATH,
     LANGUAGES,
     RPAGE_DOMAIN_SUFFIX,
 )
-from nthu_scraper.utils.file_utils import load_json, save_json
+from nthu_scraper.utils.file_utils import (
+    load_json,
+    load_json_cached,
+    save_json,
+    write_stats_for,
+)
 from nthu_scraper.utils.url_utils import (
     build_multi_lang_urls,
     check_domain_suffix,
@@ -48,6 +60,15 @@ CUSTOM_ANNOUNCEMENT_SOURCES = [
 ]
 
 
+# 各 callback 需要的元素，一般 HTTP 回應缺少時才改用 Playwright 渲染
+REQUIRED_SELECTORS = {
+    "parse": "p.more a",
+    "parse_announcement_list": "#pageptlist .row.listBS, #pageptlist tr",
+}
+# 由上一個回應沿用 meta 時需清除的渲染狀態
+RENDER_META_KEYS = ("playwright", "playwright_page_methods", "escalated")
+
+
 class AnnouncementListItem(scrapy.Item):
     """公告列表 Item"""
 
@@ -72,13 +93,24 @@ class AnnouncementsListSpider(scrapy.Spider):
         # 啟用本模組內的 middleware，優先順序可調（數字越小越先執行）
         "DOWNLOADER_MIDDLEWARES": {
             "nthu_scraper.spiders.nthu_announcements_list.EnforceHTTPSMiddleware": 543,
+            "nthu_scraper.middlewares.CircuitBreakerMiddleware": 940,
+            "nthu_scraper.spiders.nthu_announcements_list.PlaywrightEscalationMiddleware": 950,
+            "nthu_scraper.playwright_pool.PlaywrightPagePoolMiddleware": 955,
+            "nthu_scraper.middlewares.AdaptiveConcurrencyMiddleware": 960,
         },
         "DOWNLOAD_HANDLERS": {
             "https": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
             "http": "scrapy_playwright.handler.ScrapyPlaywrightDownloadHandler",
         },
         "TWISTED_REACTOR": "twisted.internet.asyncioreactor.AsyncioSelectorReactor",
+        # Playwright 渲染成本高，快取一天，重複除錯時不必重新渲染
+        "HTTPCACHE_EXPIRATION_SECS": 24 * 60 * 60,
         "PLAYWRIGHT_DEFAULT_NAVIGATION_TIMEOUT": 15_000,
+        # 渲染時不下載圖片、字型與第三方資源；最多同時開啟 2 × 4 個頁面並重複使用
+        "PLAYWRIGHT_ABORT_REQUEST": "nthu_scraper.playwright_pool.should_abort_request",
+        "PLAYWRIGHT_MAX_CONTEXTS": 2,
+        "PLAYWRIGHT_MAX_PAGES_PER_CONTEXT": 4,
+        "PLAYWRIGHT_PAGE_POOL_MAX_USES": 50,
     }
 
     def __init__(self, *args, **kwargs):
@@ -90,7 +122,7 @@ class AnnouncementsListSpider(scrapy.Spider):
     def _load_department_urls(self) -> Dict[str, Dict[str, str]]:
         """從通訊錄載入單位 URL"""
         urls = {}
-        directory = load_json(DIRECTORY_PATH)
+        directory = load_json_cached(DIRECTORY_PATH)
         # directory = None
         if directory:
             for dept in directory:
@@ -112,23 +144,11 @@ class AnnouncementsListSpider(scrapy.Spider):
 
     def _load_existing_links(self) -> set:
         """載入現有的公告列表連結"""
-        existing_data = load_json(ANNOUNCEMENTS_LIST_PATH)
+        existing_data = load_json_cached(ANNOUNCEMENTS_LIST_PATH)
         if existing_data:
             return {item["link"] for item in existing_data}
         return set()
 
-    def _build_playwright_meta(self, meta: Dict) -> Dict:
-        new_meta = meta.copy()
-        new_meta.update(
-            {
-                "playwright": True,
-                "playwright_page_methods": [
-                    PageMethod("wait_for_load_state", "networkidle")
-                ],
-            }
-        )
-        return new_meta
-
     async def start(self):
         """發送初始請求"""
         for dept, lang_urls in self.department_urls.items():
@@ -142,11 +162,11 @@ class AnnouncementsListSpider(scrapy.Spider):
         normalized_url = self._prepare_request_url(url)
         if not normalized_url:
             return None
-        return scrapy.Request(
-            normalized_url,
-            callback=callback,
-            meta=self._build_playwright_meta(meta.copy()),
-        )
+        # 先以一般 HTTP 取得，缺少 callback 需要的元素時才由
+        # PlaywrightEscalationMiddleware 改用 Playwright 重新渲染
+        new_meta = {k: v for k, v in meta.items() if k not in RENDER_META_KEYS}
+        new_meta["required_selector"] = REQUIRED_SELECTORS[callback.__name__]
+        return scrapy.Request(normalized_url, callback=callback, meta=new_meta)
 
     def _prepare_request_url(self, url: str) -> str | None:
         if not url:
@@ -230,7 +250,8 @@ class AnnouncementListPipeline:
     def open_spider(self, spider):
         """初始化"""
         self.collected_items = []
-        self.existing_data = load_json(ANNOUNCEMENTS_LIST_PATH) or []
+        # 與 spider 共用同一份快取的解析結果，儲存前才複製成可修改的 dict
+        self.existing_data = load_json_cached(ANNOUNCEMENTS_LIST_PATH) or ()
         self.existing_links = {item["link"] for item in self.existing_data}
 
     def process_item(self, item, spider):
@@ -251,7 +272,7 @@ class AnnouncementListPipeline:
     def close_spider(self, spider):
         """儲存資料"""
         # 合併新舊資料
-        all_items = self.existing_data + self.collected_items
+        all_items = [dict(item) for item in self.existing_data] + self.collected_items
 
         # 新增自訂公告來源
         for custom_item in CUSTOM_ANNOUNCEMENT_SOURCES:
@@ -267,7 +288,9 @@ class AnnouncementListPipeline:
         # 按連結排序
         all_items.sort(key=lambda x: x["link"])
 
-        save_json(all_items, ANNOUNCEMENTS_LIST_PATH)
+        save_json(
+            all_items, ANNOUNCEMENTS_LIST_PATH, stats=write_stats_for(spider.crawler)
+        )
         spider.logger.info(
             f"儲存公告列表: 共 {len(all_items)} 筆 (新增 {len(self.collected_items)} 筆)"
         )
@@ -286,3 +309,154 @@ class EnforceHTTPSMiddleware:
         if new_url and new_url != request.url:
             # return 一個新的 Request 物件，以便 Scrapy 使用新的 URL
             return request.replace(url=new_url)
+
+
+class PlaywrightEscalationMiddleware:
+    """
+    Downloader middleware：先以一般 HTTP 取得頁面，缺少 callback 需要的元素
+    （request.meta["required_selector"]）時才改用 Playwright 重新渲染。
+
+    每個 (主機, callback) 的結果會記錄在 .scrapy/playwright_escalation/
+    <spider 名稱>.json，下次執行時直接沿用：
+    - plain：一般 HTTP 即可
+    - render：需要 Playwright，直接渲染
+    - skip：渲染後仍找不到元素，不再升級
+    render 與 skip 超過 PLAYWRIGHT_ESCALATION_RECHECK_DAYS 天後會重新判斷。
+
+    排在 HttpCacheMiddleware (900) 之後：需要升級的一般回應不會寫入快取。
+    """
+
+    def __init__(self, crawler, store_dir: Path, recheck_days: int):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.store_dir = store_dir
+        self.recheck = timedelta(days=recheck_days)
+        self.store_path: Optional[Path] = None
+        self.decisions: Dict[str, Dict[str, str]] = {}
+        self.elapsed = {"plain": [0, 0.0], "render": [0, 0.0]}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        store_dir = Path(
+            data_path(
+                settings.get("PLAYWRIGHT_ESCALATION_DIR", "playwright_escalation"),
+                createdir=True,
+            )
+        )
+        mw = cls(
+            crawler, store_dir, settings.getint("PLAYWRIGHT_ESCALATION_RECHECK_DAYS", 7)
+        )
+        crawler.signals.connect(mw.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(mw.spider_closed, signal=signals.spider_closed)
+        return mw
+
+    def spider_opened(self, spider):
+        self.store_path = self.store_dir / f"{spider.name}.json"
+        if self.store_path.exists():
+            self.decisions = load_json(self.store_path) or {}
+
+    def spider_closed(self, spider, reason):
+        plain_ok = self.stats.get_value("playwright_escalation/plain_ok", 0)
+        rendered = self.stats.get_value(
+            "playwright_escalation/escalated", 0
+        ) + self.stats.get_value("playwright_escalation/rendered_direct", 0)
+        if plain_ok + rendered:
+            self.stats.set_value(
+                "playwright_escalation/render_ratio",
+                round(rendered / (plain_ok + rendered), 4),
+            )
+
+        # 以平均延遲估算：每個一般 HTTP 即可的頁面省下一次渲染的時間
+        plain_count, plain_secs = self.elapsed["plain"]
+        render_count, render_secs = self.elapsed["render"]
+        if plain_count and render_count:
+            saved = plain_ok * (render_secs / render_count - plain_secs / plain_count)
+            self.stats.set_value(
+                "playwright_escalation/estimated_secs_saved", round(saved, 1)
+            )
+
+        if self.store_path is not None and self.decisions:
+            save_json(
+                self.decisions,
+                self.store_path,
+                indent=2,
+                stats=write_stats_for(spider.crawler),
+            )
+
+    def _key(self, request) -> str:
+        host = urlparse_cached(request).hostname or ""
+        return f"{host}|{callback_name(request)}"
+
+    def _decide(self, request, mode: str) -> None:
+        self.decisions[self._key(request)] = {
+            "mode": mode,
+            "checked": date.today().isoformat(),
+        }
+
+    def _remembered(self, request) -> Optional[str]:
+        """取得仍在有效期限內的記錄結果。"""
+        decision = self.decisions.get(self._key(request))
+        if not decision:
+            return None
+        if date.today() - date.fromisoformat(decision["checked"]) >= self.recheck:
+            return None
+        return decision["mode"]
+
+    def _render(self, request) -> None:
+        # 只有需要渲染時才載入 scrapy_playwright，其他 spider 載入本模組時不需要
+        from scrapy_playwright.page import PageMethod
+
+        request.meta["playwright"] = True
+        request.meta["playwright_page_methods"] = [
+            PageMethod("wait_for_load_state", "networkidle")
+        ]
+
+    def process_request(self, request):
+        if "required_selector" not in request.meta:
+            return None
+        request.meta["escalation_started"] = time.monotonic()
+        if not request.meta.get("playwright") and self._remembered(request) == "render":
+            self._render(request)
+            self.stats.inc_value("playwright_escalation/rendered_direct")
+        return None
+
+    def _has_required(self, request, response) -> bool:
+        return isinstance(response, TextResponse) and bool(
+            response.css(request.meta["required_selector"])
+        )
+
+    def process_response(self, request, response):
+        if "required_selector" not in request.meta:
+            return response
+
+        rendered = bool(request.meta.get("playwright"))
+        started = request.meta.pop("escalation_started", None)
+        if started is not None and "cached" not in response.flags:
+            latency = request.meta.get("download_latency")
+            bucket = self.elapsed["render" if rendered else "plain"]
+            bucket[0] += 1
+            bucket[1] += latency if latency is not None else time.monotonic() - started
+
+        found = self._has_required(request, response)
+        if rendered:
+            if request.meta.get("escalated"):
+                self._decide(request, "render" if found else "skip")
+            return response
+
+        if found:
+            # 快取可能存著先前渲染的結果，不能據此判斷一般 HTTP 是否足夠
+            if "cached" not in response.flags:
+                self.stats.inc_value("playwright_escalation/plain_ok")
+                self._decide(request, "plain")
+            return response
+
+        if self._remembered(request) == "skip":
+            self.stats.inc_value("playwright_escalation/skipped")
+            return response
+
+        self.stats.inc_value("playwright_escalation/escalated")
+        escalated = request.replace(dont_filter=True)
+        escalated.meta["escalated"] = True
+        self._render(escalated)
+        return escalated
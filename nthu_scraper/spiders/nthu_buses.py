@@ -7,12 +7,13 @@ from typing import Any, Dict, List, Optional
 
 import scrapy
 
+from nthu_scraper.extensions import WriteQueueService
 from nthu_scraper.utils.constants import (
     ANNOUNCEMENTS_JSON_PATH,
     BUSES_FOLDER,
     BUSES_JSON_PATH,
 )
-from nthu_scraper.utils.file_utils import load_json, save_json
+from nthu_scraper.utils.file_utils import load_json_cached
 
 # 公車路線配置
 BUS_CONFIG = {
@@ -65,6 +66,7 @@ class BusesSpider(scrapy.Spider):
         "ITEM_PIPELINES": {
             "nthu_scraper.spiders.nthu_buses.BusPipeline": 1,
         },
+        "HTTPCACHE_EXPIRATION_SECS": 10 * 60,
     }
 
     async def start(self):
@@ -79,7 +81,7 @@ class BusesSpider(scrapy.Spider):
 
     def _load_schedule_image_links(self):
         """從公告 JSON 載入時刻表圖片連結"""
-        announcements = load_json(ANNOUNCEMENTS_JSON_PATH)
+        announcements = load_json_cached(ANNOUNCEMENTS_JSON_PATH)
         if not announcements:
             self.logger.warning("無法載入公告資料，跳過圖片連結提取")
             return
@@ -313,7 +315,6 @@ class BusesSpider(scrapy.Spider):
             return
 
         image_folder = BUSES_FOLDER / "images"
-        image_folder.mkdir(parents=True, exist_ok=True)
 
         absolute_links = []
         for idx, link in enumerate(image_links):
@@ -340,19 +341,24 @@ class BusesSpider(scrapy.Spider):
         )
 
     def save_image(self, response):
-        """儲存圖片"""
+        """儲存圖片（交給背景寫入，資料夾在寫入時建立）"""
         image_path = response.meta["image_path"]
-        with open(image_path, "wb") as f:
-            f.write(response.body)
+        WriteQueueService.of(self.crawler).write_bytes(response.body, image_path)
         self.logger.info(f"成功下載圖片: {image_path.name}")
 
 
 class BusPipeline:
-    """公車資料 Pipeline"""
+    """公車資料 Pipeline，檔案交給 WriteQueueService 在背景寫入"""
+
+    def __init__(self, writes: WriteQueueService):
+        self.writes = writes
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(WriteQueueService.of(crawler))
 
     def open_spider(self, spider):
         """初始化"""
-        BUSES_FOLDER.mkdir(parents=True, exist_ok=True)
         self.bus_data = {}
 
     def process_item(self, item, spider):
@@ -365,12 +371,13 @@ class BusPipeline:
 
         # 儲存個別檔案
         file_path = BUSES_FOLDER / f"{item_name}.json"
-        save_json(item["data"], file_path)
+        self.writes.save_json(item["data"], file_path)
         spider.logger.info(f'儲存 {item["route_type"]}/{item_name} 到 {file_path}')
 
         return item
 
-    def close_spider(self, spider):
-        """儲存合併的資料"""
-        save_json(self.bus_data, BUSES_JSON_PATH)
+    async def close_spider(self, spider):
+        """儲存合併的資料，等待所有背景寫入完成"""
+        self.writes.save_json(self.bus_data, BUSES_JSON_PATH)
         spider.logger.info(f"成功儲存所有公車資料到 {BUSES_JSON_PATH}")
+        await self.writes.flush()
@@ -1,25 +1,78 @@
-import json
-from dataclasses import asdict, dataclass
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
 
 import scrapy
+from scrapy import signals
+from scrapy.settings import default_settings
+from scrapy.utils.project import data_path
 
 from nthu_scraper.utils.constants import DATA_FOLDER
-from nthu_scraper.utils.file_utils import save_json
+from nthu_scraper.utils.course_archive import SegmentBuilder, write_segment
+from nthu_scraper.utils.course_delta import DeltaLog, SemesterDiff
+from nthu_scraper.utils.course_enrollment import EnrollmentBatch, EnrollmentStore
+from nthu_scraper.utils.course_search import SearchIndexBuilder, index_is_current
+from nthu_scraper.utils.course_slots import build_slot_index, encode_slots
+from nthu_scraper.utils.file_utils import (
+    JsonArrayWriter,
+    WriteStats,
+    load_json,
+    save_json,
+    write_stats_for,
+)
+from nthu_scraper.utils.json_codec import iter_json_array, record_to_dict
 
 # --- 全域參數設定 ---
 OUTPUT_FOLDER = DATA_FOLDER / "courses"
 LATEST_JSON = DATA_FOLDER / "courses.json"
+SEMESTERS_FOLDER = OUTPUT_FOLDER / "semesters"
+SLOTS_FOLDER = OUTPUT_FOLDER / "slots"
+SEARCH_FOLDER = OUTPUT_FOLDER / "search"
+ARCHIVE_FOLDER = OUTPUT_FOLDER / "archive"
+DELTAS_FOLDER = OUTPUT_FOLDER / "deltas"
+ENROLLMENT_FOLDER = OUTPUT_FOLDER / "enrollment"
+# 串流解析時每次交給 JSON 解析器的位元組數
+READ_CHUNK_SIZE = 1024 * 1024
+# 部分歷史資料的課程列表包在此欄位中
+SHEET_KEY = "工作表1"
 COURSE_DATA_URL: Dict[str, str] = {
     "latest": "https://www.ccxp.nthu.edu.tw/ccxp/INQUIRE/JH/OPENDATA/open_course_data.json",
-    # "11120-11220": "https://curricul.site.nthu.edu.tw/var/file/208/1208/img/474/11120-11220JSON.json",
-    # "10910-11110": "https://curricul.site.nthu.edu.tw/var/file/208/1208/img/474/unicode_1091_1111.json",
-    # "10820": "https://www.ccxp.nthu.edu.tw/ccxp/INQUIRE/JH/OPENDATA/open_course_data_10820.json",
 }
+# 歷史課程資料只在回補模式處理（scrapy crawl nthu_courses -a backfill=all），
+# 依舊到新排列：同一學期出現在多個來源時，以排在後面的來源為準
+HISTORICAL_COURSE_DATA_URL: Dict[str, str] = {
+    "10820": "https://www.ccxp.nthu.edu.tw/ccxp/INQUIRE/JH/OPENDATA/open_course_data_10820.json",
+    "10910-11110": "https://curricul.site.nthu.edu.tw/var/file/208/1208/img/474/unicode_1091_1111.json",
+    "11120-11220": "https://curricul.site.nthu.edu.tw/var/file/208/1208/img/474/11120-11220JSON.json",
+}
+# 回補狀態（各來源上次處理的內容雜湊與學期），位於專案的 .scrapy 資料夾
+BACKFILL_STATE_FILE = "course_backfill.json"
 
 
 # --- 輔助函式 ---
+def _raw_paths(data_type: str) -> List[Path]:
+    """
+    原始資料的儲存位置。
+
+    最新資料除了 courses/latest.json，也寫入 courses.json；兩者都是已發布的
+    路徑，內容相同（縮排不同）。
+    """
+    paths = [OUTPUT_FOLDER / f"{data_type or 'latest'}.json"]
+    if data_type == "latest":
+        paths.append(LATEST_JSON)
+    return paths
+
+
 def _split_classroom_time(classroom_time: str) -> Dict[str, str]:
     """
     將教室與上課時間字串分割為教室與上課時間。
@@ -56,9 +109,20 @@ def _strip_data_str(data: str) -> str:
     return data.strip()
 
 
+def _iter_chunks(body: bytes, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+    """將回應內容切成固定大小的區塊，不複製整份內容。"""
+    view = memoryview(body)
+    for start in range(0, len(view), chunk_size):
+        yield bytes(view[start : start + chunk_size])
+
+
 # --- 課程資料 ---
-@dataclass
+@dataclass(slots=True)
 class CoursesData:
+    """
+    單筆課程資料。以 __slots__ 儲存欄位，可直接交給 JSON codec 編碼。
+    """
+
     id: str  # 科號
     chinese_title: str  # 中文課名
     english_title: str  # 英文課名
@@ -116,126 +180,563 @@ class CoursesData:
         根據 FIELD_MAPPING 從原始資料中找出對應的欄位資料，
         若找不到則給空字串。
         """
-        data = {}
+        return cls(**CourseNormalizer().normalize(init_data))
 
-        # 處理教室與上課時間 (優先處理分開的欄位，若沒有再處理合併的欄位)
-        if init_data.get("教室與上課時間"):  # 處理分開的欄位
-            classroom_time_data = _split_classroom_time(init_data["教室與上課時間"])
-            data["classroom"] = classroom_time_data.get("classroom", "")
-            data["time"] = classroom_time_data.get("time", "").replace("\n", "")
+    def __repr__(self) -> str:
+        return str(record_to_dict(self))
+
+
+class CourseNormalizer:
+    """
+    將原始課程資料轉換為 CoursesData 欄位的 dict（與 asdict 的結果相同）。
+
+    同一份資料的每筆課程欄位都相同，因此只在遇到新的欄位組合時依
+    FIELD_MAPPING 編譯一次轉換計畫：每個 CoursesData 欄位對應到哪個來源欄位，
+    以及教室、時間是否要由「教室與上課時間」拆出。之後每筆課程只需依計畫
+    一次取出所有來源值，不必逐欄搜尋同義字。
+    """
 
-        for canonical_field, keywords in cls.FIELD_MAPPING.items():
-            found_key = None
-            for key in keywords:
-                if key in init_data:
-                    found_key = key
+    # 來源資料若有此欄位，教室與時間由其內容拆出（除非另有獨立的欄位）
+    CLASSROOM_TIME_KEY = "教室與上課時間"
+
+    def __init__(self):
+        self._template = dict.fromkeys(CoursesData.__dataclass_fields__, "")
+        self._compile(set())
+
+    def _compile(self, keys: Set[str]) -> None:
+        """依來源欄位集合建立轉換計畫。"""
+        self._keys = keys
+        sources: Dict[str, str] = {}
+        for canonical_field, synonyms in CoursesData.FIELD_MAPPING.items():
+            for key in synonyms:
+                if key in keys:
+                    sources[canonical_field] = key
                     break
-            if found_key:
-                data_string = str(init_data[found_key])
-                data_string = _strip_data_str(data_string)
-                data[canonical_field] = data_string
-            else:
-                if canonical_field not in data:
-                    data[canonical_field] = ""
-
-        # 移除不必要的 keys，避免 dataclass 建立錯誤
-        keys_to_remove = []
-        for key in data.keys():
-            if key not in CoursesData.__dataclass_fields__:
-                keys_to_remove.append(key)
-        for key in keys_to_remove:
-            del data[key]
-
-        return cls(**data)
 
-    def __repr__(self) -> str:
-        return str(self.__dict__)
+        self._targets = tuple(sources)
+        source_keys = tuple(sources.values())
+        if len(source_keys) == 1:
+            self._getter = lambda row, key=source_keys[0]: (row[key],)
+        elif source_keys:
+            self._getter = itemgetter(*source_keys)
+        else:
+            self._getter = lambda row: ()
+
+        split = self.CLASSROOM_TIME_KEY in keys
+        self._split_classroom = split and "classroom" not in sources
+        self._split_time = split and "time" not in sources
+
+    def normalize(self, row: Dict[str, Any]) -> Dict[str, str]:
+        """
+        轉換一筆原始課程資料。
+
+        Args:
+            row: 原始課程資料。
+
+        Returns:
+            以 CoursesData 欄位順序排列的 dict，缺少的欄位為空字串。
+        """
+        if row.keys() != self._keys:
+            self._compile(set(row))
+
+        data = self._template.copy()
+        data.update(
+            zip(
+                self._targets,
+                [_strip_data_str(str(value)) for value in self._getter(row)],
+            )
+        )
+        if self._split_classroom or self._split_time:
+            classroom_time = row[self.CLASSROOM_TIME_KEY]
+            if classroom_time:
+                split = _split_classroom_time(classroom_time)
+                if self._split_classroom:
+                    data["classroom"] = split["classroom"]
+                if self._split_time:
+                    data["time"] = split["time"].replace("\n", "")
+        return data
+
+
+@dataclass
+class SemesterOutput:
+    """
+    單一學期在一次資料處理中的輸出：學期課程檔案、時段索引、搜尋索引、
+    欄式 archive 的 segment、與上一次快照比較的 delta，以及（最新資料才有）
+    修課人數紀錄。
+
+    與 JsonArrayWriter 一樣提供 append / close / abort、file_path 與 count。
+    所有寫入另外計入 write_stats（見 file_utils.write_stats_for）。
+    """
+
+    semester: str
+    writer: JsonArrayWriter
+    diff: SemesterDiff
+    slots: List[Tuple[str, int]] = field(default_factory=list)  # (科號, 時段遮罩)
+    search: SearchIndexBuilder = field(default_factory=SearchIndexBuilder)
+    archive: SegmentBuilder = field(
+        default_factory=lambda: SegmentBuilder(list(CoursesData.__dataclass_fields__))
+    )
+    enrollment: Optional[EnrollmentBatch] = None
+    write_stats: Optional[WriteStats] = None
+
+    @property
+    def file_path(self) -> Path:
+        return self.writer.file_path
+
+    @property
+    def count(self) -> int:
+        return self.writer.count
+
+    def append(self, course: Dict[str, str]) -> None:
+        self.writer.append(course)
+        self.diff.add(course)
+        self.slots.append((course["id"], encode_slots(course["time"])))
+        self.search.add(course)
+        self.archive.add(course)
+        if self.enrollment is not None:
+            self.enrollment.add(course)
+
+    def close(self) -> Optional[int]:
+        """
+        完成學期課程檔案並記錄 delta。
+
+        學期檔案內容未變且各索引都已存在時，不重建時段索引、搜尋索引與
+        archive segment。修課人數紀錄由 spider 在之後另外附加
+        （見 CoursesSpider.record_enrollment），失敗時不影響這裡的輸出。
+
+        Returns:
+            新的 delta 版本，沒有變更時返回 None。
+        """
+        result = self.writer.close()
+        if result.written or not self._derived_outputs_exist():
+            save_json(
+                build_slot_index(self.slots),
+                SLOTS_FOLDER / f"{self.semester}.json",
+                stats=self.write_stats,
+            )
+            self.search.write(SEARCH_FOLDER / self.semester, self.write_stats)
+            write_segment(ARCHIVE_FOLDER, self.semester, self.archive, self.write_stats)
+        return DeltaLog(DELTAS_FOLDER, stats=self.write_stats).record(
+            self.semester,
+            self.diff.finish(),
+            self.count,
+            result.digest,
+            has_snapshot=self.diff.has_snapshot,
+        )
+
+    def _derived_outputs_exist(self) -> bool:
+        # 搜尋索引版本不同時同樣需要重建
+        return index_is_current(SEARCH_FOLDER / self.semester) and all(
+            path.exists()
+            for path in (
+                SLOTS_FOLDER / f"{self.semester}.json",
+                ARCHIVE_FOLDER / f"{self.semester}.codes.npy",
+            )
+        )
+
+    def abort(self) -> None:
+        self.writer.abort()
+
+
+def split_feed(
+    body: bytes,
+    raw_writers: List[JsonArrayWriter],
+    open_semester: Callable[[str], Any],
+    on_invalid: Callable[[Dict[str, Any]], None],
+) -> Dict[str, Any]:
+    """
+    串流解析一份課程資料：原始資料寫入 raw_writers，轉換後依科號前 5 碼
+    （學期）寫入 open_semester 建立的輸出。
+
+    課程列表不會整份載入記憶體，峰值記憶體只與單筆課程的大小有關。任何一筆
+    解析失敗時放棄所有寫入並拋出例外，既有檔案維持原狀；成功時由呼叫端
+    close 各個輸出。
+
+    Args:
+        body: 課程資料 JSON。
+        raw_writers: 原始資料的寫入器。
+        open_semester: 學期 -> 具有 append / close / abort 的輸出。
+        on_invalid: 遇到科號格式錯誤的課程時呼叫。
+
+    Returns:
+        學期 -> 該學期的輸出。
+    """
+    semesters: Dict[str, Any] = {}
+    normalizer = CourseNormalizer()
+    try:
+        for course_dict in iter_json_array(_iter_chunks(body), key=SHEET_KEY):
+            for writer in raw_writers:
+                writer.append(course_dict)
+            course = normalizer.normalize(course_dict)
+            semester = course["id"][:5]
+            if len(semester) != 5:
+                on_invalid(course_dict)
+                continue
+            output = semesters.get(semester)
+            if output is None:
+                output = semesters[semester] = open_semester(semester)
+            output.append(course)
+    except BaseException:
+        for output in [*raw_writers, *semesters.values()]:
+            output.abort()
+        raise
+    return semesters
+
+
+def stage_source(body: bytes, raw_path: str, staging_folder: str) -> Dict[str, Any]:
+    """
+    在 process pool 中處理一個歷史資料來源。
+
+    原始資料寫入 raw_path，轉換後的各學期課程寫入 staging_folder/<學期>.json，
+    由主行程決定每個學期採用哪個來源後再正式寫入。
+
+    Returns:
+        {"semesters": {學期: 課程數}, "invalid": 科號格式錯誤的筆數}
+    """
+    invalid: List[Dict[str, Any]] = []
+    staging = Path(staging_folder)
+    raw_writers = [JsonArrayWriter(Path(raw_path), indent=2)]
+    semesters = split_feed(
+        body,
+        raw_writers,
+        lambda semester: JsonArrayWriter(staging / f"{semester}.json", indent=None),
+        invalid.append,
+    )
+    for output in [*raw_writers, *semesters.values()]:
+        output.close()
+    return {
+        "semesters": {semester: output.count for semester, output in semesters.items()},
+        "invalid": len(invalid),
+    }
 
 
 class CoursesSpider(scrapy.Spider):
     """
     清華大學課程資訊爬蟲
+
+    預設只處理最新課程資料。回補模式以 -a backfill=all（或以逗號分隔的
+    HISTORICAL_COURSE_DATA_URL 名稱）處理歷史資料，加上 -a force=1 時不論
+    內容是否變更都重新處理。
     """
 
     name = "nthu_courses"
     allowed_domains = ["www.ccxp.nthu.edu.tw", "curricul.site.nthu.edu.tw"]
     custom_settings = {
         "ROBOTSTXT_OBEY": False,
+        # 只下載 JSON，不需要 cookie。從 _BASE 移除 CookiesMiddleware（設為 None 仍會
+        # 匯入模組），省下啟動時匯入 tldextract
+        "DOWNLOADER_MIDDLEWARES_BASE": {
+            path: order
+            for path, order in default_settings.DOWNLOADER_MIDDLEWARES_BASE.items()
+            if path != "scrapy.downloadermiddlewares.cookies.CookiesMiddleware"
+        },
+        "HTTPCACHE_EXPIRATION_SECS": 60 * 60,
     }
 
+    @property
+    def write_stats(self) -> WriteStats:
+        """此 crawler 的寫入統計，同時執行的其他 spider 的寫入不會計入。"""
+        return write_stats_for(self.crawler)
+
     async def start(self):
+        backfill = getattr(self, "backfill", "")
+        if backfill:
+            for request in self.start_backfill(backfill):
+                yield request
+            return
         # 逐筆建立 Request 並傳入 data_type 到 meta 中
         for data_type, url in COURSE_DATA_URL.items():
             yield scrapy.Request(url=url, meta={"data_type": data_type})
 
     def parse(self, response):
         """
-        處理 JSON 課程資料，儲存原始資料，再依科號分學期儲存檔案。
+        串流處理 JSON 課程資料，同時寫入原始資料與各學期檔案（見 split_feed）。
         """
+        data_type = response.meta.get("data_type", "")
+        self.logger.info(f"✅ 成功取得資料 ({data_type}): {response.url}")
+        self.check_format(response, data_type)
+
+        raw_writers = [
+            JsonArrayWriter(
+                raw_path,
+                indent=4 if raw_path == LATEST_JSON else 2,
+                stats=self.write_stats,
+            )
+            for raw_path in _raw_paths(data_type)
+        ]
+
+        crawled_at = int(time.time())
         try:
-            data: Any = response.json()
+            semesters = split_feed(
+                response.body,
+                raw_writers,
+                lambda semester: self.open_semester(semester, crawled_at),
+                lambda course: self.logger.error(f"❎ 科號格式錯誤: {course}"),
+            )
         except Exception as e:
-            self.logger.error(f"❎ JSON 解析失敗: {e}")
+            self.logger.error(f"❎ JSON 解析失敗 ({data_type}): {e}")
+            # 不記錄條件式請求的驗證資訊，下次執行重新下載
+            response.meta["conditional_get_failed"] = True
             return
 
+        for output in [*raw_writers, *semesters.values()]:
+            try:
+                result = output.close()
+            except Exception as e:
+                self.logger.error(f"❎ 儲存資料錯誤: {output.file_path}: {e}")
+                # 不記錄條件式請求的驗證資訊，下次執行重新下載
+                response.meta["conditional_get_failed"] = True
+                continue
+            self.logger.info(f"✅ 已儲存 {output.count} 筆資料至: {output.file_path}")
+            if isinstance(output, SemesterOutput):
+                self.log_delta(output, result)
+                self.record_enrollment(output)
+
+    def parse_not_modified(self, response):
+        """
+        課程資料未變更 (304)：沿用上次儲存的檔案。
+
+        若本機沒有上次的檔案，改以一般請求重新下載。
+        """
         data_type = response.meta.get("data_type", "")
-        self.logger.info(f"✅ 成功取得資料 ({data_type}): {response.url}")
+        if all(path.exists() for path in _raw_paths(data_type)):
+            self.logger.info(
+                f"✅ 課程資料未變更 ({data_type})，略過處理: {response.url}"
+            )
+            if response.meta.get("backfill"):
+                self.crawler.stats.inc_value("course_backfill/not_modified")
+            return
+        yield response.request.replace(
+            callback=(
+                self.parse_backfill if response.meta.get("backfill") else self.parse
+            ),
+            dont_filter=True,
+            meta={**response.meta, "dont_conditional_get": True},
+        )
+
+    def check_format(self, response, data_type: str) -> None:
+        # 處理特殊格式：若資料為物件，取出 "工作表1" 的內容
+        if response.body[:64].lstrip(b"\xef\xbb\xbf \t\r\n")[:1] == b"{":
+            self.logger.warning(
+                f'⚠️ 在【{data_type}】發現特殊格式，取出 "{SHEET_KEY}" 資料'
+            )
+
+    def open_semester(
+        self, semester: str, crawled_at: Optional[int] = None
+    ) -> SemesterOutput:
+        """
+        建立學期的輸出（學期課程檔案與各種索引）。
 
-        # 處理特殊格式：若資料包含 "工作表1"，則取其內容
-        if isinstance(data, dict) and "工作表1" in data:
-            self.logger.warning(f'⚠️ 在【{data_type}】發現特殊格式，取出 "工作表1" 資料')
-            data = data["工作表1"]
+        Args:
+            semester: 學期。
+            crawled_at: 爬取時間（Unix 秒），有指定且 COURSE_ENROLLMENT_ENABLED
+                開啟時記錄修課人數。歷史資料回補不指定，避免把舊學期的人數
+                記在回補的時間點。
+        """
+        self.logger.info(f"✅ 新增學期: {semester}")
+        file_path = SEMESTERS_FOLDER / f"{semester}.json"
+        previous = load_json(file_path) if file_path.exists() else None
+        return SemesterOutput(
+            semester,
+            JsonArrayWriter(file_path, stats=self.write_stats),
+            SemesterDiff(previous),
+            enrollment=(
+                EnrollmentBatch(semester, crawled_at)
+                if crawled_at is not None
+                and self.settings.getbool("COURSE_ENROLLMENT_ENABLED")
+                else None
+            ),
+            write_stats=self.write_stats,
+        )
+
+    def log_delta(self, output: SemesterOutput, version: Optional[int]) -> None:
+        """記錄學期 delta 的版本與統計。"""
+        if version is None:
+            self.crawler.stats.inc_value("course_delta/unchanged")
+            return
+        self.logger.info(f"✅ 學期 {output.semester} 更新為第 {version} 版")
+        self.crawler.stats.inc_value("course_delta/updated")
+
+    def record_enrollment(self, output: SemesterOutput) -> None:
+        """
+        在學期檔案與 delta 都完成後附加修課人數紀錄。
 
-        # 儲存原始 JSON 資料
-        OUTPUT_FOLDER.mkdir(parents=True, exist_ok=True)
-        file_name = f"{data_type}.json" if data_type else "latest.json"
-        output_file = OUTPUT_FOLDER / file_name
+        紀錄失敗（例如時間倒退）只記錄錯誤，不影響已完成的學期輸出；資料來源
+        沒有總人數時不寫入。
+        """
+        batch = output.enrollment
+        if batch is None:
+            return
+        if not batch.has_counts:
+            self.logger.debug(
+                f"⚠️ 學期 {output.semester} 的課程資料沒有總人數，未記錄修課人數"
+            )
+            self.crawler.stats.inc_value("course_enrollment/no_counts")
+            return
         try:
-            with output_file.open("w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"✅ 原始資料已儲存至: {output_file}")
-        except IOError as e:
-            self.logger.error(f"❎ 儲存原始資料錯誤: {e}")
-
-        if data_type == "latest":
-            save_json(data, LATEST_JSON)
-            self.logger.info(f"✅ 更新最新課程資料至: {LATEST_JSON}")
-
-        # 呼叫分檔方法處理課程資料 (僅當資料為列表時)
-        semesters_folder = OUTPUT_FOLDER / "semesters"
-        if isinstance(data, list):
-            self.split_course_data(data, semesters_folder)
-        else:
-            self.logger.error("❎ 資料格式非列表，無法分檔")
+            EnrollmentStore(ENROLLMENT_FOLDER, self.write_stats).append(batch)
+        except Exception as e:
+            self.logger.error(f"❎ 修課人數紀錄失敗 ({output.semester}): {e}")
+            self.crawler.stats.inc_value("course_enrollment/failed")
+            return
+        self.crawler.stats.inc_value("course_enrollment/recorded")
 
-    def split_course_data(
-        self, data: List[Dict[str, Any]], output_folder: Path
-    ) -> None:
+    # --- 歷史資料回補 ---
+    def start_backfill(self, backfill: str) -> Iterator[scrapy.Request]:
         """
-        根據科號前 5 碼（學期）將課程資料分割並儲存至各 JSON 檔案中。
+        建立回補請求，並準備 process pool 與暫存資料夾。
 
-        Args:
-            data: 課程資料列表。
-            output_folder: 儲存分檔資料的資料夾。
+        每個來源下載後交給 process pool 中的一個 worker 解析、轉換與分檔；
+        所有來源處理完（spider_idle）後，再依來源順序決定每個學期採用的
+        資料並寫入，因此結果與下載、處理完成的順序無關。
+        """
+        names = (
+            list(HISTORICAL_COURSE_DATA_URL)
+            if backfill == "all"
+            else [name.strip() for name in backfill.split(",") if name.strip()]
+        )
+        unknown = [name for name in names if name not in HISTORICAL_COURSE_DATA_URL]
+        if unknown:
+            raise ValueError(f"未知的歷史課程資料來源: {', '.join(unknown)}")
+        # 依 HISTORICAL_COURSE_DATA_URL 的順序處理，決定學期的優先順序
+        self.backfill_sources = [
+            name for name in HISTORICAL_COURSE_DATA_URL if name in names
+        ]
+        self.force = str(getattr(self, "force", "")).lower() in ("1", "true", "yes")
+
+        self.backfill_state_path = Path(data_path(BACKFILL_STATE_FILE))
+        self.backfill_state: Dict[str, Dict[str, Any]] = {}
+        if self.backfill_state_path.exists():
+            self.backfill_state = load_json(self.backfill_state_path) or {}
+        self.staged: Dict[str, Dict[str, Any]] = {}
+        self.staging_folder = Path(tempfile.mkdtemp(prefix="course_backfill_"))
+        # spawn：不複製 reactor 的執行緒與 socket 到 worker
+        self.pool = ProcessPoolExecutor(
+            max_workers=min(len(self.backfill_sources), os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        self.crawler.signals.connect(self.merge_backfill, signal=signals.spider_idle)
+        self.backfill_merged = False
+
+        for name in self.backfill_sources:
+            meta: Dict[str, Any] = {"data_type": name, "backfill": True}
+            if self.force:
+                meta["dont_conditional_get"] = True
+            yield scrapy.Request(
+                HISTORICAL_COURSE_DATA_URL[name],
+                callback=self.parse_backfill,
+                meta=meta,
+            )
+
+    async def parse_backfill(self, response):
+        """內容雜湊未變時略過，否則交給 process pool 處理。"""
+        source = response.meta["data_type"]
+        digest = hashlib.sha256(response.body).hexdigest()
+        previous = self.backfill_state.get(source, {})
+        if (
+            not self.force
+            and previous.get("sha256") == digest
+            and all(
+                (SEMESTERS_FOLDER / f"{semester}.json").exists()
+                for semester in previous.get("semesters", [])
+            )
+        ):
+            self.logger.info(f"✅ 歷史資料內容未變更 ({source})，略過處理")
+            self.crawler.stats.inc_value("course_backfill/unchanged")
+            return
+
+        self.check_format(response, source)
+        staging = self.staging_folder / source
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wrap_future(
+                self.pool.submit(
+                    stage_source,
+                    response.body,
+                    str(OUTPUT_FOLDER / f"{source}.json"),
+                    str(staging),
+                )
+            )
+        except Exception as e:
+            self.logger.error(f"❎ 歷史資料處理失敗 ({source}): {e}")
+            # 不記錄條件式請求的驗證資訊，下次執行重新下載
+            response.meta["conditional_get_failed"] = True
+            self.crawler.stats.inc_value("course_backfill/failed")
+            return
+        if result["invalid"]:
+            self.logger.error(f"❎ {source} 有 {result['invalid']} 筆科號格式錯誤")
+        self.logger.info(
+            f"✅ 已處理歷史資料 ({source})：{len(result['semesters'])} 個學期，"
+            f"{time.perf_counter() - start:.1f} 秒"
+        )
+        self.staged[source] = {"sha256": digest, **result}
+        self.crawler.stats.inc_value("course_backfill/staged")
+
+    def merge_backfill(self, spider):
         """
-        semesters: Dict[str, List[Dict[str, Any]]] = {}
+        所有來源處理完後，依來源順序合併各學期的資料。
 
-        for course_dict in data:
-            course_data = CoursesData.from_dict(course_dict)
-            course_id = course_data.id
-            semester = course_id[:5]
-            if len(semester) != 5:
-                self.logger.error(f"❎ 科號格式錯誤: {course_dict}")
+        同一學期出現在多個來源時，以 HISTORICAL_COURSE_DATA_URL 中排在最後的
+        來源為準；若該來源本次未變更而未處理，沿用既有的學期檔案。
+        """
+        if self.backfill_merged:
+            return
+        self.backfill_merged = True
+        semesters = sorted(
+            {
+                semester
+                for result in self.staged.values()
+                for semester in result["semesters"]
+            }
+        )
+        for semester in semesters:
+            owner = self.semester_owner(semester)
+            if owner not in self.staged:
                 continue
-            if semester not in semesters:
-                self.logger.info(f"✅ 新增學期: {semester}")
-                semesters[semester] = []
-            semesters[semester].append(asdict(course_data))
-
-        output_folder.mkdir(parents=True, exist_ok=True)
-        for semester, courses in semesters.items():
-            semester_file = output_folder / f"{semester}.json"
-            if save_json(courses, semester_file, ensure_dir=False):
-                self.logger.info(f"✅ 儲存學期 {semester} 資料至: {semester_file}")
-            else:
-                self.logger.error(f"❌ 儲存學期 {semester} 資料失敗: {semester_file}")
+            self.publish_semester(
+                semester, self.staging_folder / owner / f"{semester}.json"
+            )
+            self.crawler.stats.inc_value("course_backfill/semesters_written")
+
+        checked = date.today().isoformat()
+        for source, result in self.staged.items():
+            self.backfill_state[source] = {
+                "sha256": result["sha256"],
+                "semesters": sorted(result["semesters"]),
+                "checked": checked,
+            }
+        if self.staged:
+            save_json(
+                self.backfill_state,
+                self.backfill_state_path,
+                indent=2,
+                stats=self.write_stats,
+            )
+
+    def semester_owner(self, semester: str) -> str:
+        """包含該學期、且在 HISTORICAL_COURSE_DATA_URL 中排在最後的來源。"""
+        owner = ""
+        for source in HISTORICAL_COURSE_DATA_URL:
+            result = self.staged.get(source) or self.backfill_state.get(source, {})
+            if semester in result.get("semesters", ()):
+                owner = source
+        return owner
+
+    def closed(self, reason):
+        if getattr(self, "pool", None) is not None:
+            self.pool.shutdown()
+            shutil.rmtree(self.staging_folder, ignore_errors=True)
+
+    def publish_semester(self, semester: str, staged_path: Path) -> None:
+        """將暫存的學期資料寫入學期檔案與各種索引。"""
+        output = self.open_semester(semester)
+        try:
+            for course in iter_json_array(_iter_chunks(staged_path.read_bytes())):
+                output.append(course)
+            version = output.close()
+        except Exception as e:
+            output.abort()
+            self.logger.error(f"❎ 儲存學期 {semester} 資料失敗: {e}")
+            return
+        self.logger.info(f"✅ 已儲存 {output.count} 筆資料至: {output.file_path}")
+        self.log_delta(output, version)
@@ -3,9 +3,10 @@ import re
 from typing import Any, List
 
 import scrapy
+from scrapy.settings import default_settings
 
 from nthu_scraper.utils.constants import DATA_FOLDER
-from nthu_scraper.utils.file_utils import save_json
+from nthu_scraper.utils.file_utils import save_json, write_stats_for
 
 # 預先編譯正規表達式（改善效能與可讀性）
 DINING_REGEX = re.compile(r"const restaurantsData = (\[.*?)(?:\s+renderTabs)", re.S)
@@ -30,6 +31,13 @@ class DiningSpider(scrapy.Spider):
     start_urls = ["https://ddfm.site.nthu.edu.tw/p/404-1494-256455.php?Lang=zh-tw"]
     custom_settings = {
         "ITEM_PIPELINES": {"nthu_scraper.spiders.nthu_dining.JsonDiningPipeline": 1},
+        # 單一頁面，不需要 cookie。從 _BASE 移除 CookiesMiddleware（設為 None 仍會
+        # 匯入模組），省下啟動時匯入 tldextract
+        "DOWNLOADER_MIDDLEWARES_BASE": {
+            path: order
+            for path, order in default_settings.DOWNLOADER_MIDDLEWARES_BASE.items()
+            if path != "scrapy.downloadermiddlewares.cookies.CookiesMiddleware"
+        },
     }
 
     def parse(self, response):
@@ -89,7 +97,9 @@ class JsonDiningPipeline:
         處理每一個 DiningItem，儲存餐廳資料到 JSON 檔案。
         """
         if isinstance(item, DiningItem):
-            if save_json(item["data"], OUTPUT_PATH):
+            if save_json(
+                item["data"], OUTPUT_PATH, stats=write_stats_for(spider.crawler)
+            ):
                 spider.logger.info(f'✅ 成功儲存餐廳資料至 "{OUTPUT_PATH}"')
             else:
                 spider.logger.error(f'❌ 儲存餐廳資料失敗 "{OUTPUT_PATH}"')
@@ -1,11 +1,12 @@
 import json
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Dict, List
 
 import scrapy
 
+from nthu_scraper.utils.base_pipelines import JsonFilePipeline
 from nthu_scraper.utils.constants import DATA_FOLDER
-from nthu_scraper.utils.file_utils import save_json
 
 # --- 全域參數設定 ---
 COMBINED_JSON_FILE = DATA_FOLDER / "directory.json"
@@ -44,64 +45,20 @@ def _translate_key(key: str) -> str:
 
 
 # --- 資料結構定義 ---
-class ContactInfo:
-    """
-    聯絡資訊資料結構。
-    """
-
-    def __init__(self, data: Dict[str, str | None]):
-        """
-        初始化 ContactInfo 物件。
-
-        Args:
-            data (Dict[str, str]): 聯絡資訊字典，鍵值為項目名稱，值為項目內容。
-        """
-        self.data = data
-
-    def __repr__(self):
-        return f"ContactInfo({self.data})"
-
-
-class Person:
-    """
-    人員資料結構。
-    """
-
-    def __init__(self, data: Dict[str, str | None]):
-        """
-        初始化 Person 物件。
-
-        Args:
-            data (Dict[str, str]): 人員資訊字典，鍵值為欄位名稱，值為欄位內容。
-        """
-        self.data = data
-
-    def __repr__(self):
-        return f"Person({self.data})"
-
-
+@dataclass(slots=True)
 class DepartmentDetail:
     """
     系所詳細資料結構。
+
+    Attributes:
+        departments (List[Dict[str, str]]): 下級部門列表，包含名稱和 URL。
+        contact (Dict[str, str | None]): 聯絡資訊，鍵值為項目名稱，值為項目內容。
+        people (List[Dict[str, str | None]]): 人員列表，每筆為欄位名稱 -> 欄位內容。
     """
 
-    def __init__(
-        self,
-        departments: List[Dict[str, str]],
-        contact: ContactInfo,
-        people: List[Person],
-    ):
-        """
-        初始化 DepartmentDetail 物件。
-
-        Args:
-            departments (List[Dict[str, str]]): 下級部門列表，包含名稱和 URL。
-            contact (ContactInfo): 聯絡資訊物件。
-            people (List[Person]): 人員列表，包含 Person 物件。
-        """
-        self.departments = departments
-        self.contact = contact
-        self.people = people
+    departments: List[Dict[str, str]]
+    contact: Dict[str, str | None]
+    people: List[Dict[str, str | None]]
 
     def __repr__(self):
         return (
@@ -109,25 +66,21 @@ class DepartmentDetail:
             f"contact={self.contact}, people_count={len(self.people)})"
         )
 
-    def to_dict(self) -> Dict[str, Any]:
-        return {
-            "departments": self.departments,
-            "contact": self.contact.data,
-            "people": [person.data for person in self.people],
-        }
-
 
-class DepartmentItem(scrapy.Item):
+@dataclass(slots=True)
+class DepartmentItem:
     """
-    Scrapy Item，用於儲存系所詳細資料。
+    系所詳細資料的 Item。
+
+    以 __slots__ 儲存欄位，pipeline 直接保留並交給 JSON codec 編碼，不需要
+    先複製成 dict。
     """
 
-    index = scrapy.Field()
-    name = scrapy.Field()
-    parent_index = scrapy.Field()  # 上級單位 index
-    parent_name = scrapy.Field()  # 上級單位名稱
-    url = scrapy.Field()
-    details = scrapy.Field()
+    index: str | None
+    name: str
+    parent_name: str | None  # 上級單位名稱
+    url: str
+    details: DepartmentDetail
 
 
 class DirectorySpider(scrapy.Spider):
@@ -141,7 +94,9 @@ class DirectorySpider(scrapy.Spider):
     custom_settings = {
         "LOG_LEVEL": "INFO",
         "ITEM_PIPELINES": {"nthu_scraper.spiders.nthu_directory.JsonPipeline": 1},
+        "JSON_PIPELINE_MODE": "jsonl",
         "AUTOTHROTTLE_ENABLED": True,
+        "HTTPCACHE_EXPIRATION_SECS": 3 * 24 * 60 * 60,
     }
 
     def parse(self, response):
@@ -217,8 +172,8 @@ class DirectorySpider(scrapy.Spider):
 
         dept_detail = DepartmentDetail(
             departments=departments,
-            contact=ContactInfo(contact_data),
-            people=[Person(p) for p in people_data_list],
+            contact=contact_data,
+            people=people_data_list,
         )
 
         # 計算 index
@@ -229,13 +184,13 @@ class DirectorySpider(scrapy.Spider):
                 dd_value = param.split("=")[1]
                 break
 
-        item = DepartmentItem()
-        item["index"] = dd_value
-        item["name"] = dept_name
-        item["parent_name"] = response.meta.get("parent_name", None)
-        item["url"] = response.url
-        item["details"] = dept_detail
-        yield item
+        yield DepartmentItem(
+            index=dd_value,
+            name=dept_name,
+            parent_name=response.meta.get("parent_name", None),
+            url=response.url,
+            details=dept_detail,
+        )
 
     def parse_contact_table(self, table):
         """
@@ -308,35 +263,17 @@ class DirectorySpider(scrapy.Spider):
         return people
 
 
-class JsonPipeline:
+class JsonPipeline(JsonFilePipeline):
     """
-    Scrapy Pipeline，用於將爬取的 Item 儲存為 JSON 檔案。
+    Scrapy Pipeline，用於將爬取的 Item 依 index 排序後儲存為 JSON 檔案。
     """
 
-    def open_spider(self, spider):
-        """
-        Spider 開啟時執行，建立必要的資料夾。
-        """
-        COMBINED_JSON_FILE.parent.mkdir(parents=True, exist_ok=True)
-        self.combined_data = []
+    def __init__(self):
+        super().__init__(COMBINED_JSON_FILE, sort_field="index")
 
     def process_item(self, item, spider):
         """
-        處理每一個 Item，儲存系所詳細資料到 JSON 檔案。
-        """
-        serializable_item = dict(item)
-        if hasattr(serializable_item.get("details"), "to_dict"):
-            serializable_item["details"] = serializable_item["details"].to_dict()
-        spider.logger.info(f"✅ 成功儲存【{item['name']}】")
-        self.combined_data.append(serializable_item)
-        return item
-
-    def close_spider(self, spider):
-        """
-        Spider 關閉時執行，合併所有系所 JSON 檔案。
+        處理每一個 Item，儲存系所詳細資料。
         """
-        self.combined_data.sort(key=lambda x: x.get("index", ""))
-        if save_json(self.combined_data, COMBINED_JSON_FILE):
-            spider.logger.info(f'✅ 成功儲存通訊錄資料至 "{COMBINED_JSON_FILE}"')
-        else:
-            spider.logger.error(f'❌ 儲存通訊錄資料失敗 "{COMBINED_JSON_FILE}"')
+        spider.logger.info(f"✅ 成功儲存【{item.name}】")
+        return super().process_item(item, spider)
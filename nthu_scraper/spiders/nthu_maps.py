@@ -5,7 +5,7 @@ from typing import Dict
 import scrapy
 
 from nthu_scraper.utils.constants import DATA_FOLDER
-from nthu_scraper.utils.file_utils import save_json
+from nthu_scraper.utils.file_utils import save_json, write_stats_for
 
 # --- 全域參數設定 ---
 OUTPUT_PATH = DATA_FOLDER / "maps"
@@ -39,6 +39,7 @@ class MapSpider(scrapy.Spider):
     start_urls = list(MAP_URLS.values())  # 從 MAP_URLS 取值作為起始網址
     custom_settings = {
         "ITEM_PIPELINES": {"nthu_scraper.spiders.nthu_maps.JsonMapPipeline": 1},
+        "HTTPCACHE_EXPIRATION_SECS": 7 * 24 * 60 * 60,
     }
 
     def parse(self, response):
@@ -114,7 +115,7 @@ class JsonMapPipeline:
             self.all_map_data[map_type] = map_data  # 收集所有地圖資料
 
             file_path = OUTPUT_PATH / f"{map_type}.json"
-            if save_json(map_data, file_path):
+            if save_json(map_data, file_path, stats=write_stats_for(spider.crawler)):
                 spider.logger.info(
                     f'✅ 成功儲存 {map_type} 的地圖座標資料至 "{file_path}"'
                 )
@@ -128,7 +129,9 @@ class JsonMapPipeline:
         """
         # Sort keys before saving
         sorted_data = dict(sorted(self.all_map_data.items()))
-        if save_json(sorted_data, COMBINED_JSON_FILE):
+        if save_json(
+            sorted_data, COMBINED_JSON_FILE, stats=write_stats_for(spider.crawler)
+        ):
             spider.logger.info(f"✅ 成功儲存地圖資料至 {COMBINED_JSON_FILE}")
         else:
             spider.logger.error(f"❌ 儲存地圖資料失敗 {COMBINED_JSON_FILE}")
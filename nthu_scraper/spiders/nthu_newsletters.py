@@ -7,8 +7,8 @@ from typing import Set
 import scrapy
 from scrapy.http import Response
 
+from nthu_scraper.utils.base_pipelines import JsonFilePipeline
 from nthu_scraper.utils.constants import DATA_FOLDER
-from nthu_scraper.utils.file_utils import save_json
 
 # --- 全域參數設定 ---
 COMBINED_JSON_FILE = DATA_FOLDER / "newsletters.json"
@@ -50,6 +50,7 @@ class NewsletterSpider(scrapy.Spider):
     start_urls = [f"{URL_PREFIX}/nthu-list/search.html"]
     custom_settings = {
         "ITEM_PIPELINES": {"nthu_scraper.spiders.nthu_newsletters.JsonPipeline": 1},
+        "JSON_PIPELINE_MODE": "jsonl",
     }
 
     processed_urls: Set[str] = set()  # 用於追蹤已處理的 URL，避免重複請求
@@ -207,18 +208,13 @@ class NewsletterSpider(scrapy.Spider):
         return date_str
 
 
-class JsonPipeline:
+class JsonPipeline(JsonFilePipeline):
     """
-    Scrapy Pipeline，用於將爬取的 Item 儲存為 JSON 檔案。
-    同時會合併所有電子報資料到一個總合檔案。
+    Scrapy Pipeline，將所有電子報資料依名稱排序後合併儲存為一個 JSON 檔案。
     """
 
-    def open_spider(self, spider):
-        """
-        Spider 開啟時執行，建立必要的資料夾。
-        """
-        COMBINED_JSON_FILE.parent.mkdir(parents=True, exist_ok=True)
-        self.combined_data = []
+    def __init__(self):
+        super().__init__(COMBINED_JSON_FILE, sort_field="name")
 
     def process_item(self, item, spider):
         """
@@ -231,19 +227,6 @@ class JsonPipeline:
         Returns:
             NewsletterItem: 處理後的 Item
         """
-        serializable_item = dict(item)
         spider.logger.info(f"✅ 成功儲存【{item['name']}】資料")
-        spider.logger.debug(serializable_item)
-        self.combined_data.append(serializable_item)
-
-        return item
-
-    def close_spider(self, spider):
-        """
-        Spider 關閉時執行，合併所有電子報 JSON 檔案。
-        """
-        sorted_data = sorted(self.combined_data, key=lambda x: x["name"])
-        if save_json(sorted_data, COMBINED_JSON_FILE):
-            spider.logger.info(f'✅ 成功儲存電子報資料至 "{COMBINED_JSON_FILE}"')
-        else:
-            spider.logger.error(f'❌ 儲存電子報資料失敗 "{COMBINED_JSON_FILE}"')
+        spider.logger.debug(item)
+        return super().process_item(item, spider)
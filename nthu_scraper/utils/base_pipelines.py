@@ -1,32 +1,122 @@
 """Common base pipelines for scrapers."""
 
+from collections import deque
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Iterator, Optional
 
-from nthu_scraper.utils.file_utils import save_json
+from scrapy.utils.project import data_path
+
+from nthu_scraper.utils.file_utils import (
+    JsonArrayWriter,
+    JsonObjectWriter,
+    save_json,
+    write_stats_for,
+)
+from nthu_scraper.utils.json_codec import is_record
+from nthu_scraper.utils.jsonl import (
+    DEFAULT_RUN_SIZE,
+    JsonLinesWriter,
+    external_sort,
+    iter_json_lines,
+)
+
+# JSON_PIPELINE_MODE 的可用值
+MODE_MEMORY = "memory"
+MODE_JSONL = "jsonl"
+
+
+def _open_spool(spider, output_path: Path) -> Optional[JsonLinesWriter]:
+    """依 JSON_PIPELINE_MODE 建立 JSONL 暫存檔，memory 模式返回 None。"""
+    mode = spider.settings.get("JSON_PIPELINE_MODE", MODE_MEMORY)
+    if mode == MODE_MEMORY:
+        return None
+    if mode != MODE_JSONL:
+        raise ValueError(f"未知的 JSON_PIPELINE_MODE: {mode}")
+    spool_dir = Path(
+        data_path(
+            spider.settings.get("JSON_PIPELINE_SPOOL_DIR", "json_spool"),
+            createdir=True,
+        )
+    )
+    spool_path = spool_dir / f"{output_path.stem}.jsonl"
+    if spool_path.exists():
+        _keep_interrupted_spool(spider, spool_path)
+    return JsonLinesWriter(spool_path)
+
+
+def _keep_interrupted_spool(spider, spool_path: Path) -> None:
+    """
+    保留上次中途被終止的執行留下的暫存檔，避免被這次執行覆寫。
+
+    暫存檔只有部分資料，直接組成 JSON 會以不完整的資料取代上次成功寫出的
+    檔案，因此不合併，只改名為 <名稱>.interrupted.jsonl（覆寫更早留下的
+    同名檔案）供人工檢查或補救。
+    """
+    with open(spool_path, "rb") as f:
+        # 每筆資料一行；最後一行若被截斷則沒有換行，不計入
+        records = sum(
+            chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b"")
+        )
+    interrupted_path = spool_path.with_suffix(".interrupted.jsonl")
+    spool_path.replace(interrupted_path)
+    spider.crawler.stats.inc_value("json_pipeline/interrupted_spools")
+    spider.logger.warning(
+        f"⚠️ 上次執行未完成，已將暫存檔（{records} 筆完整資料）保留至 "
+        f'"{interrupted_path}"'
+    )
+
+
+def _field_getter(field: str):
+    """取得 dict 或紀錄欄位值的函式（memory 模式保留紀錄，JSONL 讀回為 dict）。"""
+
+    def get(item: Any) -> Any:
+        return item[field] if isinstance(item, dict) else getattr(item, field)
+
+    return get
 
 
 class JsonFilePipeline:
     """
     基礎 JSON 檔案 Pipeline。
-    
-    負責將爬取的資料儲存為 JSON 檔案。
+
+    負責將爬取的資料儲存為 JSON 檔案（頂層為 list）。收集方式由 spider 的
+    JSON_PIPELINE_MODE 設定決定：
+
+    - "memory"：在記憶體中收集，結束時一次寫入。
+    - "jsonl"：每筆資料到達時附加到 .scrapy/<JSON_PIPELINE_SPOOL_DIR>/ 下的
+      JSONL 暫存檔，記憶體用量不隨資料量成長。結束時逐筆讀回寫入
+      output_path；需要排序時以外部合併排序，每個 run 最多
+      JSON_PIPELINE_SORT_BUFFER 筆。中途被終止時 output_path 維持上次的
+      內容，已收到的資料留在暫存檔中；下次執行開始時改名為
+      <名稱>.interrupted.jsonl 保留，不會合併進輸出。
+
+    兩種模式寫出的檔案完全相同。
     """
 
-    def __init__(self, output_path: Path):
+    def __init__(self, output_path: Path, sort_field: Optional[str] = None):
         """
         初始化 Pipeline。
 
         Args:
             output_path: JSON 檔案輸出路徑。
+            sort_field: 寫入前依此欄位排序（穩定排序），None 表示維持收到的順序。
         """
         self.output_path = output_path
+        self.sort_field = sort_field
         self.collected_data = []
+        self.spool: Optional[JsonLinesWriter] = None
 
     def open_spider(self, spider):
-        """Spider 開啟時執行，建立必要的資料夾。"""
+        """Spider 開啟時執行，建立必要的資料夾與 JSONL 暫存檔。"""
         self.output_path.parent.mkdir(parents=True, exist_ok=True)
         self.collected_data = []
+        self.spool = _open_spool(spider, self.output_path)
+        self.write_stats = write_stats_for(spider.crawler)
+        self.run_size = spider.settings.getint(
+            "JSON_PIPELINE_SORT_BUFFER", DEFAULT_RUN_SIZE
+        )
 
     def process_item(self, item, spider):
         """
@@ -39,7 +129,12 @@ class JsonFilePipeline:
         Returns:
             傳遞 Item 給下一個 Pipeline。
         """
-        self.collected_data.append(dict(item))
+        # dataclass 紀錄直接保留，由 JSON codec 編碼；其他 Item 複製成 dict
+        data = item if is_record(item) else dict(item)
+        if self.spool is not None:
+            self.spool.append(data)
+        else:
+            self.collected_data.append(data)
         return item
 
     def close_spider(self, spider):
@@ -49,33 +144,84 @@ class JsonFilePipeline:
         Args:
             spider: 關閉的爬蟲物件。
         """
-        if save_json(self.collected_data, self.output_path):
+        if self.spool is None:
+            if self.sort_field:
+                self.collected_data.sort(key=_field_getter(self.sort_field))
+            saved = save_json(
+                self.collected_data, self.output_path, stats=self.write_stats
+            )
+        else:
+            saved = self._write_spool(spider)
+
+        if saved:
             spider.logger.info(f'✅ 成功儲存資料至 "{self.output_path}"')
         else:
             spider.logger.error(f'❌ 儲存資料失敗 "{self.output_path}"')
 
+    def _write_spool(self, spider) -> bool:
+        """由 JSONL 暫存檔逐筆寫入 output_path，成功後刪除暫存檔。"""
+        self.spool.close()
+        items = iter_json_lines(self.spool.file_path)
+        if self.sort_field:
+            items = external_sort(
+                items,
+                key=itemgetter(self.sort_field),
+                run_size=self.run_size,
+                temp_dir=self.spool.file_path.parent,
+            )
+        try:
+            with JsonArrayWriter(self.output_path, stats=self.write_stats) as writer:
+                for item in items:
+                    writer.append(item)
+        except Exception as e:
+            spider.logger.error(f"❌ 由 {self.spool.file_path} 寫入失敗: {e}")
+            return False
+        self.spool.file_path.unlink()
+        return True
+
 
 class DictJsonFilePipeline:
     """
     字典型 JSON 檔案 Pipeline。
-    
-    負責將爬取的資料儲存為字典格式的 JSON 檔案。
+
+    負責將爬取的資料儲存為字典格式的 JSON 檔案。收集方式同 JsonFilePipeline
+    由 JSON_PIPELINE_MODE 決定；"jsonl" 模式以 [鍵, 值] 逐行暫存。
     """
 
-    def __init__(self, output_path: Path):
+    def __init__(self, output_path: Path, sort_keys: bool = False):
         """
         初始化 Pipeline。
 
         Args:
             output_path: JSON 檔案輸出路徑。
+            sort_keys: 是否依鍵排序。"jsonl" 模式不論是否排序都以外部合併
+                排序去除重複的鍵後逐項寫出。
         """
         self.output_path = output_path
+        self.sort_keys = sort_keys
         self.collected_data = {}
+        self.spool: Optional[JsonLinesWriter] = None
 
     def open_spider(self, spider):
-        """Spider 開啟時執行，建立必要的資料夾。"""
+        """Spider 開啟時執行，建立必要的資料夾與 JSONL 暫存檔。"""
         self.output_path.parent.mkdir(parents=True, exist_ok=True)
         self.collected_data = {}
+        self.spool = _open_spool(spider, self.output_path)
+        self.write_stats = write_stats_for(spider.crawler)
+        self.run_size = spider.settings.getint(
+            "JSON_PIPELINE_SORT_BUFFER", DEFAULT_RUN_SIZE
+        )
+
+    def add(self, key: str, value: Any) -> None:
+        """
+        加入一個鍵值，重複的鍵以最後加入的值為準。
+
+        值需可由 JSON codec 編碼（dict、list、dataclass 紀錄等）。
+        """
+        if self.spool is not None:
+            self.spool.append([key, value])
+        else:
+            self.collected_data[key] = value
 
     def process_item(self, item, spider):
         """
@@ -88,7 +234,7 @@ class DictJsonFilePipeline:
         Returns:
             傳遞 Item 給下一個 Pipeline。
         """
-        # 子類別需要實作此方法來定義如何將 item 加入 collected_data
+        # 子類別需要實作此方法，以 self.add(鍵, 值) 加入資料
         return item
 
     def close_spider(self, spider):
@@ -98,7 +244,74 @@ class DictJsonFilePipeline:
         Args:
             spider: 關閉的爬蟲物件。
         """
-        if save_json(self.collected_data, self.output_path):
+        if self.spool is None:
+            data: Dict[str, Any] = self.collected_data
+            if self.sort_keys:
+                data = dict(sorted(data.items(), key=itemgetter(0)))
+            saved = save_json(data, self.output_path, stats=self.write_stats)
+        else:
+            saved = self._write_spool(spider)
+
+        if saved:
             spider.logger.info(f'✅ 成功儲存資料至 "{self.output_path}"')
         else:
             spider.logger.error(f'❌ 儲存資料失敗 "{self.output_path}"')
+
+    def _write_spool(self, spider) -> bool:
+        """由 JSONL 暫存檔寫入 output_path，成功後刪除暫存檔。"""
+        self.spool.close()
+        entries = iter_json_lines(self.spool.file_path)
+        try:
+            if self.sort_keys:
+                with JsonObjectWriter(
+                    self.output_path, stats=self.write_stats
+                ) as writer:
+                    for key, group in groupby(
+                        external_sort(
+                            entries,
+                            key=itemgetter(0),
+                            run_size=self.run_size,
+                            temp_dir=self.spool.file_path.parent,
+                        ),
+                        key=itemgetter(0),
+                    ):
+                        writer.append(key, deque(group, maxlen=1)[0][1])
+            else:
+                with JsonObjectWriter(
+                    self.output_path, stats=self.write_stats
+                ) as writer:
+                    for key, value in self._last_values_in_order(entries):
+                        writer.append(key, value)
+        except Exception as e:
+            spider.logger.error(f"❌ 由 {self.spool.file_path} 寫入失敗: {e}")
+            return False
+        self.spool.file_path.unlink()
+        return True
+
+    def _last_values_in_order(self, entries: Iterable[list]) -> Iterator[tuple]:
+        """
+        依鍵第一次加入的順序逐項產生 (鍵, 最後加入的值)，結果與 dict(entries) 相同。
+
+        先為每項加上序號並依鍵外部排序（穩定），同一個鍵取第一次出現的序號與
+        最後一個值；再依序號外部排序還原加入順序。記憶體中最多保留
+        run_size 筆。
+        """
+        temp_dir = self.spool.file_path.parent
+        by_key = external_sort(
+            ([key, seq, value] for seq, (key, value) in enumerate(entries)),
+            key=itemgetter(0),
+            run_size=self.run_size,
+            temp_dir=temp_dir,
+        )
+
+        def deduped() -> Iterator[list]:
+            for key, group in groupby(by_key, key=itemgetter(0)):
+                _, seq, value = next(group)
+                for last in deque(group, maxlen=1):
+                    value = last[2]
+                yield [seq, key, value]
+
+        for _, key, value in external_sort(
+            deduped(), key=itemgetter(0), run_size=self.run_size, temp_dir=temp_dir
+        ):
+            yield key, value
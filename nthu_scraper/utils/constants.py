@@ -11,6 +11,7 @@ LANGUAGES = ["zh-tw", "en"]
 LANGUAGE_QUERY_PARAM = "Lang"
 
 # Domain settings
+NTHU_DOMAIN_SUFFIX = "nthu.edu.tw"
 RPAGE_DOMAIN_SUFFIX = "site.nthu.edu.tw"
 
 # File paths
@@ -0,0 +1,236 @@
+"""Columnar multi-semester course archive backed by memory-mapped .npy files."""
+
+import argparse
+import io
+import math
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from nthu_scraper.utils.file_utils import (
+    WriteStats,
+    atomic_write_chunks,
+    load_json,
+    write_json,
+)
+
+MANIFEST_NAME = "manifest.json"
+ARCHIVE_VERSION = 1
+# 以數值欄位另外存一份 float64（無法轉換時為 NaN），方便直接計算
+NUMERIC_FIELDS = ("credit", "size_limit", "student_count", "freshman_reservation")
+# 每個學期一個 segment，由以下檔案組成（<學期>.<名稱>.npy）
+SEGMENT_FILES = ("codes", "numbers", "strings", "offsets")
+
+
+def _to_number(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return math.nan
+
+
+def _npy_bytes(array: Any) -> bytes:
+    import numpy as np
+
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+class SegmentBuilder:
+    """
+    逐筆加入課程，建立單一學期的欄式 segment。
+
+    所有字串欄位共用一個字典：每個欄位只保存字串在字典中的編號，重複的
+    教師、教室、課名等只存一次。segment 包含：
+
+    - codes：(欄位數, 筆數) 的字串編號（字典不超過 65536 個字串時為 uint16，
+      否則為 uint32），每個欄位在檔案中連續存放
+    - numbers：(len(NUMERIC_FIELDS), 筆數) 的 float64
+    - strings / offsets：字典內容（UTF-8 串接）與各字串的起始位置
+    """
+
+    def __init__(self, fields: List[str]):
+        self.fields = fields
+        self.rows = 0
+        self._table: Dict[str, int] = {}
+        self._codes: List[List[int]] = [[] for _ in fields]
+        self._numbers: List[List[float]] = [[] for _ in NUMERIC_FIELDS]
+
+    def add(self, course: Dict[str, str]) -> None:
+        table = self._table
+        for column, name in zip(self._codes, self.fields):
+            value = course[name]
+            code = table.get(value)
+            if code is None:
+                code = table[value] = len(table)
+            column.append(code)
+        for column, name in zip(self._numbers, NUMERIC_FIELDS):
+            column.append(_to_number(course[name]))
+        self.rows += 1
+
+    def arrays(self) -> Dict[str, Any]:
+        """回傳 segment 的各個陣列。"""
+        import numpy as np
+
+        encoded = [value.encode("utf-8") for value in self._table]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        code_type = np.uint16 if len(encoded) <= 1 << 16 else np.uint32
+        return {
+            "codes": np.array(self._codes, dtype=code_type).reshape(
+                len(self.fields), self.rows
+            ),
+            "numbers": np.array(self._numbers, dtype=np.float64).reshape(
+                len(NUMERIC_FIELDS), self.rows
+            ),
+            "strings": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "offsets": offsets,
+        }
+
+
+def write_segment(
+    folder: Path,
+    semester: str,
+    builder: SegmentBuilder,
+    stats: Optional[WriteStats] = None,
+) -> bool:
+    """
+    寫入（或取代）一個學期的 segment 並更新 manifest。
+
+    其他學期的檔案不會被讀取或改寫；內容未變的檔案會略過寫入。寫入結果
+    另外計入 stats（見 file_utils.write_stats_for）。
+
+    Returns:
+        segment 是否有任何檔案實際寫入。
+    """
+    folder.mkdir(parents=True, exist_ok=True)
+    written = False
+    for name, array in builder.arrays().items():
+        result = atomic_write_chunks(
+            [_npy_bytes(array)], folder / f"{semester}.{name}.npy", stats=stats
+        )
+        written |= result.written
+
+    manifest_path = folder / MANIFEST_NAME
+    manifest = load_json(manifest_path) if manifest_path.exists() else None
+    if not manifest or manifest.get("version") != ARCHIVE_VERSION:
+        manifest = {"version": ARCHIVE_VERSION, "segments": {}}
+    manifest["fields"] = builder.fields
+    manifest["numeric_fields"] = list(NUMERIC_FIELDS)
+    manifest["segments"][semester] = {"rows": builder.rows}
+    manifest["segments"] = dict(sorted(manifest["segments"].items()))
+    write_json(manifest, manifest_path, ensure_dir=False, stats=stats)
+    return written
+
+
+class CourseArchive:
+    """
+    以 memory map 開啟課程 archive，供跨學期分析使用。
+
+    開啟時只讀取 manifest，各 segment 的陣列在第一次使用時以
+    np.load(mmap_mode="r") 對應到記憶體，不會讀入整個檔案；數值欄位與
+    字串編號可以直接以 numpy 運算。
+    """
+
+    def __init__(self, folder: Path):
+        import numpy as np
+
+        self._np = np
+        self.folder = folder
+        manifest = load_json(folder / MANIFEST_NAME)
+        if manifest is None:
+            raise FileNotFoundError(f"找不到課程 archive: {folder}")
+        if manifest["version"] != ARCHIVE_VERSION:
+            raise ValueError(f"不支援的 archive 版本: {manifest['version']}")
+        self.fields: List[str] = manifest["fields"]
+        self.numeric_fields: List[str] = manifest["numeric_fields"]
+        self.semesters: List[str] = list(manifest["segments"])
+        self.rows: Dict[str, int] = {
+            semester: segment["rows"]
+            for semester, segment in manifest["segments"].items()
+        }
+        self._segments: Dict[str, Dict[str, Any]] = {}
+
+    def __len__(self) -> int:
+        return sum(self.rows.values())
+
+    def segment(self, semester: str) -> Dict[str, Any]:
+        """取得一個學期的 memory-mapped 陣列。"""
+        segment = self._segments.get(semester)
+        if segment is None:
+            segment = {
+                name: self._np.load(
+                    self.folder / f"{semester}.{name}.npy", mmap_mode="r"
+                )
+                for name in SEGMENT_FILES
+            }
+            self._segments[semester] = segment
+        return segment
+
+    def semester_index(self) -> Any:
+        """每一筆課程所屬學期在 self.semesters 中的位置（可搭配 np.bincount）。"""
+        return self._np.repeat(
+            self._np.arange(len(self.semesters)),
+            [self.rows[semester] for semester in self.semesters],
+        )
+
+    def numbers(self, field: str) -> Any:
+        """所有學期的數值欄位（float64，無法轉換為數字時為 NaN）。"""
+        row = self.numeric_fields.index(field)
+        return self._np.concatenate(
+            [self.segment(semester)["numbers"][row] for semester in self.semesters]
+        )
+
+    def strings(self, field: str, semester: str) -> List[str]:
+        """解碼一個學期的字串欄位。"""
+        segment = self.segment(semester)
+        codes = segment["codes"][self.fields.index(field)]
+        blob = segment["strings"]
+        offsets = segment["offsets"]
+        decoded: Dict[int, str] = {}
+        values = []
+        for code in codes.tolist():
+            value = decoded.get(code)
+            if value is None:
+                value = decoded[code] = bytes(
+                    blob[offsets[code] : offsets[code + 1]]
+                ).decode("utf-8")
+            values.append(value)
+        return values
+
+
+def build_archive(semester_files: Iterable[Path], folder: Path) -> int:
+    """
+    由學期 JSON 檔案建立（或更新）archive。
+
+    Returns:
+        有變動的 segment 數。
+    """
+    changed = 0
+    for path in semester_files:
+        courses = load_json(path)
+        if not courses:
+            continue
+        builder = SegmentBuilder(list(courses[0]))
+        for course in courses:
+            builder.add(course)
+        changed += write_segment(folder, path.stem, builder)
+    return changed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="由學期 JSON 檔案建立課程 archive")
+    parser.add_argument("semesters_folder", type=Path)
+    parser.add_argument("archive_folder", type=Path)
+    args = parser.parse_args(argv)
+
+    changed = build_archive(
+        sorted(args.semesters_folder.glob("*.json")), args.archive_folder
+    )
+    print(f"更新 {changed} 個學期: {args.archive_folder}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+"""Per-semester course change manifest and JSONL delta feed."""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from nthu_scraper.utils.file_utils import (
+    WriteStats,
+    atomic_write_chunks,
+    load_json,
+    write_json,
+)
+from nthu_scraper.utils.json_codec import get_codec
+
+MANIFEST_NAME = "manifest.json"
+# 每個學期保留的 delta 版本數，更舊的版本需重新下載完整的學期檔案
+MAX_DELTA_VERSIONS = 100
+
+
+class SemesterDiff:
+    """
+    以科號為鍵，比較一個學期的新資料與上一次的快照。
+
+    新資料逐筆以 add 加入，不需要整份保留在記憶體中；上一次的快照在
+    finish 前只保留尚未比對到的課程。
+    """
+
+    def __init__(self, previous: Optional[Iterable[Dict[str, Any]]]):
+        """
+        Args:
+            previous: 上一次的學期資料，None 表示沒有快照（第一次建立）。
+        """
+        self.has_snapshot = previous is not None
+        self._previous: Dict[str, Dict[str, Any]] = {
+            course["id"]: course for course in previous or ()
+        }
+        self._order = list(self._previous)
+        self.changes: List[Dict[str, Any]] = []
+
+    def add(self, course: Dict[str, Any]) -> None:
+        """比對一筆新資料。"""
+        old = self._previous.pop(course["id"], None)
+        if old is None:
+            self.changes.append({"op": "add", "id": course["id"], "course": course})
+            return
+        fields = {
+            name: value for name, value in course.items() if old.get(name) != value
+        }
+        removed = [name for name in old if name not in course]
+        if fields or removed:
+            change: Dict[str, Any] = {"op": "change", "id": course["id"]}
+            if fields:
+                change["fields"] = fields
+            if removed:
+                change["removed_fields"] = removed
+            self.changes.append(change)
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """回傳所有變更：新增、修改依新資料順序，刪除依舊資料順序排在最後。"""
+        removed = [
+            {"op": "remove", "id": course_id}
+            for course_id in self._order
+            if course_id in self._previous
+        ]
+        self._previous.clear()
+        return self.changes + removed
+
+
+class DeltaLog:
+    """
+    各學期的 delta 紀錄與變更 manifest。
+
+    目錄結構：
+        <folder>/manifest.json    {學期: {version, base_version, courses, sha256, updated}}
+        <folder>/<學期>.jsonl      每行一筆變更，"v" 為套用後的版本
+
+    同步方式：持有 version k 的用戶端套用 v > k 的所有行即可更新到最新版本；
+    k < base_version 時（例如第一次同步，或 delta 已被裁掉）需重新下載完整的
+    學期檔案。學期第一次建立時版本為 1，不寫入任何 delta。
+
+    寫入結果另外計入 stats（見 file_utils.write_stats_for）。
+    """
+
+    def __init__(
+        self,
+        folder: Path,
+        max_versions: int = MAX_DELTA_VERSIONS,
+        stats: Optional[WriteStats] = None,
+    ):
+        self.folder = folder
+        self.max_versions = max_versions
+        self.stats = stats
+        self.manifest_path = folder / MANIFEST_NAME
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not self.manifest_path.exists():
+            return {}
+        return load_json(self.manifest_path) or {}
+
+    def record(
+        self,
+        semester: str,
+        changes: List[Dict[str, Any]],
+        courses: int,
+        digest: str,
+        has_snapshot: bool = True,
+    ) -> Optional[int]:
+        """
+        記錄一個學期本次的變更。
+
+        Args:
+            semester: 學期。
+            changes: SemesterDiff.finish() 的結果。
+            courses: 目前的課程數。
+            digest: 目前學期檔案的 SHA-256。
+            has_snapshot: 是否有上一次的快照可比較。
+
+        Returns:
+            新的版本，沒有變更時返回 None。
+        """
+        manifest = self._load_manifest()
+        entry = manifest.get(semester)
+        if entry is not None and not changes and entry["sha256"] == digest:
+            return None
+
+        updated = datetime.now().isoformat(timespec="seconds")
+        self.folder.mkdir(parents=True, exist_ok=True)
+        if entry is None or not has_snapshot:
+            version = (entry["version"] + 1) if entry else 1
+            base_version = version
+            lines: List[bytes] = []
+        else:
+            version = entry["version"] + 1
+            base_version = max(entry["base_version"], version - self.max_versions)
+            lines = self._read_lines(semester, base_version, entry["version"])
+            codec = get_codec()
+            lines.extend(
+                codec.dumps({"v": version, **change}, indent=None) + b"\n"
+                for change in changes
+            )
+        atomic_write_chunks(lines, self.folder / f"{semester}.jsonl", stats=self.stats)
+
+        manifest[semester] = {
+            "version": version,
+            "base_version": base_version,
+            "courses": courses,
+            "sha256": digest,
+            "updated": updated,
+        }
+        write_json(
+            dict(sorted(manifest.items())),
+            self.manifest_path,
+            indent=2,
+            stats=self.stats,
+        )
+        return version
+
+    def _read_lines(self, semester: str, after: int, upto: int) -> List[bytes]:
+        """讀取 after < v <= upto 的既有 delta 行。"""
+        path = self.folder / f"{semester}.jsonl"
+        if not path.exists():
+            return []
+        codec = get_codec()
+        lines = []
+        with open(path, "rb") as f:
+            for line in f:
+                if after < codec.loads(line)["v"] <= upto:
+                    lines.append(line)
+        return lines
+
+
+def apply_delta(
+    courses: List[Dict[str, Any]], changes: Iterable[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    將 delta 套用到學期資料（供用戶端同步或驗證使用）。
+
+    新增的課程排在最後；課程順序不屬於 delta 的一部分。
+    """
+    by_id = {course["id"]: dict(course) for course in courses}
+    for change in changes:
+        op = change["op"]
+        if op == "add":
+            by_id[change["id"]] = dict(change["course"])
+        elif op == "remove":
+            by_id.pop(change["id"], None)
+        elif op == "change":
+            course = by_id[change["id"]]
+            course.update(change.get("fields", {}))
+            for name in change.get("removed_fields", ()):
+                course.pop(name, None)
+    return list(by_id.values())
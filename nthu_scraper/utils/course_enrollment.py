@@ -0,0 +1,375 @@
+"""Append-only course enrollment time series stored as fixed-width binary records."""
+
+import argparse
+import io
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from nthu_scraper.utils.file_utils import (
+    WriteStats,
+    atomic_write_chunks,
+    load_json,
+    write_json,
+)
+
+MANIFEST_NAME = "manifest.json"
+STORE_VERSION = 1
+# 每筆紀錄 18 bytes（little-endian，無對齊）：
+#   time      uint32  爬取時間（Unix 秒）
+#   prev      int32   同一門課上一筆紀錄的位置，-1 表示沒有
+#   course    uint16  課程在 <學期>.ids.json 中的位置
+#   students  int32   修課人數，無法轉換為整數時為 -1
+#   limit     int32   人限，無法轉換為整數時為 -1
+RECORD_FIELDS = (
+    ("time", "<u4"),
+    ("prev", "<i4"),
+    ("course", "<u2"),
+    ("students", "<i4"),
+    ("limit", "<i4"),
+)
+MAX_COURSES = 1 << 16
+
+
+def _record_dtype() -> Any:
+    import numpy as np
+
+    return np.dtype(list(RECORD_FIELDS))
+
+
+def _to_count(value: str) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        return -1
+
+
+def _npy_bytes(array: Any) -> bytes:
+    import numpy as np
+
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+class EnrollmentBatch:
+    """
+    一次爬取中單一學期的修課人數，交給 EnrollmentStore.append 寫入。
+
+    目前的開課資料（open_course_data.json）沒有「總人數」欄位，
+    student_count 皆為空字串；此時 has_counts 為 False，append 不會寫入。
+    """
+
+    def __init__(self, semester: str, timestamp: int):
+        self.semester = semester
+        self.timestamp = timestamp
+        self.rows: List[Tuple[str, int, int]] = []
+        self.counted = 0  # 修課人數可轉換為整數的課程數
+
+    @property
+    def has_counts(self) -> bool:
+        return self.counted > 0
+
+    def add(self, course: Dict[str, str]) -> None:
+        students = _to_count(course["student_count"])
+        if students >= 0:
+            self.counted += 1
+        self.rows.append((course["id"], students, _to_count(course["size_limit"])))
+
+
+class EnrollmentStore:
+    """
+    各學期修課人數的 append-only 時間序列。
+
+    目錄結構：
+        <folder>/manifest.json     {學期: {records, courses, first_time, last_time}}
+        <folder>/<學期>.ids.json    科號列表（只會在尾端新增）
+        <folder>/<學期>.heads.npy   每門課最新一筆紀錄的位置（int32）
+        <folder>/<學期>.log         RECORD_FIELDS 定義的固定長度紀錄
+
+    每次爬取只為修課人數或人限與上一筆不同（或第一次出現）的課程附加一筆
+    紀錄，同一門課的紀錄以 prev 串成鏈結，因此查詢單一課程的曲線只需讀取
+    該課程的紀錄；紀錄依時間排序，查詢一段時間內的變化只需讀取該時段的
+    紀錄。manifest 是唯一的確認點：其中的 records / courses 為已確認的紀錄數
+    與課程數。寫入依 log、ids、heads、manifest 的順序進行，中斷時 log 尾端
+    多出的紀錄會在下次附加前截掉，ids 多出的科號會被忽略，heads 與已確認
+    的紀錄不一致時由 log 重建。
+
+    ids、heads 與 manifest 的寫入結果另外計入 stats（見
+    file_utils.write_stats_for）；log 直接附加，不經過 file_utils。
+    """
+
+    def __init__(self, folder: Path, stats: Optional[WriteStats] = None):
+        import numpy as np
+
+        self._np = np
+        self.folder = folder
+        self.stats = stats
+        self.dtype = _record_dtype()
+        self.manifest_path = folder / MANIFEST_NAME
+        manifest = (
+            load_json(self.manifest_path) if self.manifest_path.exists() else None
+        )
+        if manifest and manifest.get("version") != STORE_VERSION:
+            raise ValueError(f"不支援的修課人數紀錄版本: {manifest['version']}")
+        self.manifest: Dict[str, Any] = manifest or {
+            "version": STORE_VERSION,
+            "semesters": {},
+        }
+        self._cache: Dict[str, Tuple[Dict[str, int], Any, Any]] = {}
+
+    @property
+    def semesters(self) -> List[str]:
+        return list(self.manifest["semesters"])
+
+    def _path(self, semester: str, suffix: str) -> Path:
+        return self.folder / f"{semester}.{suffix}"
+
+    def _load(self, semester: str) -> Tuple[List[str], Any, Any]:
+        """
+        讀取學期的科號、最新紀錄位置與 memory-mapped 紀錄。
+
+        只讀取 manifest 已確認的部分：ids 截到已確認的課程數；heads 長度不符
+        或指向未確認的紀錄（寫入 heads 後、寫入 manifest 前中斷）時由 log 重建。
+
+        Raises:
+            ValueError: 檔案比 manifest 記錄的還短。
+        """
+        np = self._np
+        info = self.manifest["semesters"].get(semester)
+        if info is None:
+            return [], np.zeros(0, dtype=np.int32), np.zeros(0, dtype=self.dtype)
+        records, courses = info["records"], info["courses"]
+        ids = load_json(self._path(semester, "ids.json")) or []
+        if len(ids) < courses:
+            raise ValueError(
+                f"學期 {semester} 的科號數 {len(ids)} 少於紀錄的 {courses}"
+            )
+        ids = ids[:courses]
+        log_path = self._path(semester, "log")
+        if records and log_path.stat().st_size < records * self.dtype.itemsize:
+            raise ValueError(f"學期 {semester} 的修課人數紀錄比 manifest 記錄的短")
+        log = (
+            np.memmap(log_path, dtype=self.dtype, mode="r", shape=(records,))
+            if records
+            else np.zeros(0, dtype=self.dtype)
+        )
+        heads_path = self._path(semester, "heads.npy")
+        heads = np.load(heads_path) if heads_path.exists() else None
+        if heads is None or len(heads) != courses or (heads >= records).any():
+            heads = self._rebuild_heads(log, courses)
+        return ids, heads, log
+
+    def _rebuild_heads(self, log: Any, courses: int) -> Any:
+        """由已確認的紀錄找出每門課最新一筆紀錄的位置。"""
+        np = self._np
+        heads = np.full(courses, -1, dtype=np.int32)
+        if len(log):
+            reversed_courses = np.asarray(log["course"])[::-1]
+            course_ids, last = np.unique(reversed_courses, return_index=True)
+            heads[course_ids] = len(log) - 1 - last
+        return heads
+
+    def append(self, batch: EnrollmentBatch) -> int:
+        """
+        附加一次爬取的修課人數。
+
+        batch 中沒有任何課程有修課人數時（資料來源沒有總人數欄位）不寫入，
+        避免紀錄中只有 -1 的人數。
+
+        Raises:
+            ValueError: 時間早於該學期最後一筆紀錄，或課程數超過上限。
+
+        Returns:
+            附加的紀錄數。
+        """
+        if not batch.has_counts:
+            return 0
+        np = self._np
+        semester = batch.semester
+        info = self.manifest["semesters"].get(semester)
+        if info and batch.timestamp < info["last_time"]:
+            raise ValueError(
+                f"修課人數紀錄時間倒退 ({semester}): "
+                f"{batch.timestamp} < {info['last_time']}"
+            )
+        ids, heads, log = self._load(semester)
+        positions = {course_id: i for i, course_id in enumerate(ids)}
+        records = len(log)
+        heads = heads.astype(np.int32, copy=True)
+        new_ids: List[str] = []
+
+        appended = []
+        for course_id, students, limit in batch.rows:
+            course = positions.get(course_id)
+            if course is None:
+                course = positions[course_id] = len(ids) + len(new_ids)
+                new_ids.append(course_id)
+                prev = -1
+            else:
+                prev = int(heads[course])
+                if prev >= 0:
+                    last = log[prev]
+                    if last["students"] == students and last["limit"] == limit:
+                        continue
+            appended.append((batch.timestamp, prev, course, students, limit))
+        if len(ids) + len(new_ids) > MAX_COURSES:
+            raise ValueError(f"學期 {semester} 的課程數超過 {MAX_COURSES}")
+
+        if new_ids:
+            heads = np.concatenate([heads, np.full(len(new_ids), -1, dtype=np.int32)])
+        new_records = np.array(appended, dtype=self.dtype)
+        for offset, course in enumerate(new_records["course"].tolist()):
+            heads[course] = records + offset
+        self._cache.pop(semester, None)
+
+        self.folder.mkdir(parents=True, exist_ok=True)
+        log_path = self._path(semester, "log")
+        with open(log_path, "r+b" if log_path.exists() else "wb") as f:
+            f.seek(records * self.dtype.itemsize)
+            f.truncate()
+            f.write(new_records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        if new_ids:
+            write_json(
+                ids + new_ids,
+                self._path(semester, "ids.json"),
+                indent=None,
+                stats=self.stats,
+            )
+        atomic_write_chunks(
+            [_npy_bytes(heads)], self._path(semester, "heads.npy"), stats=self.stats
+        )
+
+        self.manifest["semesters"][semester] = {
+            "records": records + len(new_records),
+            "courses": len(ids) + len(new_ids),
+            "first_time": info["first_time"] if info else batch.timestamp,
+            "last_time": batch.timestamp,
+        }
+        self.manifest["semesters"] = dict(sorted(self.manifest["semesters"].items()))
+        write_json(self.manifest, self.manifest_path, indent=2, stats=self.stats)
+        return len(new_records)
+
+    def _semester(self, semester: str) -> Tuple[Dict[str, int], Any, Any]:
+        cached = self._cache.get(semester)
+        if cached is None:
+            ids, heads, log = self._load(semester)
+            cached = ({course_id: i for i, course_id in enumerate(ids)}, heads, log)
+            self._cache[semester] = cached
+        return cached
+
+    def curve(self, course_id: str) -> List[Dict[str, int]]:
+        """
+        一門課的修課人數變化，只讀取該課程的紀錄。
+
+        Returns:
+            依時間排列的 {"time", "student_count", "size_limit"}，每筆為
+            人數變動（或第一次出現）的時間點；找不到課程時為空列表。
+        """
+        positions, heads, log = self._semester(course_id[:5])
+        course = positions.get(course_id)
+        if course is None:
+            return []
+        curve = []
+        position = int(heads[course])
+        while position >= 0:
+            record = log[position]
+            curve.append(
+                {
+                    "time": int(record["time"]),
+                    "student_count": int(record["students"]),
+                    "size_limit": int(record["limit"]),
+                }
+            )
+            position = int(record["prev"])
+        curve.reverse()
+        return curve
+
+    def fastest_filling(
+        self, semester: str, since: int, top: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        since 之後修課人數增加最多的課程，只讀取該時段的紀錄。
+
+        增加人數為目前人數減去 since 當時的人數（since 之後才出現的課程以
+        第一筆紀錄為準）；相同時依目前的額滿比例排序。人數無法轉換為整數的
+        課程不列入。
+
+        Returns:
+            {"id", "gain", "student_count", "size_limit"} 的列表。
+        """
+        np = self._np
+        positions, heads, log = self._semester(semester)
+        if not len(log):
+            return []
+        start = int(np.searchsorted(log["time"], since, side="left"))
+        window = log[start:]
+        if not len(window):
+            return []
+
+        courses, first = np.unique(window["course"], return_index=True)
+        first_records = window[first]
+        prev = first_records["prev"]
+        baseline = np.where(
+            prev >= 0, log["students"][np.maximum(prev, 0)], first_records["students"]
+        )
+        current = log[heads[courses]]
+        gain = current["students"].astype(np.int64) - baseline
+        valid = (current["students"] >= 0) & (baseline >= 0)
+        limit = current["limit"].astype(np.float64)
+        ratio = np.where(limit > 0, current["students"] / np.maximum(limit, 1), 0)
+
+        order = np.lexsort((-ratio, -gain))
+        order = order[valid[order]][:top]
+        ids = {i: course_id for course_id, i in positions.items()}
+        return [
+            {
+                "id": ids[int(courses[i])],
+                "gain": int(gain[i]),
+                "student_count": int(current["students"][i]),
+                "size_limit": int(current["limit"][i]),
+            }
+            for i in order
+        ]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="查詢課程修課人數紀錄")
+    parser.add_argument("folder", type=Path)
+    commands = parser.add_subparsers(dest="command", required=True)
+    curve = commands.add_parser("curve", help="單一課程的修課人數變化")
+    curve.add_argument("course_id")
+    top = commands.add_parser("top", help="一段時間內修課人數增加最多的課程")
+    top.add_argument("semester")
+    top.add_argument("--hours", type=float, default=24)
+    top.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    store = EnrollmentStore(args.folder)
+    if args.command == "curve":
+        for point in store.curve(args.course_id):
+            time_str = datetime.fromtimestamp(point["time"]).isoformat(
+                sep=" ", timespec="minutes"
+            )
+            print(f"{time_str}  {point['student_count']:>5} / {point['size_limit']}")
+        return 0
+
+    info = store.manifest["semesters"].get(args.semester)
+    if info is None:
+        print(f"沒有學期 {args.semester} 的紀錄")
+        return 1
+    since = info["last_time"] - int(args.hours * 3600)
+    for row in store.fastest_filling(args.semester, since, args.top):
+        print(
+            f"{row['id']:<18}{row['gain']:>+6}"
+            f"  {row['student_count']:>5} / {row['size_limit']}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
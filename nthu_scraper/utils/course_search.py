@@ -0,0 +1,223 @@
+"""Sharded static full-text search index for course titles and lecturers."""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from nthu_scraper.utils.file_utils import WriteStats, load_json, write_json
+
+# 建立索引的課程欄位
+SEARCH_FIELDS = ("chinese_title", "english_title", "lecturer")
+# 非 ASCII 詞彙依第一個字元的 code point 右移此位數分片（每片 256 個字元）
+SHARD_BITS = 8
+MANIFEST_NAME = "manifest.json"
+# 2：另外索引中文單字，單字查詢可找到只出現在 bigram 第二個字的課程
+INDEX_VERSION = 2
+
+# CJK 字元（含擴充 A 與相容字）連續成段；英數字以單字為單位
+_CJK = "㐀-䶿一-鿿豈-﫿"
+_TOKEN = re.compile(f"([{_CJK}]+)|([0-9a-z]+)")
+
+
+def tokenize(text: str, unigrams: bool = False) -> List[str]:
+    """
+    將文字切成索引詞彙。
+
+    - 中文：連續的 CJK 字元切成字元 bigram，只有一個字時保留單字；
+      unigrams 為 True 時另外加入每個單字（建立索引時使用）
+    - 英文與數字：轉小寫後以單字為單位
+
+    Args:
+        text: 要切分的文字。
+        unigrams: 是否另外加入中文單字。
+
+    Returns:
+        依出現順序排列的詞彙（可能重複）。
+    """
+    tokens = []
+    for cjk, word in _TOKEN.findall(text.lower()):
+        if word:
+            tokens.append(word)
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i : i + 2] for i in range(len(cjk) - 1))
+            if unigrams:
+                tokens.extend(cjk)
+    return tokens
+
+
+def shard_key(token: str) -> str:
+    """
+    詞彙所屬的分片名稱。
+
+    英數字詞彙以第一個字元為分片（a–z、0–9）；其他詞彙以第一個字元的
+    code point 前綴分片，例如「微」(U+5FAE) 屬於 u5f。同一個字元開頭的詞彙
+    一定在同一個分片，因此可以在單一分片內做前綴比對。
+    """
+    first = token[0]
+    if first.isascii():
+        return first
+    return f"u{ord(first) >> SHARD_BITS:x}"
+
+
+class SearchIndexBuilder:
+    """
+    逐筆加入課程，建立單一學期的倒排索引並寫成分片檔案。
+
+    輸出目錄結構：
+        <folder>/manifest.json  版本、欄位、科號列表與各分片的詞彙數
+        <folder>/<分片>.json     {詞彙: [課程在 ids 中的位置, ...]}
+
+    課程資料未變時寫出的檔案內容相同，write_json 會略過寫入；不再使用的
+    舊分片會被刪除。
+    """
+
+    def __init__(self):
+        self.ids: List[str] = []
+        self.postings: Dict[str, List[int]] = {}
+
+    def add(self, course: Dict[str, str]) -> None:
+        """加入一筆課程（需含 id 與 SEARCH_FIELDS 欄位）。"""
+        position = len(self.ids)
+        self.ids.append(course["id"])
+        for token in set(
+            token
+            for name in SEARCH_FIELDS
+            for token in tokenize(course[name], unigrams=True)
+        ):
+            self.postings.setdefault(token, []).append(position)
+
+    def build(self) -> Dict[str, Dict[str, List[int]]]:
+        """依分片整理詞彙，回傳 {分片: {詞彙: [位置]}}，詞彙已排序。"""
+        shards: Dict[str, Dict[str, List[int]]] = {}
+        for token in sorted(self.postings):
+            shards.setdefault(shard_key(token), {})[token] = self.postings[token]
+        return shards
+
+    def write(self, folder: Path, stats: Optional[WriteStats] = None) -> int:
+        """
+        將索引寫入 folder，寫入結果另外計入 stats（見 file_utils.write_stats_for）。
+
+        Raises:
+            OSError: 寫入失敗。
+
+        Returns:
+            實際寫入（內容有變動）或刪除的分片數。
+        """
+        folder.mkdir(parents=True, exist_ok=True)
+        shards = self.build()
+        changed = 0
+        for key, shard in shards.items():
+            result = write_json(
+                shard,
+                folder / f"{key}.json",
+                ensure_dir=False,
+                indent=None,
+                stats=stats,
+            )
+            changed += result.written
+        for path in folder.glob("*.json"):
+            if path.name != MANIFEST_NAME and path.stem not in shards:
+                path.unlink()
+                changed += 1
+
+        manifest = {
+            "version": INDEX_VERSION,
+            "fields": list(SEARCH_FIELDS),
+            "shard_bits": SHARD_BITS,
+            "shards": {key: len(shard) for key, shard in shards.items()},
+            "ids": self.ids,
+        }
+        write_json(
+            manifest,
+            folder / MANIFEST_NAME,
+            ensure_dir=False,
+            indent=None,
+            stats=stats,
+        )
+        return changed
+
+
+class CourseSearchIndex:
+    """
+    查詢 SearchIndexBuilder 寫出的索引，只讀取查詢需要的分片。
+
+    查詢字串切成詞彙後取交集：中文 bigram 與單字需完全相同（單字另外索引，
+    「學」可找到「數學」）；英數字詞彙以前綴比對（例如 "intro" 可找到
+    introduction）。bigram 交集可能包含
+    字元不相鄰的課程，結果為候選清單，需要精確比對時由呼叫端再檢查原文。
+    """
+
+    def __init__(self, folder: Path):
+        self.folder = folder
+        self.manifest: Optional[Dict[str, Any]] = load_json(folder / MANIFEST_NAME)
+        if self.manifest is not None and self.manifest["version"] != INDEX_VERSION:
+            raise ValueError(f"不支援的搜尋索引版本: {self.manifest['version']}")
+        self._shards: Dict[str, Dict[str, List[int]]] = {}
+        self.shards_loaded = 0
+
+    def _shard(self, key: str) -> Dict[str, List[int]]:
+        shard = self._shards.get(key)
+        if shard is None:
+            shard = {}
+            if key in self.manifest["shards"]:
+                shard = load_json(self.folder / f"{key}.json") or {}
+                self.shards_loaded += 1
+            self._shards[key] = shard
+        return shard
+
+    def _lookup(self, token: str) -> Set[int]:
+        shard = self._shard(shard_key(token))
+        if not token.isascii():
+            return set(shard.get(token, ()))
+        matched: Set[int] = set()
+        for candidate, positions in shard.items():
+            if candidate.startswith(token):
+                matched.update(positions)
+        return matched
+
+    def search(self, query: str) -> List[str]:
+        """
+        搜尋中英文課名或授課教師包含查詢字串的課程。
+
+        Args:
+            query: 查詢字串，多個詞以空白分隔時須全部符合。
+
+        Returns:
+            依學期資料原順序排列的科號。
+        """
+        if self.manifest is None:
+            return []
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        positions: Optional[Set[int]] = None
+        for token in sorted(set(tokens), key=len, reverse=True):
+            matched = self._lookup(token)
+            positions = matched if positions is None else positions & matched
+            if not positions:
+                return []
+        ids = self.manifest["ids"]
+        return [ids[position] for position in sorted(positions)]
+
+
+def index_is_current(folder: Path) -> bool:
+    """folder 中是否有目前版本的索引。"""
+    manifest_path = folder / MANIFEST_NAME
+    if not manifest_path.exists():
+        return False
+    manifest = load_json(manifest_path)
+    return manifest is not None and manifest.get("version") == INDEX_VERSION
+
+
+def build_search_index(
+    courses: Iterable[Dict[str, str]],
+    folder: Path,
+    stats: Optional[WriteStats] = None,
+) -> int:
+    """由課程資料建立索引並寫入 folder，回傳變動的分片數。"""
+    builder = SearchIndexBuilder()
+    for course in courses:
+        builder.add(course)
+    return builder.write(folder, stats)
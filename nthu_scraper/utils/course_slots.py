@@ -0,0 +1,171 @@
+"""Course time-slot bitmasks and vectorized schedule queries."""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from nthu_scraper.utils.file_utils import load_json
+
+# 星期與節次代碼（例如 "M1M2R3" 為星期一第 1、2 節與星期四第 3 節）
+DAYS = "MTWRFSU"
+PERIODS = "1234n56789abc"
+# 每天佔用的位元數（保留空位方便對齊），遮罩總寬度為 7 × 16 = 112 位元
+BITS_PER_DAY = 16
+MASK_BITS = len(DAYS) * BITS_PER_DAY
+# 遮罩以固定寬度的十六進位字串輸出，JavaScript 等用戶端也能無損讀取
+MASK_HEX_WIDTH = MASK_BITS // 4
+# 查詢時將遮罩切成兩個 uint64：高位 48 位元、低位 64 位元
+_LOW_BITS = 64
+_LOW_MASK = (1 << _LOW_BITS) - 1
+
+_SLOT = re.compile(f"([{DAYS}])([{PERIODS}])")
+_SLOT_BITS = {
+    day + period: 1 << (day_index * BITS_PER_DAY + period_index)
+    for day_index, day in enumerate(DAYS)
+    for period_index, period in enumerate(PERIODS)
+}
+
+
+def encode_slots(time: str) -> int:
+    """
+    將上課時間字串轉為位元遮罩。
+
+    無法辨識的內容（例如 "," 分隔符號或附註文字）會被忽略。
+
+    Args:
+        time: 上課時間，例如 "M1M2R3"。
+
+    Returns:
+        每個上課節次對應一個位元的整數，沒有上課時間時為 0。
+    """
+    mask = 0
+    for day, period in _SLOT.findall(time):
+        mask |= _SLOT_BITS[day + period]
+    return mask
+
+
+def decode_slots(mask: int) -> str:
+    """將位元遮罩轉回上課時間字串（依星期、節次排序）。"""
+    return "".join(slot for slot, bit in _SLOT_BITS.items() if mask & bit)
+
+
+def build_slot_index(entries: Iterable[Tuple[str, int]]) -> Dict[str, Any]:
+    """
+    建立可寫入 JSON 的時段索引。
+
+    Args:
+        entries: (科號, 位元遮罩)。
+
+    Returns:
+        {"layout": 遮罩配置, "ids": [科號], "masks": [十六進位遮罩]}，
+        ids 與 masks 依相同順序對應。
+    """
+    ids: List[str] = []
+    masks: List[str] = []
+    for course_id, mask in entries:
+        ids.append(course_id)
+        masks.append(f"{mask:0{MASK_HEX_WIDTH}x}")
+    return {
+        "layout": {"days": DAYS, "periods": PERIODS, "bits_per_day": BITS_PER_DAY},
+        "ids": ids,
+        "masks": masks,
+    }
+
+
+class CourseSlotIndex:
+    """
+    以 numpy 向量化位元運算查詢課程時段。
+
+    遮罩存成 (N, 2) 的 uint64 陣列，一次查詢只需對整個學期的課程做幾次
+    位元運算。numpy 只在建立索引時才匯入，爬蟲本身不需要 numpy。
+    """
+
+    def __init__(self, ids: List[str], masks: Iterable[int]):
+        import numpy as np
+
+        self._np = np
+        self.ids = list(ids)
+        self.masks = np.array(
+            [(mask >> _LOW_BITS, mask & _LOW_MASK) for mask in masks],
+            dtype=np.uint64,
+        ).reshape(-1, 2)
+        self._scheduled = self.masks.any(axis=1)
+        self._positions = {course_id: i for i, course_id in enumerate(self.ids)}
+
+    @classmethod
+    def from_courses(cls, courses: Iterable[Dict[str, Any]]) -> "CourseSlotIndex":
+        """由課程資料（含 id 與 time 欄位）建立索引。"""
+        ids, masks = [], []
+        for course in courses:
+            ids.append(course["id"])
+            masks.append(encode_slots(course["time"]))
+        return cls(ids, masks)
+
+    @classmethod
+    def from_index(cls, index: Dict[str, Any]) -> "CourseSlotIndex":
+        """由 build_slot_index 的結果建立索引。"""
+        layout = index["layout"]
+        if (layout["days"], layout["periods"], layout["bits_per_day"]) != (
+            DAYS,
+            PERIODS,
+            BITS_PER_DAY,
+        ):
+            raise ValueError(f"不支援的時段索引配置: {layout}")
+        return cls(index["ids"], (int(mask, 16) for mask in index["masks"]))
+
+    @classmethod
+    def load(cls, file_path: Path) -> Optional["CourseSlotIndex"]:
+        """載入時段索引檔案，檔案不存在或解析失敗時返回 None。"""
+        index = load_json(file_path)
+        if index is None:
+            return None
+        return cls.from_index(index)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _query_mask(self, slots: Any) -> Any:
+        """將時段字串、位元遮罩或科號列表轉為 (2,) 的 uint64 遮罩。"""
+        if isinstance(slots, str):
+            mask = encode_slots(slots)
+        elif isinstance(slots, int):
+            mask = slots
+        else:
+            positions = [self._positions[course_id] for course_id in slots]
+            return self._np.bitwise_or.reduce(
+                self.masks[positions], axis=0, initial=self._np.uint64(0)
+            )
+        return self._np.array([mask >> _LOW_BITS, mask & _LOW_MASK], self._np.uint64)
+
+    def _select(self, selected: Any) -> List[str]:
+        return [self.ids[i] for i in self._np.flatnonzero(selected)]
+
+    def fits(self, free_slots: Any, include_unscheduled: bool = False) -> List[str]:
+        """
+        找出上課時間完全落在空堂內的課程。
+
+        Args:
+            free_slots: 空堂，可為時段字串（"M1M2R3"）或位元遮罩。
+            include_unscheduled: 是否包含沒有上課時間的課程。
+
+        Returns:
+            符合的科號。
+        """
+        outside = ~self._query_mask(free_slots)
+        selected = ~(self.masks & outside).any(axis=1)
+        if not include_unscheduled:
+            selected &= self._scheduled
+        return self._select(selected)
+
+    def conflicts(self, taken: Any) -> List[str]:
+        """
+        找出與指定時段衝堂的課程。
+
+        Args:
+            taken: 已佔用的時段，可為時段字串、位元遮罩或科號列表
+                （以這些課程的上課時間聯集為準，課程本身也會列在結果中）。
+
+        Returns:
+            衝堂的科號。
+        """
+        return self._select((self.masks & self._query_mask(taken)).any(axis=1))
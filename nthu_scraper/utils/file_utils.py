@@ -1,8 +1,34 @@
 """File and JSON utility functions."""
 
+import hashlib
 import json
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from types import MappingProxyType
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from nthu_scraper.utils.json_codec import (
+    WRITE_CHUNK_SIZE,
+    get_codec,
+    is_record,
+    record_to_dict,
+)
 
 
 def load_json(file_path: Path) -> Optional[Any]:
@@ -19,30 +45,585 @@ def load_json(file_path: Path) -> Optional[Any]:
         print(f"警告：JSON 檔案 '{file_path}' 不存在。")
         return None
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return get_codec().loads(file_path.read_bytes())
     except json.JSONDecodeError as e:
         print(f"錯誤：JSON 檔案解析失敗 '{file_path}': {e}")
         return None
 
 
-def save_json(data: Any, file_path: Path, ensure_dir: bool = True) -> bool:
+def _freeze(data: Any) -> Any:
+    """
+    將 JSON 資料遞迴轉為唯讀結構：dict 與紀錄 -> MappingProxyType、list -> tuple。
+
+    紀錄轉為與讀取 JSON 檔案相同的形式，讓快取的結果不受寫入方式影響。
+    """
+    if isinstance(data, dict):
+        return MappingProxyType({key: _freeze(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return tuple(_freeze(value) for value in data)
+    if is_record(data):
+        return _freeze(record_to_dict(data))
+    return data
+
+
+@dataclass
+class _CacheEntry:
+    validator: Tuple[int, int]  # (mtime_ns, size)
+    data: Any
+
+
+class DatasetCache:
+    """
+    行程內共用的 JSON 資料集讀取快取。
+
+    以檔案路徑為鍵，並以 (mtime, size) 驗證檔案是否被更新；超過筆數或容量
+    上限時依 LRU 淘汰。回傳的資料為唯讀結構（dict 為 MappingProxyType、
+    list 為 tuple），讓同一行程內的多個 spider / pipeline 共用同一份解析結果。
+    """
+
+    def __init__(self, max_entries: int = 16, max_bytes: int = 64 * 1024 * 1024):
+        """
+        初始化快取。
+
+        Args:
+            max_entries: 最多快取的檔案數。
+            max_bytes: 快取檔案大小總和上限（以檔案大小估算）。
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Path, _CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._retained: Set[Path] = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, file_path: Path) -> Optional[Any]:
+        """
+        取得檔案的唯讀解析結果，檔案不存在或解析失敗時返回 None。
+        """
+        key = file_path.resolve()
+        try:
+            stat = key.stat()
+        except FileNotFoundError:
+            print(f"警告：JSON 檔案 '{file_path}' 不存在。")
+            return None
+        validator = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.validator == validator:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.data
+            self.misses += 1
+
+        data = load_json(file_path)
+        if data is None:
+            return None
+        return self.put(file_path, data, validator)
+
+    def put(
+        self,
+        file_path: Path,
+        data: Any,
+        validator: Optional[Tuple[int, int]] = None,
+    ) -> Any:
+        """
+        將已解析的資料放入快取，並回傳唯讀版本。
+
+        Args:
+            file_path: 資料對應的檔案路徑。
+            data: 與檔案內容相同的資料。
+            validator: (mtime_ns, size)，None 表示讀取目前檔案狀態。
+        """
+        key = file_path.resolve()
+        if validator is None:
+            stat = key.stat()
+            validator = (stat.st_mtime_ns, stat.st_size)
+        frozen = _freeze(data)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old.validator[1]
+            self._entries[key] = _CacheEntry(validator, frozen)
+            self._bytes += validator[1]
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.validator[1]
+                self.evictions += 1
+        return frozen
+
+    def retain_writes(self, file_paths: Iterable[Path]) -> None:
+        """
+        指定寫入後直接放入快取的檔案。
+
+        同一行程內先寫後讀的檔案（例如 runner 中上游 spider 的輸出）在寫入時
+        即放入快取，下游讀取時不必重新讀檔解析。
+        """
+        self._retained.update(path.resolve() for path in file_paths)
+
+    def publish(self, file_path: Path, data: Any) -> None:
+        """檔案寫入後呼叫；若為 retain_writes 指定的檔案則放入快取。"""
+        if self._retained and file_path.resolve() in self._retained:
+            self.put(file_path, data)
+
+    def invalidate(self, file_path: Path) -> None:
+        """移除單一檔案的快取（例如檔案剛被改寫時）。"""
+        key = file_path.resolve()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry.validator[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+dataset_cache = DatasetCache()
+
+
+def load_json_cached(file_path: Path) -> Optional[Any]:
+    """
+    透過行程內共用快取載入 JSON 檔案。
+
+    Args:
+        file_path: JSON 檔案路徑。
+
+    Returns:
+        唯讀的 JSON 資料（dict 為 MappingProxyType、list 為 tuple），
+        若檔案不存在或解析失敗則返回 None。需要修改時請自行複製。
+    """
+    return dataset_cache.get(file_path)
+
+
+def iter_json_chunks(data: Any, indent: Optional[int] = 4) -> Iterator[bytes]:
+    """
+    將資料逐段編碼為 UTF-8 JSON 位元組。
+
+    使用目前的預設 JSON codec 逐層編碼 list / dict，並將細碎片段合併成
+    約 WRITE_CHUNK_SIZE 大小的區塊，不需一次產生完整的 JSON 字串。
+
+    Args:
+        data: 要編碼的資料。
+        indent: 縮排空白數，None 表示輸出最小化 JSON。
+
+    Yields:
+        UTF-8 編碼的 JSON 區塊。
+    """
+    return get_codec().iterencode(data, indent)
+
+
+@dataclass
+class WriteResult:
+    """單次寫入的結果。"""
+
+    written: bool  # 是否實際寫入（內容未變時為 False）
+    size: int  # 序列化後的位元組數
+    digest: str  # 序列化內容的 SHA-256
+
+
+@dataclass
+class WriteStats:
+    """
+    累計的檔案寫入統計。
+
+    write_stats 為整個行程的累計值；同一行程中同時執行多個 spider 時，
+    各 crawler 另以 write_stats_for(crawler) 取得自己的統計，並傳給寫入
+    函式的 stats 參數。
+    """
+
+    files_written: int = 0
+    files_skipped: int = 0
+    bytes_written: int = 0
+    bytes_skipped: int = 0
+
+    def __post_init__(self):
+        # WriteQueue 的背景執行緒也會寫入
+        self._lock = threading.Lock()
+
+    def record(self, result: WriteResult) -> None:
+        with self._lock:
+            if result.written:
+                self.files_written += 1
+                self.bytes_written += result.size
+            else:
+                self.files_skipped += 1
+                self.bytes_skipped += result.size
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return asdict(self)
+
+
+write_stats = WriteStats()
+
+_owner_write_stats: "weakref.WeakKeyDictionary[Any, WriteStats]" = (
+    weakref.WeakKeyDictionary()
+)
+_owner_write_stats_lock = threading.Lock()
+
+
+def write_stats_for(owner: Any) -> WriteStats:
+    """取得 owner（通常是 crawler）專屬的寫入統計，第一次呼叫時建立。"""
+    with _owner_write_stats_lock:
+        stats = _owner_write_stats.get(owner)
+        if stats is None:
+            stats = _owner_write_stats[owner] = WriteStats()
+        return stats
+
+
+_thread_scopes = threading.local()
+
+
+@contextmanager
+def track_writes(stats: WriteStats) -> Iterator[WriteStats]:
+    """
+    在 with 區塊中，將目前執行緒透過 file_utils 的寫入另外計入 stats。
+
+    只計入同一執行緒的寫入，其他執行緒（例如 WriteQueue 的背景寫入）不會
+    計入。區塊中不可 await 或 yield，否則期間其他工作的寫入也會被計入。
+    """
+    scopes = getattr(_thread_scopes, "stack", None)
+    if scopes is None:
+        scopes = _thread_scopes.stack = []
+    scopes.append(stats)
+    try:
+        yield stats
+    finally:
+        scopes.pop()
+
+
+def _record_write(result: WriteResult, stats: Optional[WriteStats]) -> None:
+    """將寫入結果計入行程累計、呼叫端指定的統計與 track_writes 的統計。"""
+    write_stats.record(result)
+    if stats is not None and stats is not write_stats:
+        stats.record(result)
+    for scope in getattr(_thread_scopes, "stack", ()):
+        if scope is not stats:
+            scope.record(result)
+
+
+def _open_temp(file_path: Path) -> Tuple[BinaryIO, str]:
+    """在目標檔案同目錄下建立暫存檔。"""
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f".{file_path.name}.", suffix=".tmp", dir=file_path.parent
+    )
+    return os.fdopen(fd, "wb"), tmp_name
+
+
+def _copy_prefix(source: Optional[BinaryIO], target: BinaryIO, length: int) -> None:
+    """將 source 開頭 length 個位元組複製到 target。"""
+    if source is None or length == 0:
+        return
+    source.seek(0)
+    while length > 0:
+        block = source.read(min(length, WRITE_CHUNK_SIZE))
+        if not block:
+            break
+        target.write(block)
+        length -= len(block)
+
+
+class AtomicFileWriter:
+    """
+    以原子方式逐段寫入檔案，內容未變時不寫入。
+
+    寫入時會邊接收區塊邊與現有檔案逐段比對；只要出現差異，才建立同目錄的
+    暫存檔（先補上已比對相同的前段），commit 時 fsync 並以 os.replace 取代
+    目標檔案。內容完全相同時不會開檔寫入，檔案的 mtime 也維持不變。
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        skip_unchanged: bool = True,
+        stats: Optional[WriteStats] = None,
+    ):
+        """
+        Args:
+            file_path: 目標檔案路徑（所在目錄必須存在）。
+            skip_unchanged: 是否在內容相同時略過寫入。
+            stats: 除了行程累計的 write_stats 外，另外計入此統計。
+        """
+        self.file_path = file_path
+        self.stats = stats
+        try:
+            self._mode = file_path.stat().st_mode & 0o777
+            self._existing: Optional[BinaryIO] = (
+                open(file_path, "rb") if skip_unchanged else None
+            )
+        except FileNotFoundError:
+            self._mode = 0o644
+            self._existing = None
+        self._digest = hashlib.sha256()
+        self._size = 0
+        self._matched = 0
+        self._tmp_file: Optional[BinaryIO] = None
+        self._tmp_name = ""
+
+    def _start_temp(self) -> BinaryIO:
+        self._tmp_file, self._tmp_name = _open_temp(self.file_path)
+        _copy_prefix(self._existing, self._tmp_file, self._matched)
+        return self._tmp_file
+
+    def write(self, chunk: bytes) -> None:
+        self._digest.update(chunk)
+        self._size += len(chunk)
+        tmp_file = self._tmp_file
+        if tmp_file is None:
+            existing = self._existing
+            if existing is not None and existing.read(len(chunk)) == chunk:
+                self._matched += len(chunk)
+                return
+            tmp_file = self._start_temp()
+        tmp_file.write(chunk)
+
+    def commit(self) -> WriteResult:
+        """完成寫入並取代目標檔案；失敗時清除暫存檔後拋出例外。"""
+        try:
+            tmp_file = self._tmp_file
+            if tmp_file is None:
+                if self._existing is not None and not self._existing.read(1):
+                    result = WriteResult(
+                        written=False, size=self._size, digest=self._digest.hexdigest()
+                    )
+                    _record_write(result, self.stats)
+                    self._close_existing()
+                    return result
+                # 新內容為舊檔案的前段（檔案變短），仍需重寫
+                tmp_file = self._start_temp()
+
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+            tmp_file.close()
+            os.chmod(self._tmp_name, self._mode)
+            os.replace(self._tmp_name, self.file_path)
+            self._tmp_file = None
+            dataset_cache.invalidate(self.file_path)
+        except BaseException:
+            self.abort()
+            raise
+        self._close_existing()
+
+        result = WriteResult(
+            written=True, size=self._size, digest=self._digest.hexdigest()
+        )
+        _record_write(result, self.stats)
+        return result
+
+    def abort(self) -> None:
+        """放棄寫入，刪除暫存檔，目標檔案維持原狀。"""
+        if self._tmp_file is not None:
+            self._tmp_file.close()
+            self._tmp_file = None
+            try:
+                os.unlink(self._tmp_name)
+            except FileNotFoundError:
+                pass
+        self._close_existing()
+
+    def _close_existing(self) -> None:
+        if self._existing is not None:
+            self._existing.close()
+            self._existing = None
+
+
+def atomic_write_chunks(
+    chunks: Iterable[bytes],
+    file_path: Path,
+    skip_unchanged: bool = True,
+    stats: Optional[WriteStats] = None,
+) -> WriteResult:
+    """
+    以原子方式將位元組區塊寫入檔案，內容未變時不寫入（見 AtomicFileWriter）。
+
+    Args:
+        chunks: 要寫入的位元組區塊。
+        file_path: 目標檔案路徑（所在目錄必須存在）。
+        skip_unchanged: 是否在內容相同時略過寫入。
+        stats: 除了行程累計的 write_stats 外，另外計入此統計。
+
+    Returns:
+        WriteResult，包含是否寫入、大小與 SHA-256。
+    """
+    writer = AtomicFileWriter(file_path, skip_unchanged, stats)
+    try:
+        for chunk in chunks:
+            writer.write(chunk)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.commit()
+
+
+class JsonArrayWriter:
+    """
+    逐筆寫入頂層為 list 的 JSON 檔案。
+
+    輸出與 save_json(list, indent=indent) 完全相同，但不需先在記憶體中組出
+    整個 list；每筆資料以目前的預設 codec 編碼後累積到約 WRITE_CHUNK_SIZE
+    再交給 AtomicFileWriter，同樣具有原子寫入與內容未變時略過的特性。
+
+    可作為 context manager 使用：正常離開時 close()，發生例外時 abort()。
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        ensure_dir: bool = True,
+        indent: Optional[int] = 4,
+        stats: Optional[WriteStats] = None,
+    ):
+        if ensure_dir:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.file_path = file_path
+        self.indent = indent
+        self.count = 0
+        self._codec = get_codec()
+        self._writer = AtomicFileWriter(file_path, stats=stats)
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+        self._set_brackets(b"[", b"]")
+
+    def _set_brackets(self, open_bracket: bytes, close_bracket: bytes) -> None:
+        self._empty = open_bracket + close_bracket
+        if self.indent is None:
+            self._open, self._separator = open_bracket, b","
+            self._close = close_bracket
+        else:
+            padding = b" " * self.indent
+            self._open = open_bracket + b"\n" + padding
+            self._separator = b",\n" + padding
+            self._close = b"\n" + close_bracket
+
+    def _push(self, piece: bytes) -> None:
+        self._buffer.append(piece)
+        self._buffered += len(piece)
+        if self._buffered >= WRITE_CHUNK_SIZE:
+            self._writer.write(b"".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+
+    def append(self, item: Any) -> None:
+        """寫入一筆資料。"""
+        self._push(self._separator if self.count else self._open)
+        self._push(self._codec.encode_item(item, self.indent))
+        self.count += 1
+
+    def close(self) -> WriteResult:
+        """寫入結尾並原子性地取代目標檔案。"""
+        self._push(self._close if self.count else self._empty)
+        if self._buffer:
+            self._writer.write(b"".join(self._buffer))
+            self._buffer.clear()
+        return self._writer.commit()
+
+    def abort(self) -> None:
+        """放棄寫入，目標檔案維持原狀。"""
+        self._buffer.clear()
+        self._writer.abort()
+
+    def __enter__(self) -> "JsonArrayWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class JsonObjectWriter(JsonArrayWriter):
+    """
+    逐項寫入頂層為 dict 的 JSON 檔案。
+
+    輸出與 save_json(dict, indent=indent) 完全相同（鍵須為字串，依寫入順序
+    排列，不檢查重複），其餘行為同 JsonArrayWriter。
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        ensure_dir: bool = True,
+        indent: Optional[int] = 4,
+        stats: Optional[WriteStats] = None,
+    ):
+        super().__init__(file_path, ensure_dir, indent, stats)
+        self._set_brackets(b"{", b"}")
+        self._key_separator = b":" if indent is None else b": "
+
+    def append(self, key: str, value: Any) -> None:  # type: ignore[override]
+        """寫入一個鍵值。"""
+        self._push(self._separator if self.count else self._open)
+        self._push(self._codec.dumps(key, indent=None) + self._key_separator)
+        self._push(self._codec.encode_item(value, self.indent))
+        self.count += 1
+
+    def __enter__(self) -> "JsonObjectWriter":
+        return self
+
+
+def write_json(
+    data: Any,
+    file_path: Path,
+    ensure_dir: bool = True,
+    indent: Optional[int] = 4,
+    stats: Optional[WriteStats] = None,
+) -> WriteResult:
+    """
+    將資料序列化為 JSON 並寫入檔案，內容未變時略過。
+
+    與 save_json 相同，但失敗時直接拋出例外，並回傳 WriteResult。
+    """
+    if ensure_dir:
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+    result = atomic_write_chunks(iter_json_chunks(data, indent), file_path, stats=stats)
+    dataset_cache.publish(file_path, data)
+    return result
+
+
+def save_json(
+    data: Any,
+    file_path: Path,
+    ensure_dir: bool = True,
+    indent: Optional[int] = 4,
+    stats: Optional[WriteStats] = None,
+) -> bool:
     """
     儲存資料為 JSON 檔案。
 
+    資料會逐段編碼並寫入暫存檔，完成後才原子性地取代目標檔案；
+    若序列化結果與現有檔案相同則不寫入。
+
     Args:
         data: 要儲存的資料。
         file_path: JSON 檔案路徑。
         ensure_dir: 是否確保目錄存在。
+        indent: 縮排空白數，None 表示輸出最小化 JSON。
+        stats: 除了行程累計的 write_stats 外，另外計入此統計。
 
     Returns:
         成功返回 True，失敗返回 False。
     """
     try:
-        if ensure_dir:
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        write_json(data, file_path, ensure_dir=ensure_dir, indent=indent, stats=stats)
         return True
     except Exception as e:
         print(f"錯誤：儲存 JSON 檔案失敗 '{file_path}': {e}")
@@ -0,0 +1,74 @@
+"""Low-overhead log2 histograms for crawl instrumentation."""
+
+from typing import Any, Dict, List
+
+
+class Log2Histogram:
+    """
+    以 2 的次方為區間的直方圖。
+
+    第 i 個區間收集 [2^(i-1), 2^i) 的值（第 0 個區間只收 0），記錄一個值
+    只需一次 int.bit_length()，適合放在每個回應、每個 item 的熱路徑上。
+    """
+
+    __slots__ = ("counts", "count", "total", "minimum", "maximum")
+
+    def __init__(self):
+        self.counts: List[int] = []
+        self.count = 0
+        self.total = 0.0
+        self.minimum = float("inf")
+        self.maximum = 0.0
+
+    def record(self, value: float) -> None:
+        """記錄一個非負的值。"""
+        index = int(value).bit_length()
+        if index >= len(self.counts):
+            self.counts.extend([0] * (index + 1 - len(self.counts)))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, fraction: float) -> float:
+        """
+        以區間上界估算百分位數。
+
+        Args:
+            fraction: 0 到 1 之間的比例，例如 0.9 代表 p90。
+
+        Returns:
+            百分位數所在區間的上界（不超過實際最大值）。
+        """
+        if not self.count:
+            return 0.0
+        threshold = fraction * self.count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= threshold:
+                return min(float(1 << index), self.maximum)
+        return self.maximum
+
+    def to_dict(self) -> Dict[str, Any]:
+        """轉為可寫入 JSON 的摘要，buckets 以區間上界為鍵。"""
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "min": round(self.minimum, 3),
+            "max": round(self.maximum, 3),
+            "mean": round(self.total / self.count, 3),
+            "p50": round(self.percentile(0.5), 3),
+            "p90": round(self.percentile(0.9), 3),
+            "p99": round(self.percentile(0.99), 3),
+            "buckets": {
+                str(1 << index): bucket
+                for index, bucket in enumerate(self.counts)
+                if bucket
+            },
+        }
@@ -0,0 +1,426 @@
+"""Pluggable JSON codecs used by file_utils."""
+
+import codecs
+import dataclasses
+import json
+import math
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+
+# 串流寫入時，累積到此大小才輸出一個區塊，避免大量細碎的 write 呼叫
+WRITE_CHUNK_SIZE = 64 * 1024
+
+DEFAULT_CODEC = "stdlib"
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+# 紀錄型別 -> 依定義順序排列的欄位名稱
+_RECORD_FIELDS: Dict[type, Tuple[str, ...]] = {}
+
+
+def is_record(data: Any) -> bool:
+    """是否為 dataclass 紀錄（例如以 @dataclass(slots=True) 定義的 Item）。"""
+    return dataclasses.is_dataclass(data) and not isinstance(data, type)
+
+
+def record_to_dict(data: Any) -> Dict[str, Any]:
+    """
+    將紀錄的欄位依定義順序轉為 dict（淺層，不會複製欄位值）。
+
+    與 dataclasses.asdict 不同，巢狀的紀錄與 list 保持原樣，由 codec 在
+    編碼時再逐一處理。
+    """
+    names = _RECORD_FIELDS.get(type(data))
+    if names is None:
+        names = _RECORD_FIELDS[type(data)] = tuple(
+            field.name for field in dataclasses.fields(data)
+        )
+    return {name: getattr(data, name) for name in names}
+
+
+def _encode_default(data: Any) -> Any:
+    """json / orjson 的 default：將紀錄編碼為依欄位順序排列的物件。"""
+    if is_record(data):
+        return record_to_dict(data)
+    raise TypeError(f"Object of type {type(data).__name__} is not JSON serializable")
+
+
+def _orjson_differs(data: Any) -> bool:
+    """
+    data 中是否有 orjson 與標準函式庫編碼結果不同的浮點數。
+
+    以指數形式表示的浮點數（例如 1e+16 與 1e16、1.5e-07 與 1.5e-7）與
+    NaN / Infinity（orjson 寫成 null）的輸出不同；其他浮點數兩者相同。
+    """
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value) or "e" in repr(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+            stack.extend(key for key in value if isinstance(key, float))
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif is_record(value):
+            stack.extend(record_to_dict(value).values())
+    return False
+
+
+def _batched(pieces: Iterable[bytes], chunk_size: int) -> Iterator[bytes]:
+    """將細碎的位元組片段合併成約 chunk_size 大小的區塊。"""
+    buffer: List[bytes] = []
+    buffered = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= chunk_size:
+            yield b"".join(buffer)
+            buffer.clear()
+            buffered = 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+class JsonCodec:
+    """
+    JSON 編解碼器介面。
+
+    所有實作必須產生完全相同的輸出：UTF-8、不轉義非 ASCII 字元
+    （等同 ensure_ascii=False）、保留 dict 的鍵順序。dataclass 紀錄直接
+    編碼為依欄位順序排列的物件，不需要先轉成 dict。
+    indent 為 None 時輸出不含空白的最小化 JSON。
+    """
+
+    name = ""
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """解析 JSON 位元組或字串。"""
+        raise NotImplementedError
+
+    def iterencode(self, data: Any, indent: Optional[int] = 4) -> Iterator[bytes]:
+        """將資料逐段編碼為 UTF-8 JSON 區塊。"""
+        raise NotImplementedError
+
+    def dumps(self, data: Any, indent: Optional[int] = 4) -> bytes:
+        """將資料一次編碼為 UTF-8 JSON 位元組。"""
+        return b"".join(self.iterencode(data, indent))
+
+    def encode_item(self, data: Any, indent: Optional[int] = 4) -> bytes:
+        """
+        將資料編碼為頂層 list 的一個元素（縮排位於第 1 層），
+        與 iterencode(list) 中對應元素的輸出相同。
+        """
+        raise NotImplementedError
+
+
+class StdlibJsonCodec(JsonCodec):
+    """以標準函式庫 json 模組實作的編解碼器。"""
+
+    name = "stdlib"
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+    def iterencode(self, data: Any, indent: Optional[int] = 4) -> Iterator[bytes]:
+        separators = (",", ":") if indent is None else None
+        encoder = json.JSONEncoder(
+            ensure_ascii=False,
+            indent=indent,
+            separators=separators,
+            default=_encode_default,
+        )
+        pieces = (piece.encode("utf-8") for piece in encoder.iterencode(data))
+        return _batched(pieces, WRITE_CHUNK_SIZE)
+
+    def encode_item(self, data: Any, indent: Optional[int] = 4) -> bytes:
+        if indent is None:
+            return json.dumps(
+                data,
+                ensure_ascii=False,
+                separators=(",", ":"),
+                default=_encode_default,
+            ).encode("utf-8")
+        encoded = json.dumps(
+            data, ensure_ascii=False, indent=indent, default=_encode_default
+        )
+        return encoded.replace("\n", "\n" + " " * indent).encode("utf-8")
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    以 orjson 實作的編解碼器。
+
+    orjson 只支援 2 格縮排，其他縮排寬度由 2 格縮排的輸出換算：JSON 字串內的
+    換行一定會被轉義，因此每一行開頭的空白都是結構縮排，可以安全地等比放大。
+    頂層為 list 時逐一編碼元素，以維持串流寫入的特性。
+
+    為了與 StdlibJsonCodec 的輸出完全相同，orjson 的格式不同的值（指數形式
+    或非有限的浮點數，見 _orjson_differs）與無法編碼的值（超過 64 位元的
+    整數）改由標準函式庫編碼；只有 orjson 的輸出中出現可能不同的片段
+    （見 _maybe_different）時才需要逐一檢查。解析時 orjson 會把超過 64 位元的整數轉為浮點數，也不接受
+    NaN / Infinity，這些情況同樣改由標準函式庫解析。
+    """
+
+    name = "orjson"
+    _ANY_LEVEL = re.compile(rb"\n( *)")
+    # 將數字都換成 "0" 後再以 bytes 搜尋數字的樣式，比 re 快得多
+    _DIGITS_AS_ZERO = bytes.maketrans(b"0123456789", b"0" * 10)
+
+    @classmethod
+    def _maybe_different(cls, encoded: bytes) -> bool:
+        """
+        orjson 的輸出中是否可能有與標準函式庫不同的值。
+
+        標準函式庫以指數形式輸出的浮點數，orjson 會寫成指數形式、0.0000 開頭
+        的小數或 17 位以上的整數部分；NaN / Infinity 則寫成 null。
+        """
+        if b"null" in encoded or b"0.0000" in encoded:
+            return True
+        shape = encoded.translate(cls._DIGITS_AS_ZERO)
+        return b"0e" in shape or b"0" * 17 in shape
+
+    @classmethod
+    def _has_long_integer(cls, data: bytes) -> bool:
+        """是否可能有超過 64 位元的整數（19 位以上的連續數字）。"""
+        return b"0" * 19 in data.translate(cls._DIGITS_AS_ZERO)
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._stdlib = StdlibJsonCodec()
+        self._options = orjson.OPT_NON_STR_KEYS
+        self._level_patterns: Dict[int, "re.Pattern[bytes]"] = {}
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        if self._has_long_integer(raw):
+            return self._stdlib.loads(data)
+        try:
+            return self._orjson.loads(data)
+        except self._orjson.JSONDecodeError:
+            return self._stdlib.loads(data)
+
+    def _level_pattern(self, level: int) -> "re.Pattern[bytes]":
+        """比對恰好位於第 level 層（2 格縮排）的行首。"""
+        pattern = self._level_patterns.get(level)
+        if pattern is None:
+            pattern = re.compile(b"\n" + b"  " * level + b"(?! )")
+            self._level_patterns[level] = pattern
+        return pattern
+
+    def _stdlib_encode(self, data: Any, indent: Optional[int], depth: int) -> bytes:
+        if depth:
+            return self._stdlib.encode_item(data, indent)
+        return self._stdlib.dumps(data, indent)
+
+    def _encode(self, data: Any, indent: Optional[int], depth: int) -> bytes:
+        """編碼單一值，並將縮排換算成 indent 格、再整體右移 depth 層。"""
+        options = self._options
+        if indent is not None:
+            options |= self._orjson.OPT_INDENT_2
+        try:
+            encoded = self._orjson.dumps(data, default=_encode_default, option=options)
+        except self._orjson.JSONEncodeError:
+            # 例如超過 64 位元的整數；真正無法編碼的值由標準函式庫拋出例外
+            return self._stdlib_encode(data, indent, depth)
+        if self._maybe_different(encoded) and _orjson_differs(data):
+            return self._stdlib_encode(data, indent, depth)
+        if indent is None:
+            return encoded
+        if indent == 2 and depth == 0:
+            return encoded
+        shift = indent * depth
+        if indent == 2:
+            return encoded.replace(b"\n", b"\n" + b" " * shift)
+        if indent < 2:
+            return self._ANY_LEVEL.sub(
+                lambda m: b"\n" + b" " * (len(m.group(1)) // 2 * indent + shift),
+                encoded,
+            )
+
+        # 由最深層往外逐層替換：indent >= 2 時，換算後的縮排一定比尚未處理的
+        # 淺層更長，不會被後續的比對誤判
+        max_level = 0
+        while b"\n" + b"  " * (max_level + 1) in encoded:
+            max_level += 1
+        for level in range(max_level, -1, -1):
+            encoded = self._level_pattern(level).sub(
+                b"\n" + b" " * (indent * level + shift), encoded
+            )
+        return encoded
+
+    def _iter_list(self, data: list, indent: Optional[int]) -> Iterator[bytes]:
+        if not data:
+            yield b"[]"
+            return
+        if indent is None:
+            yield b"["
+            separator = b","
+        else:
+            padding = b" " * indent
+            yield b"[\n" + padding
+            separator = b",\n" + padding
+        for index, element in enumerate(data):
+            if index:
+                yield separator
+            yield self._encode(element, indent, depth=1)
+        yield b"]" if indent is None else b"\n]"
+
+    def encode_item(self, data: Any, indent: Optional[int] = 4) -> bytes:
+        return self._encode(data, indent, depth=1)
+
+    def iterencode(self, data: Any, indent: Optional[int] = 4) -> Iterator[bytes]:
+        if isinstance(data, list):
+            return _batched(self._iter_list(data, indent), WRITE_CHUNK_SIZE)
+        return iter([self._encode(data, indent, depth=0)])
+
+
+def iter_json_array(
+    chunks: Iterable[bytes], key: Optional[str] = None
+) -> Iterator[Any]:
+    """
+    逐一解析 JSON 陣列的元素，不需先載入整份文件。
+
+    以 json.JSONDecoder.raw_decode 每次只解析一個元素，記憶體用量只與單一
+    元素的大小有關。頂層可以是陣列，或是以 key 指定的物件欄位中的陣列
+    （例如 {"工作表1": [...]}）。
+
+    Args:
+        chunks: UTF-8 編碼的 JSON 位元組區塊。
+        key: 頂層為物件時，要展開的陣列欄位名稱。
+
+    Yields:
+        陣列中的每個元素。
+
+    Raises:
+        json.JSONDecodeError: JSON 格式錯誤。
+        ValueError: 找不到要展開的陣列。
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    source = iter(chunks)
+    buffer = ""
+    pos = 0
+    exhausted = False
+
+    def fill() -> bool:
+        """讀入下一個區塊，已無資料時回傳 False。"""
+        nonlocal buffer, pos, exhausted
+        if exhausted:
+            return False
+        chunk = next(source, None)
+        if chunk is None:
+            exhausted = True
+            text = text_decoder.decode(b"", final=True)
+        else:
+            text = text_decoder.decode(chunk)
+        buffer = buffer[pos:] + text
+        pos = 0
+        return True
+
+    def skip_whitespace() -> str:
+        """略過空白並回傳下一個字元，資料結束時回傳空字串。"""
+        nonlocal pos
+        while True:
+            match = _WHITESPACE.match(buffer, pos)
+            pos = match.end()
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                return ""
+
+    def decode_value() -> Any:
+        nonlocal pos
+        skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise
+            # 數字可能在區塊邊界被截斷（例如 "2." 之後才是 "5"），讀到下一個
+            # 區塊再重新解析
+            if _NUMBER_TAIL.match(buffer, end).end() == len(buffer) and fill():
+                continue
+            pos = end
+            return value
+
+    def expect(char: str) -> None:
+        nonlocal pos
+        if skip_whitespace() != char:
+            raise ValueError(f"JSON 格式錯誤：預期 {char!r}，位置 {pos}")
+        pos += 1
+
+    first = skip_whitespace()
+    if first == "{":
+        if key is None:
+            raise ValueError("JSON 頂層為物件，但未指定要展開的欄位")
+        pos += 1
+        while True:
+            if skip_whitespace() == "}":
+                raise ValueError(f"JSON 物件中找不到陣列欄位 {key!r}")
+            name = decode_value()
+            expect(":")
+            if name == key:
+                break
+            decode_value()
+            if skip_whitespace() == ",":
+                pos += 1
+    expect("[")
+
+    if skip_whitespace() == "]":
+        return
+    while True:
+        yield decode_value()
+        separator = skip_whitespace()
+        pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"JSON 格式錯誤：預期 ',' 或 ']'，位置 {pos - 1}")
+
+
+CODECS: Dict[str, Type[JsonCodec]] = {
+    StdlibJsonCodec.name: StdlibJsonCodec,
+    OrjsonCodec.name: OrjsonCodec,
+}
+
+_default_codec: Optional[JsonCodec] = None
+
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    """
+    取得 JSON 編解碼器。
+
+    Args:
+        name: 編解碼器名稱（"stdlib"、"orjson"），None 表示使用目前的預設值。
+
+    Returns:
+        JsonCodec 實例；指定的後端無法載入時退回 stdlib。
+    """
+    global _default_codec
+    if name is None:
+        if _default_codec is None:
+            _default_codec = StdlibJsonCodec()
+        return _default_codec
+
+    codec_cls = CODECS.get(name)
+    if codec_cls is None:
+        print(f"警告：未知的 JSON codec '{name}'，改用 {DEFAULT_CODEC}。")
+        return StdlibJsonCodec()
+    try:
+        return codec_cls()
+    except ImportError as e:
+        print(f"警告：無法載入 JSON codec '{name}' ({e})，改用 {DEFAULT_CODEC}。")
+        return StdlibJsonCodec()
+
+
+def set_default_codec(name: str) -> JsonCodec:
+    """設定 load_json / save_json 預設使用的編解碼器。"""
+    global _default_codec
+    _default_codec = get_codec(name)
+    return _default_codec
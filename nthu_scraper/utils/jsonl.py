@@ -0,0 +1,111 @@
+"""Buffered JSON Lines spool files and an external merge sort over them."""
+
+import heapq
+import tempfile
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from nthu_scraper.utils.json_codec import WRITE_CHUNK_SIZE, get_codec
+
+# 外部排序時每個 run 的筆數（同時也是排序時記憶體中最多保留的筆數）
+DEFAULT_RUN_SIZE = 10000
+
+
+class JsonLinesWriter:
+    """
+    逐筆附加資料到 JSON Lines 檔案（每行一筆最小化 JSON）。
+
+    寫入經過約 WRITE_CHUNK_SIZE 的緩衝；每累積 flush_every 筆會 flush 到
+    作業系統，程式中途被終止時最多遺失最後這些筆數。
+    """
+
+    def __init__(
+        self, file_path: Path, flush_every: int = 100, ensure_dir: bool = True
+    ):
+        if ensure_dir:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+        self.file_path = file_path
+        self.flush_every = flush_every
+        self.count = 0
+        self._codec = get_codec()
+        self._file = open(file_path, "wb", buffering=WRITE_CHUNK_SIZE)
+
+    def append(self, item: Any) -> None:
+        """寫入一筆資料。"""
+        self._file.write(self._codec.dumps(item, indent=None) + b"\n")
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self) -> "JsonLinesWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def iter_json_lines(file_path: Path) -> Iterator[Any]:
+    """
+    逐行解析 JSON Lines 檔案。
+
+    檔案最後一行不完整時（例如寫入中途被終止）略過該行。
+    """
+    codec = get_codec()
+    with open(file_path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                try:
+                    item = codec.loads(line)
+                except ValueError:
+                    return
+                yield item
+                return
+            if line.strip():
+                yield codec.loads(line)
+
+
+def external_sort(
+    items: Iterable[Any],
+    key: Callable[[Any], Any],
+    run_size: int = DEFAULT_RUN_SIZE,
+    temp_dir: Optional[Path] = None,
+) -> Iterator[Any]:
+    """
+    以外部合併排序依 key 排序資料，記憶體中最多保留 run_size 筆。
+
+    資料每 run_size 筆排序後寫成一個 JSON Lines 暫存檔（run），再以
+    heapq.merge 合併；只有一個 run 時直接在記憶體中排序，不建立暫存檔。
+    排序是穩定的，結果與 sorted(items, key=key) 相同。資料需可序列化為
+    JSON；有多個 run 時，輸出的是解析 run 檔案得到的資料。
+
+    Args:
+        items: 要排序的資料。
+        key: 排序鍵。
+        run_size: 每個 run 的筆數。
+        temp_dir: 暫存檔所在的資料夾，None 表示系統暫存資料夾。
+
+    Yields:
+        排序後的資料。
+    """
+    source = iter(items)
+    first = sorted(islice(source, run_size), key=key)
+    if len(first) < run_size:
+        yield from first
+        return
+
+    with tempfile.TemporaryDirectory(prefix="sort_", dir=temp_dir) as tmp:
+        runs: List[Path] = []
+        batch = first
+        while batch:
+            run_path = Path(tmp) / f"{len(runs)}.jsonl"
+            with JsonLinesWriter(run_path, flush_every=run_size) as writer:
+                for item in batch:
+                    writer.append(item)
+            runs.append(run_path)
+            batch = sorted(islice(source, run_size), key=key)
+        yield from heapq.merge(*(iter_json_lines(run) for run in runs), key=key)
@@ -0,0 +1,172 @@
+"""Bounded background write queue with per-path coalescing."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from nthu_scraper.utils.file_utils import (
+    WriteStats,
+    atomic_write_chunks,
+    dataset_cache,
+    iter_json_chunks,
+)
+
+# 寫入後不需要放入資料集讀取快取
+_NO_DATA = object()
+
+
+@dataclass
+class _Job:
+    chunks: Sequence[bytes]
+    data: Any = _NO_DATA
+
+
+@dataclass
+class WriteQueueStats:
+    """寫入佇列的累計統計。"""
+
+    submitted: int = 0  # submit 呼叫次數
+    coalesced: int = 0  # 尚未開始寫入即被同一路徑較新的內容取代的次數
+    written: int = 0  # 實際寫入的檔案數
+    skipped: int = 0  # 內容未變而略過的檔案數
+    failed: int = 0  # 寫入失敗的次數
+    bytes_submitted: int = 0
+    max_depth: int = 0  # 同時排隊或寫入中的路徑數最大值
+    errors: List[Tuple[str, str]] = field(default_factory=list)
+
+
+class WriteQueue:
+    """
+    在背景執行緒寫入檔案的佇列。
+
+    呼叫端（reactor 執行緒）先將資料序列化為位元組區塊再交給 submit，
+    實際的建立資料夾、開檔、寫入與 fsync 都在最多 max_workers 個執行緒中
+    以 atomic_write_chunks 完成，內容未變時同樣略過寫入。
+
+    同一路徑同時最多只有一個寫入在執行；寫入尚未開始前再次提交同一路徑時
+    只保留最新的內容（最後寫入者為準），因此同一路徑的寫入不會互相覆蓋成
+    舊的內容。max_workers 為 0 時在 submit 中直接寫入（不使用執行緒）。
+
+    on_done 會在每個路徑寫入完成後於背景執行緒中被呼叫，可用來通知
+    reactor 佇列深度已下降。write_stats 有指定時，寫入結果除了行程累計外
+    另外計入此統計（見 file_utils.write_stats_for）。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        on_done: Optional[Callable[[], None]] = None,
+        write_stats: Optional[WriteStats] = None,
+    ):
+        self.max_workers = max_workers
+        self.on_done = on_done
+        self.write_stats = write_stats
+        self.stats = WriteQueueStats()
+        self._executor = (
+            ThreadPoolExecutor(max_workers, thread_name_prefix="write_queue")
+            if max_workers > 0
+            else None
+        )
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending: Dict[Path, _Job] = {}
+        self._running: Set[Path] = set()
+
+    @property
+    def depth(self) -> int:
+        """排隊中與寫入中的路徑數。"""
+        # 排隊中的路徑必定也在 _running 中（由同一個工作持續寫到沒有新提交）
+        with self._lock:
+            return len(self._running)
+
+    def submit(
+        self, file_path: Path, chunks: Sequence[bytes], data: Any = _NO_DATA
+    ) -> None:
+        """
+        提交一個寫入。
+
+        Args:
+            file_path: 目標檔案路徑，所在資料夾不存在時會在寫入前建立。
+            chunks: 已序列化的位元組區塊。
+            data: 與寫入內容相同的資料；有指定時寫入後交給
+                dataset_cache.publish。
+        """
+        job = _Job(chunks, data)
+        with self._lock:
+            self.stats.submitted += 1
+            self.stats.bytes_submitted += sum(len(chunk) for chunk in chunks)
+            if self._executor is None:
+                self._running.add(file_path)
+            else:
+                if file_path in self._pending:
+                    self.stats.coalesced += 1
+                self._pending[file_path] = job
+                if file_path not in self._running:
+                    self._running.add(file_path)
+                    self._executor.submit(self._drain_path, file_path)
+            if len(self._running) > self.stats.max_depth:
+                self.stats.max_depth = len(self._running)
+
+        if self._executor is None:
+            self._write(file_path, job)
+            with self._lock:
+                self._running.discard(file_path)
+
+    def submit_json(
+        self, data: Any, file_path: Path, indent: Optional[int] = 4
+    ) -> None:
+        """
+        以目前的預設 JSON codec 序列化資料後提交寫入，輸出與 save_json 相同。
+
+        序列化在呼叫端完成，之後修改 data 不會影響寫入的內容。
+        """
+        self.submit(file_path, list(iter_json_chunks(data, indent)), data)
+
+    def _drain_path(self, file_path: Path) -> None:
+        """寫入某一路徑的最新內容，直到該路徑沒有新的提交。"""
+        while True:
+            with self._lock:
+                job = self._pending.pop(file_path, None)
+                if job is None:
+                    self._running.discard(file_path)
+                    if not self._running:
+                        self._idle.notify_all()
+                    break
+            self._write(file_path, job)
+        if self.on_done is not None:
+            self.on_done()
+
+    def _write(self, file_path: Path, job: _Job) -> None:
+        try:
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            result = atomic_write_chunks(job.chunks, file_path, stats=self.write_stats)
+            if job.data is not _NO_DATA:
+                dataset_cache.publish(file_path, job.data)
+        except Exception as e:
+            with self._lock:
+                self.stats.failed += 1
+                self.stats.errors.append((str(file_path), repr(e)))
+            return
+        with self._lock:
+            if result.written:
+                self.stats.written += 1
+            else:
+                self.stats.skipped += 1
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """阻塞直到佇列清空，逾時返回 False。"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._running, timeout)
+
+    def close(self, wait: bool = True) -> None:
+        """
+        結束執行緒，不再接受新的提交。
+
+        Args:
+            wait: 是否阻塞直到所有已提交的內容寫完；為 False 時已提交的內容
+                仍會在背景寫完。
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
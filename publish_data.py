@@ -0,0 +1,189 @@
+import argparse
+import gzip
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from nthu_scraper.utils.file_utils import atomic_write_chunks
+from nthu_scraper.utils.json_codec import get_codec
+
+try:
+    import brotli
+except ImportError:  # brotli 為選用套件，缺少時只產生 .gz
+    brotli = None
+
+INDENTED_SUFFIX = ".indented.json"
+
+
+def publish_file(
+    path: Path, keep_indented: bool, brotli_quality: int = 11
+) -> Dict[str, int]:
+    """
+    將單一 JSON 檔案轉為最小化格式，並產生 .gz / .br 壓縮版本。
+
+    Args:
+        path: JSON 檔案路徑，會被最小化後的內容取代。
+        keep_indented: 是否另存一份縮排版本（<檔名>.indented.json）。
+        brotli_quality: brotli 壓縮等級 (0-11)。
+
+    Returns:
+        各版本的位元組數。
+    """
+    codec = get_codec("orjson")
+    raw = path.read_bytes()
+    minified = codec.dumps(codec.loads(raw), indent=None)
+
+    if keep_indented:
+        atomic_write_chunks([raw], path.with_name(path.stem + INDENTED_SUFFIX))
+    atomic_write_chunks([minified], path)
+
+    sizes = {"original": len(raw), "minified": len(minified)}
+
+    gz = gzip.compress(minified, compresslevel=9, mtime=0)
+    atomic_write_chunks([gz], path.with_name(path.name + ".gz"))
+    sizes["gzip"] = len(gz)
+
+    if brotli is not None:
+        br = brotli.compress(minified, quality=brotli_quality)
+        atomic_write_chunks([br], path.with_name(path.name + ".br"))
+        sizes["brotli"] = len(br)
+
+    return sizes
+
+
+def dataset_name(data_folder: Path, path: Path) -> str:
+    """以 data 底下第一層的檔案或資料夾名稱作為資料集名稱。"""
+    first = path.relative_to(data_folder).parts[0]
+    return first[: -len(".json")] if first.endswith(".json") else first
+
+
+def publish_data_folder(
+    data_folder: Path,
+    report_path: Optional[Path],
+    keep_indented: bool = False,
+    workers: Optional[int] = None,
+    brotli_quality: int = 11,
+) -> Dict[str, Dict[str, int]]:
+    """
+    平行處理資料夾內所有 JSON 檔案，並統計每個資料集節省的位元組數。
+
+    Args:
+        data_folder: 資料根目錄。
+        report_path: 報告輸出路徑，None 表示不輸出。
+        keep_indented: 是否保留縮排版本。
+        workers: 平行處理的行程數，None 表示使用所有 CPU 核心。
+        brotli_quality: brotli 壓縮等級 (0-11)。
+
+    Returns:
+        以資料集名稱為鍵的大小統計。
+    """
+    paths: List[Path] = sorted(
+        path
+        for path in data_folder.rglob("*.json")
+        if not path.name.endswith(INDENTED_SUFFIX)
+        and (report_path is None or path.resolve() != report_path.resolve())
+    )
+
+    report: Dict[str, Dict[str, int]] = {}
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [
+            executor.submit(publish_file, path, keep_indented, brotli_quality)
+            for path in paths
+        ]
+        for path, future in zip(paths, futures):
+            sizes = future.result()
+            totals = report.setdefault(dataset_name(data_folder, path), {"files": 0})
+            totals["files"] += 1
+            for key, value in sizes.items():
+                totals[key] = totals.get(key, 0) + value
+
+    if report_path is not None:
+        with report_path.open("w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False, sort_keys=True)
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, int]]) -> None:
+    """以表格輸出每個資料集的大小與節省比例。"""
+    columns = ["original", "minified", "gzip", "brotli"]
+    header = f"{'dataset':<40}{'files':>7}" + "".join(f"{c:>12}" for c in columns)
+    print(header + f"{'saved':>9}")
+    print("-" * (len(header) + 9))
+
+    total: Dict[str, int] = {}
+    for name in sorted(report):
+        sizes = report[name]
+        for key, value in sizes.items():
+            total[key] = total.get(key, 0) + value
+        print(_format_row(name, sizes, columns))
+    print("-" * (len(header) + 9))
+    print(_format_row("TOTAL", total, columns))
+
+
+def _format_row(name: str, sizes: Dict[str, int], columns: List[str]) -> str:
+    smallest = min(sizes.get(c, sizes["original"]) for c in columns)
+    saved = 1 - smallest / sizes["original"] if sizes["original"] else 0.0
+    cells = "".join(f"{sizes[c]:>12,}" if c in sizes else f"{'-':>12}" for c in columns)
+    return f"{name:<40}{sizes['files']:>7}{cells}{saved:>9.1%}"
+
+
+if __name__ == "__main__":
+    """
+    主程式入口。將資料夾內的 JSON 轉為最小化格式並產生預先壓縮的版本，
+    供 GitHub Pages 等靜態主機直接提供。
+    """
+    parser = argparse.ArgumentParser(
+        description="將資料夾內的 JSON 最小化，並平行產生 .gz / .br 壓縮檔。"
+    )
+    parser.add_argument(
+        "--data_folder",
+        type=str,
+        default="data",
+        help="要處理的根資料夾路徑 (預設為 'data')",
+    )
+    parser.add_argument(
+        "--report_path",
+        type=str,
+        default=None,
+        help="大小統計報告輸出路徑 (預設為 <data_folder>/publish_report.json)",
+    )
+    parser.add_argument(
+        "--keep_indented",
+        action="store_true",
+        help="另存一份縮排版本 (<檔名>.indented.json) 方便閱讀與比對",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="平行處理的行程數 (預設為 CPU 核心數)",
+    )
+    parser.add_argument(
+        "--brotli_quality",
+        type=int,
+        default=11,
+        help="brotli 壓縮等級 0-11 (預設為 11)",
+    )
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("警告：未安裝 brotli，略過產生 .br 檔案。")
+
+    data_folder = Path(args.data_folder)
+    report_path = (
+        Path(args.report_path)
+        if args.report_path
+        else data_folder / "publish_report.json"
+    )
+    print_report(
+        publish_data_folder(
+            data_folder,
+            report_path,
+            args.keep_indented,
+            args.workers,
+            args.brotli_quality,
+        )
+    )
+    print(f"{report_path} 檔案已生成。")
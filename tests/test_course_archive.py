@@ -0,0 +1,113 @@
+import math
+
+import pytest
+
+from nthu_scraper.utils.course_archive import (
+    CourseArchive,
+    SegmentBuilder,
+    build_archive,
+    write_segment,
+)
+from nthu_scraper.utils.file_utils import save_json
+
+FIELDS = [
+    "id",
+    "chinese_title",
+    "lecturer",
+    "credit",
+    "size_limit",
+    "student_count",
+    "freshman_reservation",
+]
+
+
+def course(course_id, title, lecturer, credit="3", size_limit="50"):
+    return dict(zip(FIELDS, [course_id, title, lecturer, credit, size_limit, "", "0"]))
+
+
+SEMESTERS = {
+    "11210": [
+        course("11210MATH101", "微積分", "王小明"),
+        course("11210CS135", "程式設計", "王小明", credit="2"),
+    ],
+    "11220": [
+        course("11220MATH101", "微積分", "李大華", size_limit="不限"),
+        course("11220MATH201", "離散數學", "王小明"),
+        course("11220PE100", "體育", "", credit="0"),
+    ],
+}
+
+
+def write_semesters(folder, semesters):
+    paths = []
+    for semester, courses in semesters.items():
+        path = folder / f"{semester}.json"
+        save_json(courses, path)
+        paths.append(path)
+    return paths
+
+
+def test_read_back(tmp_path):
+    paths = write_semesters(tmp_path / "semesters", SEMESTERS)
+    assert build_archive(paths, tmp_path / "archive") == 2
+
+    archive = CourseArchive(tmp_path / "archive")
+    assert archive.semesters == ["11210", "11220"]
+    assert archive.fields == FIELDS
+    assert len(archive) == 5
+    for semester, courses in SEMESTERS.items():
+        for field in FIELDS:
+            assert archive.strings(field, semester) == [c[field] for c in courses]
+    assert archive.semester_index().tolist() == [0, 0, 1, 1, 1]
+    assert archive.numbers("credit").tolist() == [3, 2, 3, 3, 0]
+    size_limit = archive.numbers("size_limit").tolist()
+    assert size_limit[:2] == [50, 50] and size_limit[3:] == [50, 50]
+    assert math.isnan(size_limit[2])
+    assert all(math.isnan(value) for value in archive.numbers("student_count"))
+
+
+def test_strings_share_one_table(tmp_path):
+    paths = write_semesters(tmp_path / "semesters", SEMESTERS)
+    build_archive(paths, tmp_path / "archive")
+    segment = CourseArchive(tmp_path / "archive").segment("11220")
+    codes = segment["codes"]
+    assert codes.shape == (len(FIELDS), 3)
+    values = {value for c in SEMESTERS["11220"] for value in c.values()}
+    assert len(segment["offsets"]) == len(values) + 1
+    # 不同欄位中相同的字串使用相同的編號
+    pe = SEMESTERS["11220"].index(course("11220PE100", "體育", "", credit="0"))
+    column = FIELDS.index
+    assert codes[column("credit")][pe] == codes[column("freshman_reservation")][pe]
+    assert codes[column("lecturer")][pe] == codes[column("student_count")][pe]
+
+
+def test_rewrite_skips_unchanged_and_replaces_segments(tmp_path):
+    folder = tmp_path / "archive"
+    paths = write_semesters(tmp_path / "semesters", SEMESTERS)
+    build_archive(paths, folder)
+    assert build_archive(paths, folder) == 0
+
+    builder = SegmentBuilder(FIELDS)
+    builder.add(course("11210EE200", "電路學", "陳"))
+    assert write_segment(folder, "11210", builder)
+
+    archive = CourseArchive(folder)
+    assert archive.rows == {"11210": 1, "11220": 3}
+    assert archive.strings("id", "11210") == ["11210EE200"]
+    assert archive.strings("id", "11220") == [c["id"] for c in SEMESTERS["11220"]]
+
+
+def test_wide_string_table(tmp_path):
+    builder = SegmentBuilder(["id"])
+    for i in range(70000):
+        builder.add({"id": f"C{i}", **{name: "1" for name in FIELDS[3:]}})
+    write_segment(tmp_path, "11220", builder)
+
+    archive = CourseArchive(tmp_path)
+    assert archive.segment("11220")["codes"].dtype.name == "uint32"
+    assert archive.strings("id", "11220")[-1] == "C69999"
+
+
+def test_missing_archive(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        CourseArchive(tmp_path)
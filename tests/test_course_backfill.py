@@ -0,0 +1,96 @@
+import pytest
+from scrapy.utils.test import get_crawler
+
+from nthu_scraper.spiders import nthu_courses
+from nthu_scraper.spiders.nthu_courses import CoursesSpider
+from nthu_scraper.utils.file_utils import load_json
+
+# 排在後面的來源優先
+SOURCES = {
+    "old": "https://example.com/old",
+    "mid": "https://example.com/mid",
+    "new": "https://example.com/new",
+}
+
+
+@pytest.fixture
+def spider(tmp_path, monkeypatch):
+    monkeypatch.setattr(nthu_courses, "HISTORICAL_COURSE_DATA_URL", SOURCES)
+    crawler = get_crawler(CoursesSpider)
+    spider = CoursesSpider()
+    spider._set_crawler(crawler)
+    spider.staged = {}
+    spider.backfill_state = {}
+    spider.backfill_state_path = tmp_path / "course_backfill.json"
+    spider.staging_folder = tmp_path / "staging"
+    spider.backfill_merged = False
+    spider.published = []
+    spider.publish_semester = lambda semester, path: spider.published.append(
+        (semester, path.relative_to(spider.staging_folder).as_posix())
+    )
+    return spider
+
+
+def stage(spider, source, *semesters):
+    spider.staged[source] = {
+        "sha256": f"{source}-digest",
+        "semesters": {semester: 1 for semester in semesters},
+        "invalid": 0,
+    }
+
+
+def test_semester_owner_is_the_last_source(spider):
+    # 依處理完成的順序加入，與來源順序相反
+    stage(spider, "new", "11220")
+    stage(spider, "mid", "11210", "11220")
+    stage(spider, "old", "11110", "11210")
+    assert spider.semester_owner("11110") == "old"
+    assert spider.semester_owner("11210") == "mid"
+    assert spider.semester_owner("11220") == "new"
+    assert spider.semester_owner("11310") == ""
+
+
+def test_semester_owner_uses_state_of_unchanged_sources(spider):
+    stage(spider, "mid", "11210", "11220")
+    spider.backfill_state = {"new": {"sha256": "x", "semesters": ["11220"]}}
+    assert spider.semester_owner("11210") == "mid"
+    assert spider.semester_owner("11220") == "new"
+
+
+def test_merge_backfill_order(spider):
+    stage(spider, "new", "11220")
+    stage(spider, "old", "11110", "11210", "11220")
+    stage(spider, "mid", "11210")
+    spider.merge_backfill(spider)
+    assert spider.published == [
+        ("11110", "old/11110.json"),
+        ("11210", "mid/11210.json"),
+        ("11220", "new/11220.json"),
+    ]
+    stats = spider.crawler.stats
+    assert stats.get_value("course_backfill/semesters_written") == 3
+
+    # spider_idle 可能觸發多次，只合併一次
+    spider.merge_backfill(spider)
+    assert len(spider.published) == 3
+
+
+def test_merge_backfill_keeps_semesters_of_unchanged_sources(spider):
+    spider.backfill_state = {
+        "new": {"sha256": "new-digest", "semesters": ["11220"], "checked": "x"}
+    }
+    stage(spider, "old", "11210", "11220")
+    spider.merge_backfill(spider)
+    # 11220 以未變更的 new 為準，沿用既有的學期檔案
+    assert spider.published == [("11210", "old/11210.json")]
+
+    state = load_json(spider.backfill_state_path)
+    assert state["new"] == spider.backfill_state["new"]
+    assert state["old"]["sha256"] == "old-digest"
+    assert state["old"]["semesters"] == ["11210", "11220"]
+
+
+def test_merge_backfill_without_staged_sources(spider):
+    spider.merge_backfill(spider)
+    assert spider.published == []
+    assert not spider.backfill_state_path.exists()
@@ -0,0 +1,101 @@
+from nthu_scraper.utils.course_search import (
+    CourseSearchIndex,
+    SearchIndexBuilder,
+    build_search_index,
+    index_is_current,
+    shard_key,
+    tokenize,
+)
+
+COURSES = [
+    {
+        "id": "MATH101",
+        "chinese_title": "微積分",
+        "english_title": "Calculus",
+        "lecturer": "王小明",
+    },
+    {
+        "id": "MATH201",
+        "chinese_title": "離散數學",
+        "english_title": "Discrete Mathematics",
+        "lecturer": "李大華",
+    },
+    {
+        "id": "CS135",
+        "chinese_title": "計算機程式設計",
+        "english_title": "Introduction to Programming",
+        "lecturer": "王大明",
+    },
+]
+
+
+def test_tokenize():
+    assert tokenize("數學 Intro 101") == ["數學", "intro", "101"]
+    assert tokenize("離散數學") == ["離散", "散數", "數學"]
+    assert tokenize("學") == ["學"]
+    assert tokenize("數學", unigrams=True) == ["數學", "數", "學"]
+
+
+def test_shard_key():
+    assert shard_key("intro") == "i"
+    assert shard_key("101") == "1"
+    assert shard_key("微積") == "u5f"
+    assert shard_key("微") == "u5f"
+
+
+def test_single_character_queries(tmp_path):
+    build_search_index(COURSES, tmp_path)
+    index = CourseSearchIndex(tmp_path)
+    # 只出現在 bigram 第二個字的單字也找得到
+    assert index.search("學") == ["MATH201"]
+    assert index.search("明") == ["MATH101", "CS135"]
+    assert index.search("王") == ["MATH101", "CS135"]
+    assert index.search("分") == ["MATH101"]
+
+
+def test_bigram_and_multi_term_queries(tmp_path):
+    build_search_index(COURSES, tmp_path)
+    index = CourseSearchIndex(tmp_path)
+    assert index.search("數學") == ["MATH201"]
+    assert index.search("王 大明") == ["CS135"]
+    assert index.search("程式 王") == ["CS135"]
+    assert index.search("數學 王") == []
+    assert index.search("物理") == []
+    assert index.search("  ") == []
+
+
+def test_ascii_prefix_queries(tmp_path):
+    build_search_index(COURSES, tmp_path)
+    index = CourseSearchIndex(tmp_path)
+    assert index.search("intro") == ["CS135"]
+    assert index.search("MATH") == ["MATH201"]
+    assert index.search("calc 微積") == ["MATH101"]
+
+
+def test_only_needed_shards_are_loaded(tmp_path):
+    build_search_index(COURSES, tmp_path)
+    index = CourseSearchIndex(tmp_path)
+    index.search("微")
+    assert index.shards_loaded == 1
+    index.search("微積")
+    assert index.shards_loaded == 1
+
+
+def test_rewrite_skips_unchanged_and_removes_stale_shards(tmp_path):
+    assert build_search_index(COURSES, tmp_path) > 0
+    assert build_search_index(COURSES, tmp_path) == 0
+    assert (tmp_path / "c.json").exists()
+
+    builder = SearchIndexBuilder()
+    builder.add(COURSES[1])
+    assert builder.write(tmp_path) > 0
+    assert not (tmp_path / "c.json").exists()
+    assert CourseSearchIndex(tmp_path).search("calculus") == []
+    assert CourseSearchIndex(tmp_path).search("數學") == ["MATH201"]
+
+
+def test_missing_index(tmp_path):
+    assert not index_is_current(tmp_path)
+    assert CourseSearchIndex(tmp_path).search("數學") == []
+    build_search_index(COURSES, tmp_path)
+    assert index_is_current(tmp_path)
@@ -0,0 +1,70 @@
+import pytest
+
+from nthu_scraper.utils.course_slots import (
+    DAYS,
+    MASK_BITS,
+    PERIODS,
+    CourseSlotIndex,
+    build_slot_index,
+    decode_slots,
+    encode_slots,
+)
+
+COURSES = [
+    {"id": "A", "time": "M1M2"},
+    {"id": "B", "time": "M2R3"},
+    {"id": "C", "time": "R3R4"},
+    {"id": "D", "time": ""},
+    # 星期日最後一節落在高位的 uint64
+    {"id": "E", "time": "UbUc"},
+]
+
+
+@pytest.mark.parametrize("time", ["M1M2R3", "Tn", "W9Fa", "UbUc", ""])
+def test_round_trip(time):
+    assert decode_slots(encode_slots(time)) == time
+
+
+def test_every_slot_has_its_own_bit():
+    slots = [day + period for day in DAYS for period in PERIODS]
+    masks = [encode_slots(slot) for slot in slots]
+    assert len(set(masks)) == len(slots)
+    assert all(mask.bit_count() == 1 and mask < 1 << MASK_BITS for mask in masks)
+    assert decode_slots(encode_slots("".join(slots))) == "".join(slots)
+
+
+def test_encode_ignores_unknown_text_and_sorts_on_decode():
+    assert encode_slots("R3,M1 (實習)") == encode_slots("M1R3")
+    assert decode_slots(encode_slots("R3M1")) == "M1R3"
+
+
+def test_fits():
+    index = CourseSlotIndex.from_courses(COURSES)
+    assert index.fits("M1M2R3R4") == ["A", "B", "C"]
+    assert index.fits("M1M2R4") == ["A"]
+    assert index.fits("M1M2R4", include_unscheduled=True) == ["A", "D"]
+    assert index.fits(encode_slots("UbUc")) == ["E"]
+    assert index.fits("") == []
+
+
+def test_conflicts():
+    index = CourseSlotIndex.from_courses(COURSES)
+    assert index.conflicts("M2") == ["A", "B"]
+    assert index.conflicts("Uc") == ["E"]
+    assert index.conflicts(["A"]) == ["A", "B"]
+    assert index.conflicts(["B", "E"]) == ["A", "B", "C", "E"]
+    assert index.conflicts(["D"]) == []
+
+
+def test_index_round_trip():
+    index = build_slot_index((c["id"], encode_slots(c["time"])) for c in COURSES)
+    loaded = CourseSlotIndex.from_index(index)
+    assert loaded.ids == [c["id"] for c in COURSES]
+    assert loaded.conflicts("M2R4Uc") == ["A", "B", "C", "E"]
+
+
+def test_index_layout_mismatch():
+    index = build_slot_index([("A", encode_slots("M1"))])
+    index["layout"]["bits_per_day"] = 13
+    with pytest.raises(ValueError):
+        CourseSlotIndex.from_index(index)
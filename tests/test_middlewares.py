@@ -0,0 +1,136 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+from scrapy import Request
+
+from nthu_scraper.middlewares import _TimedCallback
+from nthu_scraper.utils.file_utils import save_json
+
+
+class FakeInstrumentation:
+    def __init__(self):
+        self.records = defaultdict(list)
+        self.started = []
+
+    def record(self, metric, name, value):
+        self.records[metric].append(value)
+
+    def record_written(self, name, written):
+        self.records["written"].append(written)
+
+    def item_started(self, item):
+        self.started.append(item)
+
+
+def busy(seconds):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+async def run_callback(wrapped):
+    result = wrapped(None)
+    if asyncio.iscoroutine(result):
+        result = await result
+    if hasattr(result, "__aiter__"):
+        return [output async for output in result]
+    return list(result)
+
+
+async def sleep_in_other_task(seconds):
+    # 另一個工作在 callback 等待期間占用 CPU，不應計入 callback
+    await asyncio.sleep(0)
+    busy(seconds)
+
+
+def run(wrapped):
+    async def main():
+        other = asyncio.create_task(sleep_in_other_task(0.1))
+        outputs = await run_callback(wrapped)
+        await other
+        return outputs
+
+    return asyncio.run(main())
+
+
+def test_async_callback_counts_items_and_cpu():
+    instrumentation = FakeInstrumentation()
+
+    async def parse(response):
+        busy(0.05)
+        await asyncio.sleep(0.01)
+        busy(0.05)
+        return [{"id": 1}, Request("https://example.com"), {"id": 2}]
+
+    outputs = run(_TimedCallback(parse, "parse", instrumentation))
+
+    assert len(outputs) == 3
+    assert instrumentation.records["items_per_response"] == [2]
+    (cpu_ms,) = instrumentation.records["callback_cpu_ms"]
+    assert 90 <= cpu_ms < 180
+
+
+def test_async_generator_callback_counts_items_and_cpu():
+    instrumentation = FakeInstrumentation()
+
+    async def parse(response):
+        for index in range(3):
+            busy(0.03)
+            await asyncio.sleep(0.01)
+            yield {"id": index}
+
+    outputs = run(_TimedCallback(parse, "parse", instrumentation))
+
+    assert [output["id"] for output in outputs] == [0, 1, 2]
+    assert instrumentation.records["items_per_response"] == [3]
+    (cpu_ms,) = instrumentation.records["callback_cpu_ms"]
+    assert 80 <= cpu_ms < 180
+
+
+def test_sync_callback_returning_list_counts_items():
+    instrumentation = FakeInstrumentation()
+
+    def parse(response):
+        return [{"id": 1}, {"id": 2}]
+
+    result = _TimedCallback(parse, "parse", instrumentation)(None)
+
+    assert result == [{"id": 1}, {"id": 2}]
+    assert instrumentation.records["items_per_response"] == [2]
+
+
+def test_other_threads_are_not_counted(tmp_path):
+    instrumentation = FakeInstrumentation()
+    stop = threading.Event()
+
+    def background():
+        # 模擬 WriteQueue 的背景寫入：同時占用 CPU 並寫入檔案
+        index = 0
+        while not stop.is_set():
+            busy(0.005)
+            save_json({"index": index}, tmp_path / "background" / f"{index}.json")
+            index += 1
+
+    def parse(response):
+        save_json({"id": 1}, tmp_path / "callback.json")
+        busy(0.05)
+        yield {"id": 1}
+
+    thread = threading.Thread(target=background)
+    thread.start()
+    try:
+        time.sleep(0.02)
+        outputs = list(_TimedCallback(parse, "parse", instrumentation)(None))
+    finally:
+        stop.set()
+        thread.join()
+
+    assert outputs == [{"id": 1}]
+    assert any((tmp_path / "background").iterdir())
+    (cpu_ms,) = instrumentation.records["callback_cpu_ms"]
+    assert 45 <= cpu_ms < 80
+    assert instrumentation.records["written"] == [
+        (tmp_path / "callback.json").stat().st_size
+    ]